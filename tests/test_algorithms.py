@@ -0,0 +1,32 @@
+""" Tests of the fitness functions of the algorithms """
+
+import pytest
+
+from totter.api.backends import SIM
+from totter.evolution.algorithms.BitmaskDurationGA import BitmaskDurationGA
+from totter.evolution.algorithms.BitmaskGA import BitmaskGA
+from totter.evolution.algorithms.GoogleGA import GoogleGA
+from totter.evolution.algorithms.KeystrokeGA import KeystrokeGA
+from totter.evolution.algorithms.KeyupKeydownGA import KeyupKeydownGA
+
+
+@pytest.fixture
+def google_ga():
+    return GoogleGA(eval_time_limit=45, pop_size=4, backend=SIM)
+
+
+@pytest.mark.parametrize('distance, run_time, rewarded', [
+    (20, 45, True),  # survived until the evaluation was stopped at the time limit
+    (20, 46, True),
+    (20, 44, False),  # fell before the time limit
+    (100, 30, True),  # finished
+])
+def test_google_ga_only_rewards_survivors(google_ga, distance, run_time, rewarded):
+    assert (google_ga.compute_fitness(distance, run_time) > 0) == rewarded
+
+
+@pytest.mark.parametrize('algorithm_class', [BitmaskGA, BitmaskDurationGA, KeystrokeGA, KeyupKeydownGA])
+def test_runs_shorter_than_a_second(algorithm_class):
+    algorithm = algorithm_class(pop_size=0, skip_init=True, backend=SIM)
+    assert algorithm.compute_fitness(2, 0) == 2
+    assert algorithm.compute_fitness(12, 0) == 12 + 12 * 60
@@ -0,0 +1,53 @@
+""" Tests of the local copy of the game's files """
+
+import threading
+import time
+
+from totter.api.assets import AssetCache
+
+
+class SlowCache(AssetCache):
+    def __init__(self, directory):
+        """ AssetCache whose origin takes a while to send each file """
+        super().__init__(directory)
+        self.fetching = 0  # number of fetches in progress
+        self.most_fetching = 0
+        self._count_lock = threading.Lock()
+
+    def _fetch(self, path, local_path):
+        with self._count_lock:
+            self.fetching += 1
+            self.most_fetching = max(self.most_fetching, self.fetching)
+        time.sleep(0.2)
+        local_path.parent.mkdir(parents=True, exist_ok=True)
+        local_path.write_bytes(path.encode())
+        with self._count_lock:
+            self.fetching -= 1
+            self.fetches += 1
+
+
+def _get_all(cache, paths):
+    """ Returns: list: the contents of `paths`, each read by its own thread """
+    contents = [None] * len(paths)
+
+    def get(index):
+        contents[index] = cache.get(paths[index])[0]
+
+    threads = [threading.Thread(target=get, args=(index,)) for index in range(len(paths))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return contents
+
+
+def test_different_files_are_fetched_concurrently(tmp_path):
+    cache = SlowCache(tmp_path)
+    assert _get_all(cache, ['/a.js', '/b.js', '/c.js']) == [b'/a.js', b'/b.js', b'/c.js']
+    assert cache.most_fetching == 3
+
+
+def test_a_file_is_fetched_once(tmp_path):
+    cache = SlowCache(tmp_path)
+    assert _get_all(cache, ['/a.js'] * 4) == [b'/a.js'] * 4
+    assert cache.fetches == 1
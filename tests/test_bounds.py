@@ -0,0 +1,67 @@
+""" Tests of the fitness bounds used to stop evaluations early, near the end of the runs """
+
+import numpy as np
+import pytest
+
+from totter.api.backends import SIM
+from totter.api.bounds import FINISH_LINE, FitnessBound
+from totter.evolution.algorithms.BitmaskGA import BitmaskGA
+from totter.evolution.algorithms.ExampleGA import ExampleGA
+from totter.evolution.algorithms.GoogleGA import GoogleGA
+from totter.evolution.algorithms.KeystrokeGA import KeystrokeGA
+
+TIME_LIMIT = 45
+TOP_SPEED = 5
+
+
+def _distance_only():
+    return ExampleGA(pop_size=0, skip_init=True, backend=SIM)
+
+
+def _distance_and_speed_of_keystrokes():
+    return KeystrokeGA(pop_size=0, skip_init=True, backend=SIM)
+
+
+def _distance_and_speed_of_bitmasks():
+    return BitmaskGA(pop_size=0, skip_init=True, backend=SIM)
+
+
+def _speed_of_survivors():
+    return GoogleGA(eval_time_limit=TIME_LIMIT, pop_size=4, backend=SIM)
+
+
+def _best_outcome(fitness_function, distance, elapsed):
+    """ Best fitness of the ways a run can go on at top speed, overshooting the time limit by at most a second """
+    best = fitness_function(distance, int(elapsed))
+    for end in np.arange(elapsed, TIME_LIMIT + 2, 0.01):
+        reached = min(FINISH_LINE, distance + TOP_SPEED * (end - elapsed))
+        best = max(best, fitness_function(reached, int(end)))
+    return best
+
+
+@pytest.mark.parametrize('algorithm', [_distance_only, _distance_and_speed_of_keystrokes,
+                                       _distance_and_speed_of_bitmasks, _speed_of_survivors])
+@pytest.mark.parametrize('distance, elapsed', [
+    (20, 40), (20, 44), (20, 44.9), (20, 45), (20, 45.5),  # the run ends at the time limit
+    (97, 44.9), (99.5, 45),  # the run may cross the finish line first
+])
+def test_bound_near_the_time_limit(algorithm, distance, elapsed):
+    fitness_function = algorithm().compute_fitness
+    outcome = _best_outcome(fitness_function, distance, elapsed)
+    best = FitnessBound(None, fitness_function).best_fitness(distance, elapsed, TIME_LIMIT, TOP_SPEED)
+    # no outcome of the run is ruled out, and the bound doesn't let through runs that can't matter
+    assert best >= outcome
+    assert best == pytest.approx(outcome, rel=0.01)
+    assert FitnessBound(outcome - 0.01, fitness_function).can_exceed(distance, elapsed, TIME_LIMIT, TOP_SPEED)
+    assert not FitnessBound(outcome * 1.01 + 0.01, fitness_function).can_exceed(distance, elapsed, TIME_LIMIT,
+                                                                               TOP_SPEED)
+
+
+def test_survivor_can_beat_its_parents_in_its_last_second():
+    algorithm = _speed_of_survivors()
+    parent_fitness = algorithm.compute_fitness(25, TIME_LIMIT)
+    bound = FitnessBound(parent_fitness, algorithm.compute_fitness)
+    # the child hasn't survived yet, but will be rewarded if it does
+    assert algorithm.compute_fitness(22, 44) == 0
+    assert bound.can_exceed(22, 44.9, TIME_LIMIT, TOP_SPEED)
+    assert not bound.can_exceed(15, 44.9, TIME_LIMIT, TOP_SPEED)
@@ -0,0 +1,72 @@
+""" Tests of the capture of frames from the game's canvas """
+
+import io
+
+from PIL import Image
+
+from totter.api.capture import CanvasCapture
+
+
+class FakeCanvas(object):
+    def __init__(self, image):
+        self.image = image
+
+    @property
+    def screenshot_as_png(self):
+        data = io.BytesIO()
+        self.image.save(data, format='PNG')
+        return data.getvalue()
+
+
+class FakeBrowser(object):
+    def __init__(self, canvas, position, ratio=1):
+        """ Browser whose canvas is at `position` on the screen, in CSS pixels """
+        self.canvas = canvas
+        self.position = position
+        self.ratio = ratio
+
+    def find_element(self, by, value):
+        return self.canvas
+
+    def execute_script(self, script, *args):
+        return [self.position[0], self.position[1], self.ratio]
+
+
+def test_canvas_is_pasted_unscaled_at_its_offset():
+    canvas = Image.new('RGB', (640, 400), color=(10, 200, 30))
+    capture = CanvasCapture(FakeBrowser(FakeCanvas(canvas), position=(130, 145)))
+
+    frame = capture.grab((100, 100, 700, 500))
+    assert frame.size == (700, 500)
+    assert frame.getpixel((29, 44)) == (0, 0, 0)
+    assert frame.getpixel((30, 45)) == (10, 200, 30)
+    assert frame.getpixel((669, 444)) == (10, 200, 30)
+    assert frame.getpixel((670, 445)) == (0, 0, 0)
+
+
+def test_canvas_position_is_in_device_pixels():
+    canvas = Image.new('RGB', (1280, 800), color=(10, 200, 30))
+    capture = CanvasCapture(FakeBrowser(FakeCanvas(canvas), position=(60, 70), ratio=2))
+
+    frame = capture.grab((100, 100, 1400, 1000))
+    assert frame.getpixel((19, 39)) == (0, 0, 0)
+    assert frame.getpixel((20, 40)) == (10, 200, 30)
+
+
+class StaleCanvas(object):
+    @property
+    def screenshot_as_png(self):
+        raise RuntimeError('stale element reference')
+
+
+def test_invalidate_finds_the_canvas_of_the_reloaded_page():
+    browser = FakeBrowser(FakeCanvas(Image.new('RGB', (640, 400), color=(10, 200, 30))), position=(130, 145))
+    capture = CanvasCapture(browser)
+    capture.grab((100, 100, 700, 500))
+
+    # the page is reloaded: the old canvas is stale, and the new one is elsewhere
+    capture._canvas = StaleCanvas()
+    browser.position = (100, 100)
+    capture.invalidate()
+    frame = capture.grab((100, 100, 700, 500))
+    assert frame.getpixel((0, 0)) == (10, 200, 30)
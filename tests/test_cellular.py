@@ -0,0 +1,55 @@
+""" Tests of the sweep of the cellular GA over its grid """
+
+import random
+
+import pytest
+
+from totter.api.backends import SIM
+from totter.evolution.algorithms.KeystrokeGA import CellularKeystrokeGA
+
+
+class FakeEvaluator(object):
+    def __init__(self, lanes):
+        """ Evaluator that records the size of each batch, and reports random distances """
+        self.lanes = lanes
+        self.batches = list()
+
+    def evaluate(self, strategies, bounds=None, estimate=True):
+        self.batches.append(len(strategies))
+        return tuple((random.random() * 20, 10) for _ in strategies)
+
+
+def _algorithm(pop_size, lanes):
+    random.seed(0)
+    algorithm = CellularKeystrokeGA(pop_size=pop_size, backend=SIM)
+    algorithm._qwop_evaluator = FakeEvaluator(lanes)
+    return algorithm
+
+
+def _neighbors(population, row, col):
+    return {population.wrap_coords(row + dr, col + dc) for dr, dc in ((0, -1), (0, 1), (-1, 0), (1, 0))}
+
+
+def test_single_lane_sweeps_cell_by_cell():
+    algorithm = _algorithm(16, lanes=1)
+    algorithm.advance()
+    assert algorithm.qwop_evaluator.batches == [1] * 16
+
+
+@pytest.mark.parametrize('pop_size', [4, 9, 16, 25, 20])
+def test_groups_hold_no_neighbors(pop_size):
+    algorithm = _algorithm(pop_size, lanes=4)
+    population = algorithm.population
+    groups = algorithm._independent_groups()
+
+    cells = [cell for group in groups for cell in group]
+    assert sorted(cells) == [(row, col) for row in range(population.rows) for col in range(population.cols)]
+    for group in groups:
+        for row, col in group:
+            assert not _neighbors(population, row, col) & (set(group) - {(row, col)})
+
+
+def test_several_lanes_sweep_group_by_group():
+    algorithm = _algorithm(16, lanes=4)
+    algorithm.advance()
+    assert algorithm.qwop_evaluator.batches == [8, 8]
@@ -0,0 +1,63 @@
+""" Tests of the saving of the templates of the DigitRecognizer """
+
+import os
+import threading
+
+import numpy as np
+
+import totter.api.digits as digits
+from totter.api.digits import DigitRecognizer
+
+
+def _line(glyphs):
+    """ Greyscale image of a line of `glyphs` white blocks """
+    image = np.zeros((20, 12 * glyphs + 2), dtype=np.uint8)
+    for glyph in range(glyphs):
+        image[2:18, 12 * glyph + 2:12 * glyph + 12] = 255
+    return image
+
+
+def _saves(recognizer, monkeypatch):
+    """ Returns: list: one entry per save of the recognizer's templates """
+    saves = list()
+    save = recognizer._save
+    monkeypatch.setattr(recognizer, '_save', lambda: saves.append(save()))
+    return saves
+
+
+def test_templates_are_saved_in_batches(tmp_path, monkeypatch):
+    recognizer = DigitRecognizer(path=tmp_path / 'digits.npz')
+    saves = _saves(recognizer, monkeypatch)
+
+    # new characters are saved right away
+    assert recognizer.learn(_line(2), '11')
+    assert len(saves) == 1
+    # further reads of known characters are saved once there are enough of them
+    for _ in range(digits._SAVE_EVERY - 1):
+        recognizer.learn(_line(2), '11')
+    assert len(saves) == 1
+    recognizer.learn(_line(2), '11')
+    assert len(saves) == 2
+
+    assert DigitRecognizer(path=tmp_path / 'digits.npz').samples.keys() == {'1'}
+
+
+def test_concurrent_saves(tmp_path):
+    recognizer = DigitRecognizer(path=tmp_path / 'digits.npz')
+    recognizer.learn(_line(2), '11')
+    errors = list()
+
+    def save():
+        try:
+            for _ in range(20):
+                recognizer.save()
+        except Exception as error:
+            errors.append(error)
+
+    threads = [threading.Thread(target=save) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert os.listdir(tmp_path) == ['digits.npz']
@@ -0,0 +1,55 @@
+""" Tests of the detection and extrapolation of steady gaits """
+
+import numpy as np
+import pytest
+
+from totter.api.bounds import FINISH_LINE
+from totter.api.gait import GaitTracker, RunResult
+
+
+def _track(tracker, distance, duration=20, interval=0.05):
+    """ Feed the tracker the distances `distance(time)` of a run, and return whether it found a steady gait """
+    steady = False
+    for elapsed in np.arange(interval, duration, interval):
+        steady = tracker.update(elapsed, distance(elapsed))
+    return steady
+
+
+def _striding(elapsed):
+    """ Runner moving at 2 m/s on average, with a stride of 1.5 s """
+    return 2 * elapsed + 0.5 * np.sin(2 * np.pi * elapsed / 1.5)
+
+
+def test_a_steady_gait_is_found():
+    tracker = GaitTracker()
+    assert _track(tracker, _striding)
+    assert tracker.period == pytest.approx(1.5, abs=0.05)
+    assert tracker.speed == pytest.approx(2, rel=0.02)
+
+
+def test_a_steady_gait_is_extrapolated():
+    tracker = GaitTracker()
+    _track(tracker, _striding)
+    distance, run_time = tracker.extrapolate(38, 20, time_limit=30)
+    assert (distance, run_time) == (pytest.approx(58, abs=0.5), 30)
+    # the runner crosses the finish line before the time limit
+    distance, run_time = tracker.extrapolate(38, 20, time_limit=60)
+    assert (distance, run_time) == (FINISH_LINE, pytest.approx(51, abs=0.5))
+
+
+@pytest.mark.parametrize('distance', [
+    lambda elapsed: 2 * elapsed + 0.5 * np.sin(2 * np.pi * elapsed / 1.5) * np.sin(elapsed ** 1.5),  # stumbling
+    lambda elapsed: 0.1 * elapsed ** 2 + 0.5 * np.sin(2 * np.pi * elapsed / 1.5),  # speeding up
+    lambda elapsed: 5 + 0.5 * np.sin(2 * np.pi * elapsed / 1.5),  # rocking in place
+])
+def test_irregular_runs_are_played_out(distance):
+    tracker = GaitTracker()
+    assert not _track(tracker, distance)
+    assert tracker.speed is None
+
+
+def test_run_results_unpack_like_pairs():
+    distance, run_time = result = RunResult(58.0, 30, estimated=True)
+    assert (distance, run_time) == (58.0, 30)
+    assert result.estimated
+    assert not RunResult(58.0, 30).estimated
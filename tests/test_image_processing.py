@@ -0,0 +1,52 @@
+""" Tests of the reading of distances by the ImageProcessor """
+
+import numpy as np
+
+import totter.api.image_processing as image_processing
+from totter.api.image_processing import ImageProcessor
+
+
+class FakeRecognizer(object):
+    def __init__(self, knows_all_characters):
+        """ Recognizer that is never confident """
+        self._knows_all_characters = knows_all_characters
+
+    def read(self, image):
+        return None
+
+    def learn(self, image, text):
+        pass
+
+    def knows_all_characters(self):
+        return self._knows_all_characters
+
+
+class FakeEngine(object):
+    def __init__(self):
+        self.reads = 0
+
+    def recognize(self, image, single_line=True):
+        self.reads += 1
+        return '12.5 metres'
+
+
+def _read(knows_all_characters, monkeypatch, frames=3):
+    """ Returns the distances read from `frames` frames that the recognizer can't read, and the tesseract reads """
+    engine = FakeEngine()
+    monkeypatch.setattr(image_processing, 'get_engine', lambda: engine)
+    processor = ImageProcessor(recognizer=FakeRecognizer(knows_all_characters))
+    distances = [processor._read_distance(np.zeros((35, 235), dtype=np.uint8)) for _ in range(frames)]
+    return distances, engine.reads
+
+
+def test_tesseract_teaches_missing_characters(monkeypatch):
+    assert _read(False, monkeypatch) == ([12.5] * 3, 3)
+
+
+def test_tesseract_is_rate_limited_once_every_character_is_known(monkeypatch):
+    assert _read(True, monkeypatch) == ([12.5, None, None], 1)
+
+
+def test_tesseract_keeps_correcting_known_characters(monkeypatch):
+    monkeypatch.setattr(image_processing, '_FALLBACK_INTERVAL', 0)
+    assert _read(True, monkeypatch) == ([12.5] * 3, 3)
@@ -0,0 +1,48 @@
+""" Tests of the cache of distances read from the game's HUD """
+
+import numpy as np
+
+from totter.api.ocr_cache import OcrCache
+
+
+def _crop(glyphs):
+    """ Greyscale crop of the HUD showing a line of `glyphs` white blocks """
+    image = np.zeros((35, 235), dtype=np.uint8)
+    for glyph in range(glyphs):
+        image[8:28, 12 * glyph + 4:12 * glyph + 14] = 255
+    return image
+
+
+def test_an_identical_crop_hits():
+    cache = OcrCache()
+    cache.store(_crop(3), 12.5)
+    assert cache.lookup(_crop(3)) == (True, 12.5)
+    assert (cache.exact_hits, cache.perceptual_hits, cache.misses) == (1, 0, 0)
+
+
+def test_a_crop_with_different_antialiasing_hits():
+    cache = OcrCache()
+    cache.store(_crop(3), 12.5)
+    crop = _crop(3)
+    crop[8:28, 3] = 60  # the edges of the text are blended differently
+    crop[8:28, 14] = 90
+    assert cache.lookup(crop) == (True, 12.5)
+    assert (cache.exact_hits, cache.perceptual_hits, cache.misses) == (0, 1, 0)
+    # the crop is then known exactly
+    assert cache.lookup(crop) == (True, 12.5)
+    assert cache.exact_hits == 1
+
+
+def test_a_different_crop_misses():
+    cache = OcrCache()
+    cache.store(_crop(3), 12.5)
+    assert cache.lookup(_crop(4)) == (False, None)
+    assert (cache.hits, cache.misses) == (0, 1)
+
+
+def test_least_recently_used_crops_are_forgotten():
+    cache = OcrCache(max_size=2)
+    for glyphs in (1, 2, 3):
+        cache.store(_crop(glyphs), float(glyphs))
+    assert cache.lookup(_crop(1)) == (False, None)
+    assert cache.lookup(_crop(3)) == (True, 3.0)
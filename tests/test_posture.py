@@ -0,0 +1,59 @@
+""" Calibration tests of the PostureDetector on synthetic frames
+
+The frames have the layout of QWOP's: horizontal bands of scenery, and a runner standing on the track inside the box
+that the detector looks at.
+"""
+
+from PIL import Image, ImageDraw
+import pytest
+
+from totter.api.posture import PostureDetector, runner_height
+
+_TRACK = 430  # row of the frame on which the runner stands
+_STANDING_HEIGHT = 200
+
+
+def _frame(height):
+    """ Frame with a runner `height` pixels tall """
+    frame = Image.new('RGB', (700, 500))
+    draw = ImageDraw.Draw(frame)
+    # sky, scenery and track
+    draw.rectangle((0, 0, 699, 299), fill=(150, 190, 230))
+    draw.rectangle((0, 300, 699, _TRACK), fill=(90, 140, 70))
+    draw.rectangle((0, _TRACK + 1, 699, 499), fill=(170, 80, 50))
+    draw.rectangle((340, _TRACK - height + 1, 360, _TRACK), fill=(250, 220, 180))
+    return frame
+
+
+def _confidence(detector, height, speed=0):
+    """ Confidence of `detector` after a standing start and a few frames of a runner `height` pixels tall
+
+    The runner moves `speed` metres per frame, so a runner that moves can't be stuck on its knees.
+    """
+    detector.update(_frame(_STANDING_HEIGHT), 0)
+    detector.update(_frame(_STANDING_HEIGHT), 0)
+    for frame in range(detector.stall_frames):
+        detector.update(_frame(height), frame * speed)
+    return detector.confidence
+
+
+def test_runner_height():
+    assert runner_height(_frame(_STANDING_HEIGHT)) == _STANDING_HEIGHT
+
+
+@pytest.mark.parametrize('height, down', [(200, False), (180, False), (60, True), (120, True)])
+def test_default_thresholds(height, down):
+    detector = PostureDetector()
+    _confidence(detector, height)
+    assert detector.fallen == down
+
+
+def test_lying_threshold_is_configurable():
+    # a moving runner at half its standing height is lying for a lying fraction of 0.5, but not by default
+    assert _confidence(PostureDetector(), 100, speed=1) < 0.8
+    assert _confidence(PostureDetector(lying_fraction=0.5, kneeling_fraction=0.8), 100, speed=1) == 1
+
+
+def test_fractions_are_checked():
+    with pytest.raises(ValueError):
+        PostureDetector(lying_fraction=0.8, kneeling_fraction=0.5)
@@ -0,0 +1,219 @@
+""" Tests of the QwopSimulator against a fake game, which needs neither a browser nor a screen """
+
+from concurrent.futures import ThreadPoolExecutor
+import time
+
+from PIL import Image
+import pytest
+from selenium.common.exceptions import WebDriverException
+
+from totter.api import keyboard
+from totter.api.health import BrowserFailure
+from totter.api.image_processing import ImageProcessor
+import totter.api.qwop as qwop
+from totter.api.qwop import QwopEvaluator, QwopSimulator, _BufferedLane
+from totter.api.strategy import QwopStrategy
+from totter.api.timeline import TimelinePlayer, compile_phenotype
+
+
+class FakeKeyboard(keyboard.Keyboard):
+    uses_window_focus = False
+
+    def __init__(self):
+        """ Keyboard that records the time of each key event, and can be told to fail like a crashed browser """
+        self.events = list()
+        self.fail_at = None  # number of events after which every event fails
+
+    def key_down(self, key):
+        self._send(key, True)
+
+    def key_up(self, key):
+        self._send(key, False)
+
+    def release_all(self):
+        self.events.append((self.now(), 'release_all', False))
+
+    def _send(self, key, down):
+        if self.fail_at is not None and len(self.events) >= self.fail_at:
+            raise WebDriverException('the browser crashed')
+        self.events.append((self.now(), key, down))
+
+
+class FakeGame(object):
+    time_warp = 1
+    bounding_box = (0, 0, 700, 500)
+    reset_latencies = ()
+
+    def __init__(self):
+        """ Game whose screen stays blank and whose runs only end at the time limit """
+        self.keyboard = FakeKeyboard()
+        self.recycles = 0
+        self.screenshots = 0
+        self.failing_resets = 0  # number of resets that fail like a crashed browser
+
+    def is_open(self):
+        return True
+
+    def open(self):
+        pass
+
+    def close(self):
+        pass
+
+    def recycle(self):
+        self.recycles += 1
+        self.keyboard.fail_at = None
+
+    def refocus(self):
+        pass
+
+    def reset(self, probe=None):
+        if self.failing_resets > 0:
+            self.failing_resets -= 1
+            raise WebDriverException('the browser crashed')
+        return 0
+
+    def dropped_time(self):
+        return 0
+
+    def screenshot(self):
+        self.screenshots += 1
+        return Image.new('RGB', self.bounding_box[2:])
+
+
+class FakeObserver(object):
+    cache = None
+
+    def __init__(self):
+        """ Stands in for the image processor, which would read a blank screen """
+        self.current_distance = 0
+        self.frames = 0
+
+    def reset(self):
+        self.current_distance = 0
+
+    def update(self, screen):
+        self.frames += 1
+
+    def is_game_over(self):
+        return False
+
+    def get_final_distance(self):
+        return self.current_distance
+
+
+class UnbeatableBound(object):
+    """ Fitness bound that no run can exceed """
+
+    def can_exceed(self, distance, elapsed, time_limit, top_speed):
+        return False
+
+
+def _phenotype():
+    keyboard.key_down('q')
+    keyboard.sleep(0.1)
+    keyboard.key_up('q')
+    keyboard.key_down('w')
+    keyboard.sleep(0.1)
+    keyboard.key_up('w')
+
+
+@pytest.fixture
+def simulator():
+    simulator = QwopSimulator(time_limit=0.45, game=FakeGame())
+    simulator.image_processor = FakeObserver()
+    yield simulator
+    simulator.close()
+
+
+def test_timeline_restarts_after_a_lost_run(simulator):
+    timeline = compile_phenotype(_phenotype)
+    strategy = QwopStrategy(TimelinePlayer(timeline))
+    events = simulator.game.keyboard.events
+
+    # the browser crashes in the middle of the second cycle, so the strategy is never cleaned up
+    simulator.game.keyboard.fail_at = len(timeline.first) + 1
+    with pytest.raises(BrowserFailure):
+        simulator.simulate(strategy, qwop_started=True)
+    assert simulator.game.recycles == 0
+    time.sleep(0.3)
+
+    del events[:]
+    simulator.simulate(strategy, qwop_started=True)
+    assert simulator.game.recycles == 1
+
+    # the retry starts from the first cycle, and its transitions keep the timeline's offsets
+    start = events[0][0]
+    played = [(key, down) for _, key, down in events[:len(timeline.first)]]
+    assert played == [(key, down) for _, key, down in timeline.first]
+    offsets = [offset for offset, _, _ in timeline.first]
+    offsets += [timeline.period + offset for offset, _, _ in timeline.cycle]
+    for (sent, _, _), offset in zip(events, offsets):
+        assert sent - start == pytest.approx(offset, abs=0.05)
+
+
+def test_abort_before_the_first_check(simulator):
+    # the run can't exceed its bound, so it is stopped at the first check of the game
+    result = simulator.simulate(QwopStrategy(_phenotype), qwop_started=True, bound=UnbeatableBound())
+    assert simulator.aborted
+    assert simulator.image_processor.frames == 1
+    assert result.distance == 0
+
+
+def test_final_distance_without_frames():
+    assert ImageProcessor().get_final_distance() == 0
+
+
+@pytest.mark.parametrize('time_warp, checks', [(1, 16), (2, 9), (8, 3), (30, 2)])
+def test_stall_window_covers_the_same_game_time(time_warp, checks):
+    game = FakeGame()
+    game.time_warp = time_warp
+    simulator = QwopSimulator(time_limit=1, buffer_size=16, game=game)
+    assert simulator.image_processor.buffer_size == checks
+    simulator.close()
+
+
+def test_survivors_report_the_time_limit():
+    simulator = QwopSimulator(time_limit=1, game=FakeGame())
+    simulator.image_processor = FakeObserver()
+    result = simulator.simulate(QwopStrategy(_phenotype), qwop_started=True)
+    assert result.run_time == 1
+    simulator.close()
+
+
+def test_posture_fractions_reach_the_detector():
+    simulator = QwopSimulator(time_limit=1, game=FakeGame(), fall_confidence=0.8, lying_fraction=0.5,
+                              kneeling_fraction=0.8)
+    posture = simulator.image_processor.posture
+    assert (posture.lying_fraction, posture.kneeling_fraction) == (0.5, 0.8)
+    simulator.close()
+
+
+def test_buffered_lane_recovers_from_a_failed_reset():
+    first, second = (QwopSimulator(time_limit=0.2, game=FakeGame()) for _ in range(2))
+    for simulator in (first, second):
+        simulator.image_processor = FakeObserver()
+    # the reset fails again after the browser is replaced while preparing the game
+    first.game.failing_resets = 2
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        lane = _BufferedLane(first, second, executor)
+        with pytest.raises(BrowserFailure):
+            lane.simulate(QwopStrategy(_phenotype))
+        # the failed game is replaced before it is used again
+        lane.simulate(QwopStrategy(_phenotype))
+        lane.simulate(QwopStrategy(_phenotype))
+        assert (first.game.recycles, second.game.recycles) == (2, 0)
+    first.close()
+    second.close()
+
+
+def test_evaluator_close_stops_its_threads(monkeypatch):
+    monkeypatch.setattr(qwop, 'QwopGame', lambda **options: FakeGame())
+    evaluator = QwopEvaluator(time_limit=0.2, lanes=2, input_method=qwop.WEBDRIVER_INPUT, spare_games=True)
+    for simulator in evaluator.simulators:
+        simulator.image_processor = FakeObserver()
+    evaluator.evaluate([QwopStrategy(_phenotype), QwopStrategy(_phenotype)])
+    evaluator.close()
+    for executor in (evaluator._executor, evaluator._reset_executor):
+        with pytest.raises(RuntimeError):
+            executor.submit(time.sleep, 0)
@@ -0,0 +1,41 @@
+""" Tests of the simulator backend """
+
+import numpy as np
+
+from totter.api import keyboard
+from totter.api.backends import SIM
+from totter.api.simulation import record_key_schedule, simulate_schedules
+from totter.api.strategy import QwopStrategy
+from totter.evolution.algorithms.KeyupKeydownGA import KeyupKeydownGA
+
+_Q = [True, False, False, False]
+_NONE = [False, False, False, False]
+
+
+def test_schedule_of_a_stateful_genome():
+    algorithm = KeyupKeydownGA(pop_size=0, skip_init=True, backend=SIM)
+    strategy = algorithm.create_strategy(['+', 'Q'])
+
+    # Q is released for the first pause only: later cycles start with it held from the previous one
+    schedule = record_key_schedule(strategy)
+    assert schedule.lead_in.tolist() == [_NONE] * 9 + [_Q] * 9
+    assert schedule.cycle.tolist() == [_Q] * 18
+
+
+def test_stateful_genome_runs_like_its_stateless_equivalent():
+    algorithm = KeyupKeydownGA(pop_size=0, skip_init=True, backend=SIM)
+    stateful = record_key_schedule(algorithm.create_strategy(['+', 'Q']))
+    stateless = record_key_schedule(QwopStrategy(lambda: (keyboard.key_down('q'), keyboard.sleep(0.150))))
+    stateless = stateless._replace(lead_in=np.concatenate([[_NONE] * 9, stateless.lead_in]))
+
+    distances, times, _ = simulate_schedules([stateful, stateless], time_limit=10)
+    assert distances[0] == distances[1]
+    assert times[0] == times[1]
+
+
+def test_run_times_are_whole_seconds_of_game_time():
+    standing = record_key_schedule(QwopStrategy(lambda: keyboard.sleep(0.150)))
+    for time_limit in (20, 45):
+        distances, times, game_over = simulate_schedules([standing], time_limit=time_limit)
+        assert not game_over[0]
+        assert times[0] == time_limit
@@ -5,10 +5,10 @@ import os
 import pathlib
 import sys
 
-from totter.api.qwop import stop_qwop, QwopSimulator
+from totter.api import backends
+from totter.api.posture import KNEELING_FRACTION, LYING_FRACTION
 from totter.evolution.GeneticAlgorithm import GeneticAlgorithm
 from totter.evolution.Experiment import Experiment
-from totter.api.qwop import QwopStrategy
 import totter.utils.storage as storage
 
 # ---------------  IMPORT YOUR CUSTOM GAs HERE ---------------
@@ -61,6 +61,66 @@ def main():
 
     parser.add_argument('--algorithm', default='ExampleGA', type=str, choices=list(genetic_algorithms.keys()),
                         help='The name of the GA that you would like to run.')
+    parser.add_argument('--backend', default=backends.BROWSER, type=str, choices=backends.BACKENDS,
+                        help='Where strategies are evaluated: the browser version of QWOP, '
+                             'or a headless physics simulation that runs faster than real time.')
+    parser.add_argument('--lanes', default=1, type=int,
+                        help='Number of QWOP instances used to evaluate strategies concurrently in the browser.')
+    parser.add_argument('--display', default='screen', type=str, choices=('screen', 'xvfb', 'tiled'),
+                        help='Where the browser games are displayed: on the current screen, '
+                             'on a virtual display per lane, or tiled on one large virtual display '
+                             '(virtual displays require Xvfb).')
+    parser.add_argument('--input', default='system', type=str, choices=('system', 'xtest', 'webdriver'),
+                        help='How keys are sent to the browser games: as key presses to the focused window, '
+                             'as key presses through X11\'s XTest extension without pyautogui\'s pause after each key, '
+                             'or as key events dispatched into each game\'s page, which needs no focus.')
+    parser.add_argument('--capture', default='screen', type=str, choices=('screen', 'canvas'),
+                        help='Where frames of the browser games are captured from: their region of the screen, '
+                             'or their canvas, read through the browser.')
+    parser.add_argument('--headless', default=False, action='store_true',
+                        help='Run the browser games in headless Firefox.  Requires --input webdriver '
+                             'and --capture canvas.')
+    parser.add_argument('--local_assets', default=False, action='store_true',
+                        help='Load the browser games from a copy kept under the storage root and served from '
+                             'localhost, instead of from foddy.net.  The copy is made the first time it is used.')
+    parser.add_argument('--time_warp', type=float, default=1,
+                        help='Number of game seconds that pass in a real second of the browser games.  Requires '
+                             '--local_assets.  Time limits and the pauses of strategies are in game seconds.')
+    parser.add_argument('--watchdog', default=False, action='store_true',
+                        help='Check the browser games during every run.  Browsers that hang are killed, runs during '
+                             'which a browser stopped drawing frames are tried again in a new browser, and slow or '
+                             'bloated browsers are replaced.')
+    parser.add_argument('--recycle_every', type=int, default=None,
+                        help='Replace each browser game with a new one after this many runs.')
+    parser.add_argument('--retries', type=int, default=2,
+                        help='Number of times an evaluation lost to a browser failure is tried again.')
+    parser.add_argument('--spare_games', default=False, action='store_true',
+                        help='Give each lane a second browser game, which is reset while the other one runs.  '
+                             'Requires virtual displays or an input other than system input.')
+    parser.add_argument('--pipeline', default=False, action='store_true',
+                        help='Analyze the frames of each browser game in a separate process.')
+    parser.add_argument('--probe', default=False, action='store_true',
+                        help='Read the distance and game state of the browser games from their JavaScript runtime, '
+                             'falling back to reading the screen if that doesn\'t work.')
+    parser.add_argument('--fall_confidence', default=None, type=float,
+                        help='End runs in the browser as soon as the runner is this confident (0 to 1) to have fallen '
+                             'or to be stuck on its knees.  Disabled by default.')
+    parser.add_argument('--lying_fraction', default=LYING_FRACTION, type=float,
+                        help='Height of a runner lying on the track, as a fraction of its height at the start, used by '
+                             '--fall_confidence.  The default is a placeholder that was not calibrated on real falls.')
+    parser.add_argument('--kneeling_fraction', default=KNEELING_FRACTION, type=float,
+                        help='Height of a runner on its knees, as a fraction of its height at the start, used by '
+                             '--fall_confidence.  The default is a placeholder that was not calibrated on real falls.')
+    parser.add_argument('--top_speed', default=5, type=float,
+                        help='Speed in metres per second that no runner exceeds.  Evaluations that can\'t beat the '
+                             'fitness the algorithm needs even at this speed are stopped early.')
+    parser.add_argument('--gait_cycles', default=None, type=int,
+                        help='End runs in the browser once the runner has kept a steady gait for this many cycles, '
+                             'and extrapolate the rest of the run from its speed.  Disabled by default.')
+    parser.add_argument('--capture_rate', default=20, type=float,
+                        help='Frames captured per second by each game\'s pipeline.')
+    parser.add_argument('--analysis_rate', default=10, type=float,
+                        help='Frames analyzed per second by each game\'s pipeline.')
 
     subcommands = parser.add_subparsers()
 
@@ -107,6 +167,30 @@ def main():
     # `args.algorithm` will be the name of one of the GA subclasses
     algorithm_name = args.pop('algorithm')
     algorithm_class = genetic_algorithms[algorithm_name]
+    backend = args.pop('backend')
+    # options for the browser backend
+    evaluator_options = {
+        'lanes': args.pop('lanes'),
+        'display': args.pop('display'),
+        'input_method': args.pop('input'),
+        'capture_method': args.pop('capture'),
+        'headless': args.pop('headless'),
+        'spare_games': args.pop('spare_games'),
+        'local_assets': args.pop('local_assets'),
+        'time_warp': args.pop('time_warp'),
+        'watchdog': args.pop('watchdog'),
+        'recycle_every': args.pop('recycle_every'),
+        'retries': args.pop('retries'),
+        'pipeline': args.pop('pipeline'),
+        'probe': args.pop('probe'),
+        'fall_confidence': args.pop('fall_confidence'),
+        'lying_fraction': args.pop('lying_fraction'),
+        'kneeling_fraction': args.pop('kneeling_fraction'),
+        'top_speed': args.pop('top_speed'),
+        'gait_cycles': args.pop('gait_cycles'),
+        'capture_rate': args.pop('capture_rate'),
+        'analysis_rate': args.pop('analysis_rate'),
+    }
 
     if action == 'evolve':
         evolution_config = {
@@ -117,6 +201,8 @@ def main():
             'steady_state': False if 'generational' in args else True,
             'population_seeding_pool': args['population_seeding_pool'],
             'seeding_time_limit': args['seeding_time_limit'],
+            'backend': backend,
+            'evaluator_options': evaluator_options,
         }
         evaluations = args['evaluations']
         trials = args['trials']
@@ -133,7 +219,9 @@ def main():
         pop_size = args['pop_size'] if 'pop_size' in args else 30
         logger.info(f'Seeding algorithm {algorithm_class.__name__} '
                     f'using pool size {pool_size} and population size {pop_size}')
-        algorithm = algorithm_class(pop_size=pop_size, population_seeding_pool=pool_size)
+        algorithm = algorithm_class(pop_size=pop_size, population_seeding_pool=pool_size,
+                                    backend=backend, evaluator_options=evaluator_options)
+        backends.stop(backend)
         logger.info('Done.')
 
     elif action == 'simulate':
@@ -152,11 +240,16 @@ def main():
                 data = json.load(results_file)
 
             best_genome = data['best_genome']
-            algorithm = algorithm_class(pop_size=0, skip_init=True)  # we just need a shell to get the execute method
-            strategy = QwopStrategy(execution_function=algorithm.genome_to_phenotype(best_genome))
-            simulator = QwopSimulator(time_limit=600)  # TODO: time limit is rather arbitrary
-            simulator.simulate(strategy, qwop_started=True)
-            stop_qwop()
+            # we just need a shell to get the execute method
+            algorithm = algorithm_class(pop_size=0, skip_init=True, backend=backend,
+                                        evaluator_options=evaluator_options)
+            strategy = algorithm.create_strategy(best_genome)
+            # the run is played with the same options as the evaluations of `evolve`, and never extrapolated
+            evaluator = backends.get_evaluator(time_limit=600, backend=backend,  # TODO: time limit is rather arbitrary
+                                               **evaluator_options)
+            distance, run_time = evaluator.evaluate(strategy, estimate=False)[0]
+            logger.info(f'Ran {distance} metres in {run_time} seconds')
+            backends.stop(backend)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,222 @@
+""" Local copy of the QWOP game, served to the browsers from localhost
+
+The game is an HTML page and the scripts, images and sounds it loads.  Instead of fetching them from foddy.net every
+time a browser opens the game, browsers can load them from a small HTTP server run by totter.  The server keeps a copy
+of every file it is asked for under the storage root, and only fetches a file from foddy.net the first time it is
+asked for it.  Once the game has been loaded through the server, it loads without network access.
+Copies are kept in a directory named after GAME_VERSION, so the game doesn't change between experiments when the site
+is updated.  Changing GAME_VERSION fetches a fresh copy.
+The game's page may also be served with a clock that runs faster than real time.  See `totter.api.warp`.
+
+"""
+
+import collections
+import hashlib
+import http.server
+import logging
+import mimetypes
+import os
+import socketserver
+import threading
+import urllib.error
+import urllib.parse
+import urllib.request
+from pathlib import Path
+
+import totter.utils.storage as storage
+from totter.api.warp import inject_clock
+
+logger = logging.getLogger(__name__)
+
+GAME_ORIGIN = 'http://foddy.net'
+GAME_PAGE = '/Athletics.html'
+GAME_QUERY = 'webgl=true'  # selects the HTML5 version of the game
+GAME_VERSION = 'athletics-1'
+
+_FETCH_TIMEOUT = 30  # time in seconds given to foddy.net to send a file
+_MAX_AGE = 365 * 24 * 60 * 60  # time in seconds browsers may cache files without asking the server again
+
+
+class AssetCache(object):
+    def __init__(self, directory, origin=GAME_ORIGIN):
+        """ Initialize an AssetCache
+
+        Args:
+            directory (str or Path): directory holding the copies of the game's files
+            origin (str): scheme and host the files are fetched from when they have no copy yet
+        """
+        self.directory = Path(directory).resolve()
+        self.origin = origin
+        self.fetches = 0
+        self._files = dict()  # path -> (content, content type, etag) of the files read so far
+        self._lock = threading.Lock()  # guards the dictionaries and the count of fetches
+        self._path_locks = collections.defaultdict(threading.Lock)  # path -> lock held while the file is read
+
+    def _local_path(self, path):
+        """ Returns: Path: where the copy of the file at `path` is kept.  Raises ValueError outside the game """
+        relative = path.lstrip('/')
+        if relative == '' or relative.endswith('/'):
+            relative += 'index.html'
+        local_path = (self.directory / relative).resolve()
+        if self.directory not in local_path.parents:
+            raise ValueError(f'{path} is not a file of the game')
+        return local_path
+
+    def _fetch(self, path, local_path):
+        """ Download the file at `path` from the origin to `local_path` """
+        with urllib.request.urlopen(self.origin + urllib.parse.quote(path), timeout=_FETCH_TIMEOUT) as response:
+            content = response.read()
+        local_path.parent.mkdir(parents=True, exist_ok=True)
+        # write to a temporary file first, so that other processes never read a partial file
+        temporary_path = local_path.with_name(f'{local_path.name}.{os.getpid()}.tmp')
+        temporary_path.write_bytes(content)
+        os.replace(str(temporary_path), str(local_path))
+        with self._lock:
+            self.fetches += 1
+        logger.info(f'Saved a copy of {self.origin}{path}')
+
+    def get(self, path):
+        """ Read a file of the game, fetching it from the origin if it has no copy yet
+
+        Args:
+            path (str): path of the file on the origin, e.g. '/Athletics.html'
+
+        Returns:
+            (bytes, str, str): content, content type and entity tag of the file
+
+        """
+        with self._lock:
+            if path in self._files:
+                return self._files[path]
+            path_lock = self._path_locks[path]
+
+        # a fetch only holds up the requests for the same file
+        with path_lock:
+            with self._lock:
+                if path in self._files:
+                    return self._files[path]
+            local_path = self._local_path(path)
+            if not local_path.exists():
+                self._fetch(path, local_path)
+            content = local_path.read_bytes()
+            content_type = mimetypes.guess_type(local_path.name)[0] or 'application/octet-stream'
+            etag = f'"{hashlib.sha1(content).hexdigest()}"'
+            with self._lock:
+                self._files[path] = (content, content_type, etag)
+                del self._path_locks[path]
+            return content, content_type, etag
+
+
+class _AssetHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keeps connections open between requests
+    disable_nagle_algorithm = True  # headers and content are sent separately, and shouldn't wait for each other
+
+    def do_GET(self):
+        self._serve(send_content=True)
+
+    def do_HEAD(self):
+        self._serve(send_content=False)
+
+    def _serve(self, send_content):
+        url = urllib.parse.urlsplit(self.path)
+        path = url.path
+        try:
+            content, content_type, etag = self.server.cache.get(path)
+            warp = urllib.parse.parse_qs(url.query).get('warp')
+            if path == GAME_PAGE and warp is not None:
+                rate = float(warp[0])
+                content = inject_clock(content, rate)
+                etag = f'{etag[:-1]}-warp-{rate}"'
+        except urllib.error.HTTPError as error:
+            self.send_error(error.code)
+            return
+        except ValueError:
+            self.send_error(404)
+            return
+        except OSError as error:
+            logger.warning(f'Could not fetch {path}: {error}')
+            self.send_error(502)
+            return
+
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self._send_cache_headers(etag)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(content)))
+        self._send_cache_headers(etag)
+        self.end_headers()
+        if send_content:
+            self.wfile.write(content)
+
+    def _send_cache_headers(self, etag):
+        # copies never change for a given GAME_VERSION
+        self.send_header('Cache-Control', f'public, max-age={_MAX_AGE}, immutable')
+        self.send_header('ETag', etag)
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+
+class _ThreadingServer(socketserver.ThreadingMixIn, http.server.HTTPServer):
+    daemon_threads = True
+
+
+class AssetServer(object):
+    def __init__(self, cache, host='127.0.0.1', port=0):
+        """ Initialize an AssetServer
+        The server serves the files of an AssetCache over HTTP, with one thread per connection.
+
+        Args:
+            cache (AssetCache): the files to serve
+            host (str): address the server listens on
+            port (int): port the server listens on.  Defaults to any free port.
+        """
+        self.cache = cache
+        self.host = host
+        self.port = port
+        self._server = None
+
+    def start(self):
+        self._server = _ThreadingServer((self.host, self.port), _AssetHandler)
+        self._server.cache = self.cache
+        self.port = self._server.server_address[1]
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+
+    def game_url(self, time_warp=1):
+        """ URL of the game's page on the server, with a clock that runs `time_warp` times faster than real time """
+        url = f'http://{self.host}:{self.port}{GAME_PAGE}?{GAME_QUERY}'
+        if time_warp != 1:
+            url += f'&warp={time_warp}'
+        return url
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+_asset_server = None
+_asset_server_lock = threading.Lock()
+
+
+def get_asset_server():
+    """ Returns the AssetServer of the current process, which is started on first use """
+    global _asset_server
+    with _asset_server_lock:
+        if _asset_server is None:
+            _asset_server = AssetServer(AssetCache(storage.get(os.path.join('game', GAME_VERSION))))
+            _asset_server.start()
+        return _asset_server
+
+
+def stop_asset_server():
+    """ Stop the AssetServer of the current process, if it was started """
+    global _asset_server
+    with _asset_server_lock:
+        if _asset_server is not None:
+            _asset_server.stop()
+            _asset_server = None
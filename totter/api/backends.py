@@ -0,0 +1,93 @@
+""" Selection of the backend used to evaluate QWOP strategies
+
+Backends are imported lazily: the browser backend needs a display and a webdriver as soon as it is imported, which
+would prevent the headless simulator from running on machines without them.
+
+"""
+
+BROWSER = 'browser'
+SIM = 'sim'
+BACKENDS = (BROWSER, SIM)
+
+# evaluators kept open between trials, by backend and options
+_sessions = dict()
+
+
+def create_evaluator(time_limit, backend=BROWSER, **options):
+    """ Create an evaluator for the given backend
+
+    Args:
+        time_limit (float): time limit in seconds for each evaluation
+        backend (str): one of BACKENDS
+        **options:
+            extra arguments for the browser backend's QwopEvaluator, such as the number of lanes.
+            The simulator only uses `top_speed`.
+
+    Returns:
+        QwopEvaluator or SimulatedQwopEvaluator: evaluator that runs QwopStrategy objects
+
+    """
+    if backend == SIM:
+        from totter.api.simulation import SimulatedQwopEvaluator
+        sim_options = {name: options[name] for name in ('top_speed',) if name in options}
+        return SimulatedQwopEvaluator(time_limit=time_limit, **sim_options)
+    elif backend == BROWSER:
+        from totter.api.qwop import QwopEvaluator
+        return QwopEvaluator(time_limit=time_limit, **options)
+    else:
+        raise ValueError(f'Unknown backend {backend}.  Expected one of {BACKENDS}')
+
+
+def get_evaluator(time_limit, backend=BROWSER, **options):
+    """ Returns an evaluator for the given backend and options, which stays open until `stop` is called
+
+    Later calls with the same backend and options return the same evaluator, with its games still loaded, so that
+    trials after the first one don't start new browsers.  The evaluator's time limit is set to `time_limit` on every
+    call, so it should only be used by one algorithm at a time.
+
+    Args:
+        time_limit (float): time limit in seconds for each evaluation
+        backend (str): one of BACKENDS
+        **options: extra arguments of the evaluator.  See `create_evaluator`.
+
+    Returns:
+        QwopEvaluator or SimulatedQwopEvaluator: evaluator that runs QwopStrategy objects
+
+    """
+    key = (backend, tuple(sorted(options.items())))
+    evaluator = _sessions.get(key)
+    if evaluator is None:
+        evaluator = _sessions[key] = create_evaluator(time_limit, backend=backend, **options)
+    else:
+        evaluator.time_limit = time_limit
+    return evaluator
+
+
+def create_simulator(time_limit, backend=BROWSER):
+    """ Create a simulator for the given backend
+
+    Args:
+        time_limit (float): time limit in seconds for the simulation
+        backend (str): one of BACKENDS
+
+    Returns:
+        QwopSimulator or SimulatedQwopSimulator: simulator that runs a single QwopStrategy
+
+    """
+    if backend == SIM:
+        from totter.api.simulation import SimulatedQwopSimulator
+        return SimulatedQwopSimulator(time_limit=time_limit)
+    elif backend == BROWSER:
+        from totter.api.qwop import QwopSimulator
+        return QwopSimulator(time_limit=time_limit)
+    else:
+        raise ValueError(f'Unknown backend {backend}.  Expected one of {BACKENDS}')
+
+
+def stop(backend=BROWSER):
+    """ Shut down the evaluators returned by `get_evaluator` and any game instance opened by the given backend """
+    for key in [key for key in _sessions if key[0] == backend]:
+        _sessions.pop(key).close()
+    if backend == BROWSER:
+        from totter.api.qwop import stop_qwop
+        stop_qwop()
@@ -0,0 +1,55 @@
+""" Fitness bounds used to cut short evaluations whose result can't matter
+
+Some algorithms only use the fitness of an individual if it exceeds some bound, e.g. a cellular GA only keeps a child
+that is fitter than both of its parents.  A run whose distance so far, plus the distance it could still cover at the
+top speed of a runner, can't yield a fitness above that bound may be stopped right away: its result would be discarded
+either way.
+
+"""
+
+import math
+
+FINISH_LINE = 100  # metres.  Runs end when the runner crosses the finish line
+DEFAULT_TOP_SPEED = 5  # metres per second, comfortably above the speed of the fastest runners of the real game
+
+
+class FitnessBound(object):
+    def __init__(self, bound, fitness_function):
+        """ Initialize a FitnessBound
+
+        Fitness is assumed to grow with the distance run.  Run times are reported in whole seconds, so the best
+        fitness is searched over every whole second left before the time limit, and the second after it to allow for a
+        run that overshoots the limit.  Runs shorter than a second are not considered.
+
+        Args:
+            bound (float): fitness that a run must exceed for its evaluation to matter
+            fitness_function (function): function of the distance run and the run time that computes the fitness
+        """
+        self.bound = bound
+        self.fitness_function = fitness_function
+
+    def best_fitness(self, distance, elapsed, time_limit, top_speed=DEFAULT_TOP_SPEED):
+        """ Best fitness that a run can still achieve
+
+        Args:
+            distance (float): distance run so far
+            elapsed (float): time in seconds since the start of the run
+            time_limit (float): time limit in seconds of the run
+            top_speed (float): speed in metres per second above which no runner runs
+
+        Returns:
+            float: the best fitness that the run can achieve
+
+        """
+        best = None
+        for run_time in range(max(1, int(elapsed)), int(math.ceil(time_limit)) + 2):
+            # a run time of `run_time` seconds is reported until the next second starts
+            reachable = min(FINISH_LINE, distance + top_speed * max(0, run_time + 1 - elapsed))
+            fitness = self.fitness_function(max(distance, reachable), run_time)
+            if best is None or fitness > best:
+                best = fitness
+        return best
+
+    def can_exceed(self, distance, elapsed, time_limit, top_speed=DEFAULT_TOP_SPEED):
+        """ Whether a run can still exceed the bound.  See `best_fitness`. """
+        return self.best_fitness(distance, elapsed, time_limit, top_speed) > self.bound
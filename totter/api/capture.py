@@ -0,0 +1,168 @@
+""" Capture of QWOP frames for the image processor """
+
+import io
+import threading
+import time
+
+from PIL import Image, ImageGrab
+
+
+# position of the canvas on the screen in CSS pixels, and the number of device pixels per CSS pixel.
+# `mozInnerScreenX` and `mozInnerScreenY` are only defined by Firefox, so other browsers assume a window border that
+# is as wide on every side, and browser chrome that is entirely above the page
+_CANVAS_POSITION_SCRIPT = '''
+var rect = arguments[0].getBoundingClientRect();
+var x = window.mozInnerScreenX, y = window.mozInnerScreenY;
+if (x === undefined) {
+    x = window.screenX + (window.outerWidth - window.innerWidth) / 2;
+    y = window.screenY + window.outerHeight - window.innerHeight;
+}
+return [x + rect.left, y + rect.top, window.devicePixelRatio || 1];
+'''
+
+
+def _grab(display_name, bbox=None):
+    """ Capture part of a screen
+
+    Args:
+        display_name (str): name of an X display, or None for the screen totter was started on
+        bbox ((int, int, int, int)): left, upper, right, lower edges of the region to capture, or None for everything
+
+    Returns:
+        PIL.Image: the captured region
+
+    """
+    if display_name is None:
+        # pyautogui connects to the display when it is imported, so it is only imported once it's actually needed
+        import pyautogui
+        if bbox is None:
+            return pyautogui.screenshot()
+        left, upper, right, lower = bbox
+        return pyautogui.screenshot(region=(left, upper, right - left, lower - upper))
+    return ImageGrab.grab(bbox=bbox, xdisplay=display_name)
+
+
+def _to_bbox(bounding_box):
+    """ Convert a (left, top, width, height) bounding box into (left, upper, right, lower) edges """
+    left, top, width, height = bounding_box
+    return left, top, left + width, top + height
+
+
+class ScreenCapture(object):
+    def __init__(self, display_name=None):
+        """ Captures regions of a screen on demand
+
+        Args:
+            display_name (str): name of an X display, or None for the screen totter was started on
+
+        """
+        self.display_name = display_name
+
+    def grab(self, bounding_box):
+        """ Capture a region of the screen
+
+        Args:
+            bounding_box ((int, int, int, int)): left, top, width, height of the region
+
+        Returns:
+            PIL.Image: the captured region
+
+        """
+        return _grab(self.display_name, _to_bbox(bounding_box))
+
+    def invalidate(self):
+        """ Forget what is known about the game's page.  Screen captures know nothing about it. """
+        pass
+
+
+class SharedScreenCapture(object):
+    def __init__(self, display_name=None, max_age=0.05):
+        """ Captures a whole screen shared by several games and slices it into each game's frame
+
+        The screen is captured at most once every `max_age` seconds.  Games that ask for a frame in the meantime get a
+        crop of the latest capture, so one capture per tick serves every lane on the screen.
+
+        Args:
+            display_name (str): name of an X display, or None for the screen totter was started on
+            max_age (float): time in seconds for which a capture is reused
+
+        """
+        self.display_name = display_name
+        self.max_age = max_age
+        self.captures = 0
+        self._frame = None
+        self._frame_time = 0
+        self._lock = threading.Lock()
+
+    def grab(self, bounding_box):
+        """ Crop a region out of the latest capture of the screen, capturing the screen again if it's too old
+
+        Args:
+            bounding_box ((int, int, int, int)): left, top, width, height of the region
+
+        Returns:
+            PIL.Image: the captured region
+
+        """
+        with self._lock:
+            now = time.monotonic()
+            if self._frame is None or now - self._frame_time > self.max_age:
+                self._frame = _grab(self.display_name)
+                self._frame_time = now
+                self.captures += 1
+            frame = self._frame
+
+        return frame.crop(_to_bbox(bounding_box))
+
+    def invalidate(self):
+        """ Forget what is known about the game's page.  Screen captures know nothing about it. """
+        pass
+
+
+class CanvasCapture(object):
+    def __init__(self, browser):
+        """ Captures frames from the canvas the game is drawn on, through the browser's webdriver
+
+        The frames don't depend on the window being visible or unobstructed, so this works with headless browsers.
+
+        Args:
+            browser (selenium.webdriver.Remote): driver of the browser running the game
+
+        """
+        self.browser = browser
+        self._canvas = None
+        self._position = None  # position of the canvas on the screen, in device pixels
+
+    def invalidate(self):
+        """ Forget the canvas and its position, which belong to the page.  Called whenever the page is (re)loaded. """
+        self._canvas = None
+        self._position = None
+
+    def _canvas_position(self):
+        """ Returns: (int, int): left and top of the canvas on the screen, in device pixels """
+        if self._position is None:
+            left, top, ratio = self.browser.execute_script(_CANVAS_POSITION_SCRIPT, self._canvas)
+            self._position = (int(round(left * ratio)), int(round(top * ratio)))
+        return self._position
+
+    def grab(self, bounding_box):
+        """ Capture the game's canvas
+
+        The canvas is pasted, unscaled, into a blank frame the size of `bounding_box`, at the position it has in that
+        region of the screen, so that frames have the same geometry as captures of the screen.
+
+        Args:
+            bounding_box ((int, int, int, int)): left, top, width, height of the region of the screen used by the game
+
+        Returns:
+            PIL.Image: the captured frame
+
+        """
+        if self._canvas is None:
+            self._canvas = self.browser.find_element('tag name', 'canvas')
+        # element screenshots are taken by the browser's compositor, so they also work for WebGL canvases
+        canvas = Image.open(io.BytesIO(self._canvas.screenshot_as_png)).convert(mode='RGB')
+        left, top = self._canvas_position()
+        frame = Image.new('RGB', (bounding_box[2], bounding_box[3]))
+        frame.paste(canvas, (left - bounding_box[0], top - bounding_box[1]))
+        return frame
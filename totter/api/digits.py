@@ -0,0 +1,221 @@
+""" Template-matching recognizer for the distance shown at the top of the QWOP window
+
+The distance is drawn in a fixed font at a fixed position, so it can be read by cutting it into glyphs and comparing
+each glyph with a stored template of every character, which is far cheaper than running tesseract.
+Templates are learned from reads made by tesseract that agree with the segmentation, and are saved under the storage
+root so that later runs start with them.
+
+"""
+
+import atexit
+import os
+import re
+import tempfile
+import threading
+
+import numpy as np
+
+import totter.utils.storage as storage
+
+CHARACTERS = '0123456789.-'
+
+_INK_THRESHOLD = 200  # greyscale value above which a pixel is part of the (white) text
+_TEMPLATE_SHAPE = (16, 12)  # rows, columns of a normalized glyph
+_WORD_GAP = 0.35  # gaps between glyphs wider than this fraction of the line height separate words
+_ASPECT_WEIGHT = 0.5  # weight of the difference in width/height ratio when comparing glyphs
+_MAX_SAMPLES = 50  # templates are the mean of at most this many glyphs, so they keep adapting
+_SAVE_EVERY = 20  # number of reads learned between two saves of the templates
+_NUMBER_PATTERN = re.compile(r'^-?\d+(\.\d+)?$')
+
+
+def _segment(image):
+    """ Cut the first word of a line of text into glyphs
+
+    Args:
+        image (PIL.Image or np.ndarray): greyscale image of white text on a darker background
+
+    Returns:
+        (list<np.ndarray>, int): boolean bitmap of each glyph of the first word, and the height of the line
+
+    """
+    pixels = np.asarray(image) > _INK_THRESHOLD
+    rows = np.flatnonzero(pixels.any(axis=1))
+    if len(rows) == 0:
+        return list(), 0
+    line = pixels[rows[0]:rows[-1] + 1]
+    height = line.shape[0]
+
+    # glyphs are runs of columns containing ink
+    edges = np.diff(np.concatenate(([0], line.any(axis=0).astype(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    glyphs = list()
+    for index, (start, end) in enumerate(zip(starts, ends)):
+        if index > 0 and start - ends[index - 1] > height * _WORD_GAP:
+            break
+        glyphs.append(line[:, start:end])
+    return glyphs, height
+
+
+def _normalize(glyphs, height):
+    """ Scale glyphs to the template shape
+
+    Glyphs keep their position within the line, so that e.g. the decimal point and the minus sign differ.
+
+    Returns:
+        (np.ndarray, np.ndarray): array of shape (glyphs, rows, columns) of bitmaps, and the width/height ratio of each
+
+    """
+    rows, columns = _TEMPLATE_SHAPE
+    row_index = ((np.arange(rows) + 0.5) * height / rows).astype(int)
+    bitmaps = np.empty((len(glyphs), rows, columns), dtype=np.float32)
+    aspects = np.empty(len(glyphs), dtype=np.float32)
+    for index, glyph in enumerate(glyphs):
+        width = glyph.shape[1]
+        column_index = ((np.arange(columns) + 0.5) * width / columns).astype(int)
+        bitmaps[index] = glyph[np.ix_(row_index, column_index)]
+        aspects[index] = width / height
+    return bitmaps, aspects
+
+
+class DigitRecognizer(object):
+    def __init__(self, path=None, min_similarity=0.9):
+        """ Initialize a DigitRecognizer
+
+        Args:
+            path (str or Path): file in which templates are saved, or None to keep them in memory only
+            min_similarity (float):
+                similarity between 0 and 1 below which a glyph is considered unrecognized.  Reads containing an
+                unrecognized glyph return None, so that the caller can fall back to tesseract.
+        """
+        self.path = path
+        self.min_similarity = min_similarity
+        self.samples = dict()  # character -> (mean bitmap, mean aspect, number of samples)
+        self.reads = 0
+        self.rejections = 0
+        self._unsaved = 0  # number of reads learned since the templates were last saved
+        self._table = None  # (characters, bitmaps, aspects) of the templates, stacked for matching
+        self._lock = threading.Lock()
+        if path is not None and os.path.exists(path):
+            self._load()
+
+    def _load(self):
+        with np.load(self.path) as saved:
+            for character, bitmap, aspect, count in zip(saved['characters'], saved['bitmaps'],
+                                                        saved['aspects'], saved['counts']):
+                self.samples[str(character)] = (bitmap, float(aspect), int(count))
+        self._build_table()
+
+    def save(self):
+        """ Write the templates to `path` """
+        with self._lock:
+            self._save()
+
+    def _save(self):
+        """ Body of `save`.  The caller holds the lock. """
+        self._unsaved = 0
+        if self.path is None or len(self.samples) == 0:
+            return
+        characters = sorted(self.samples)
+        bitmaps, aspects, counts = zip(*(self.samples[character] for character in characters))
+        # write to a temporary file first, so that other processes never load a partial file.  Its name is unique, so
+        # that processes saving at the same time don't write to the same file
+        directory, name = os.path.split(str(self.path))
+        with tempfile.NamedTemporaryFile(dir=directory or '.', prefix=f'{name}.', suffix='.tmp', delete=False) as file:
+            np.savez(file, characters=np.array(characters), bitmaps=np.array(bitmaps), aspects=np.array(aspects),
+                     counts=np.array(counts))
+        os.replace(file.name, str(self.path))
+
+    def _build_table(self):
+        characters = sorted(self.samples)
+        bitmaps = np.array([self.samples[character][0] for character in characters], dtype=np.float32)
+        aspects = np.array([self.samples[character][1] for character in characters], dtype=np.float32)
+        self._table = (characters, bitmaps, aspects)
+
+    def knows_all_characters(self):
+        """ Whether there is a template for every character that the distance can contain """
+        return all(character in self.samples for character in CHARACTERS)
+
+    def read(self, image):
+        """ Read the number at the start of a line of text
+
+        Args:
+            image (PIL.Image or np.ndarray): greyscale image of the text
+
+        Returns:
+            float: the number, or None if a glyph couldn't be matched confidently
+
+        """
+        table = self._table
+        glyphs, height = _segment(image)
+        if table is None or len(glyphs) == 0:
+            return None
+
+        characters, templates, template_aspects = table
+        bitmaps, aspects = _normalize(glyphs, height)
+        # distance between every glyph and every template
+        distances = np.abs(bitmaps[:, np.newaxis] - templates[np.newaxis]).mean(axis=(2, 3))
+        distances += _ASPECT_WEIGHT * np.abs(aspects[:, np.newaxis] - template_aspects[np.newaxis])
+        best = distances.argmin(axis=1)
+        similarities = 1 - distances[np.arange(len(glyphs)), best]
+
+        self.reads += 1
+        if similarities.min() < self.min_similarity:
+            self.rejections += 1
+            return None
+        try:
+            return float(''.join(characters[index] for index in best))
+        except ValueError:
+            self.rejections += 1
+            return None
+
+    def learn(self, image, text):
+        """ Add the glyphs of a line of text read by some other means to the templates
+
+        Nothing is learned unless the text is a number with as many characters as there are glyphs in the first word.
+
+        Args:
+            image (PIL.Image or np.ndarray): greyscale image of the text
+            text (str): the number at the start of the text
+
+        Returns:
+            bool: whether the glyphs were learned
+
+        """
+        glyphs, height = _segment(image)
+        if not _NUMBER_PATTERN.match(text) or len(glyphs) != len(text):
+            return False
+
+        bitmaps, aspects = _normalize(glyphs, height)
+        with self._lock:
+            new_character = any(character not in self.samples for character in text)
+            for character, bitmap, aspect in zip(text, bitmaps, aspects):
+                if character in self.samples:
+                    mean_bitmap, mean_aspect, count = self.samples[character]
+                    count = min(count + 1, _MAX_SAMPLES)
+                    bitmap = mean_bitmap + (bitmap - mean_bitmap) / count
+                    aspect = mean_aspect + (aspect - mean_aspect) / count
+                else:
+                    count = 1
+                self.samples[character] = (bitmap, float(aspect), count)
+            self._build_table()
+            # templates are saved in batches, and right away when they gain a character
+            self._unsaved += 1
+            if new_character or self._unsaved >= _SAVE_EVERY:
+                self._save()
+        return True
+
+
+_hud_recognizer = None
+_hud_recognizer_lock = threading.Lock()
+
+
+def get_hud_recognizer():
+    """ Returns the DigitRecognizer for the distance at the top of the window, shared by every ImageProcessor """
+    global _hud_recognizer
+    with _hud_recognizer_lock:
+        if _hud_recognizer is None:
+            _hud_recognizer = DigitRecognizer(path=storage.get('templates') / 'hud_digits.npz')
+            # the reads learned since the last batch are saved on exit
+            atexit.register(_hud_recognizer.save)
+        return _hud_recognizer
@@ -0,0 +1,160 @@
+""" Virtual X displays for running QWOP instances on machines without a monitor
+
+Each evaluation lane can be given its own Xvfb server, so that its browser, screenshots and keystrokes are isolated from
+every other lane.
+
+"""
+
+import logging
+import os
+import subprocess
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+_X11_SOCKET_DIR = '/tmp/.X11-unix'
+_FIRST_DISPLAY_NUMBER = 100
+
+
+class VirtualDisplay(object):
+    def __init__(self, number, width, height, depth=24):
+        """ Initialize a VirtualDisplay
+        A VirtualDisplay is an Xvfb server with a single screen of the given size.  It isn't started until `start` is called.
+
+        Args:
+            number (int): X display number, e.g. 100 for display `:100`
+            width (int): width of the screen in pixels
+            height (int): height of the screen in pixels
+            depth (int): color depth of the screen
+        """
+        self.number = number
+        self.width = width
+        self.height = height
+        self.depth = depth
+        self.process = None
+
+    @property
+    def name(self):
+        """ Name of the display, suitable for the DISPLAY environment variable """
+        return f':{self.number}'
+
+    def is_running(self):
+        return self.process is not None and self.process.poll() is None
+
+    def start(self, timeout=10):
+        """ Starts the Xvfb server and waits until it accepts connections
+
+        Args:
+            timeout (float): time in seconds to wait for the server to come up
+
+        Returns: None
+
+        """
+        if self.is_running():
+            return
+
+        self.process = subprocess.Popen(
+            ['Xvfb', self.name, '-screen', '0', f'{self.width}x{self.height}x{self.depth}', '-nolisten', 'tcp'],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL
+        )
+
+        # the server is ready once it has created its socket
+        socket_path = os.path.join(_X11_SOCKET_DIR, f'X{self.number}')
+        deadline = time.monotonic() + timeout
+        while not os.path.exists(socket_path):
+            if not self.is_running():
+                raise RuntimeError(f'Xvfb exited while starting display {self.name}')
+            if time.monotonic() > deadline:
+                self.stop()
+                raise RuntimeError(f'Timed out waiting for display {self.name} to start')
+            time.sleep(0.05)
+
+    def stop(self):
+        """ Stops the Xvfb server """
+        if self.process is not None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+                self.process.wait()
+            self.process = None
+
+
+class DisplayManager(object):
+    def __init__(self, check_interval=1):
+        """ Initialize a DisplayManager
+        The DisplayManager hands out VirtualDisplays on unused display numbers and restarts any of them whose Xvfb
+        server dies unexpectedly.
+
+        Args:
+            check_interval (float): time in seconds between checks on the displays
+        """
+        self.check_interval = check_interval
+        self.displays = set()
+        self._lock = threading.Lock()
+        self._supervisor = None
+
+    def _is_free(self, number):
+        """ A display number is free if no X server holds its lock file or socket """
+        return not (os.path.exists(f'/tmp/.X{number}-lock')
+                    or os.path.exists(os.path.join(_X11_SOCKET_DIR, f'X{number}')))
+
+    def create(self, width, height):
+        """ Create and start a VirtualDisplay on the first free display number
+
+        Args:
+            width (int): width of the screen in pixels
+            height (int): height of the screen in pixels
+
+        Returns:
+            VirtualDisplay: the running display
+
+        """
+        with self._lock:
+            number = _FIRST_DISPLAY_NUMBER
+            taken = {display.number for display in self.displays}
+            while number in taken or not self._is_free(number):
+                number += 1
+            display = VirtualDisplay(number, width, height)
+            display.start()
+            self.displays.add(display)
+
+            if self._supervisor is None:
+                self._supervisor = threading.Thread(target=self._supervise, daemon=True)
+                self._supervisor.start()
+
+        return display
+
+    def release(self, display):
+        """ Stop `display` and stop supervising it """
+        with self._lock:
+            self.displays.discard(display)
+        display.stop()
+
+    def stop_all(self):
+        """ Stop every display created by the manager """
+        with self._lock:
+            displays = list(self.displays)
+            self.displays.clear()
+        for display in displays:
+            display.stop()
+
+    def _supervise(self):
+        """ Restarts displays whose server has died """
+        while True:
+            time.sleep(self.check_interval)
+            with self._lock:
+                for display in self.displays:
+                    if not display.is_running():
+                        logger.warning(f'Display {display.name} died.  Restarting it.')
+                        try:
+                            display.start()
+                        except RuntimeError as error:
+                            logger.error(str(error))
+
+
+# displays used by the evaluation lanes
+display_manager = DisplayManager()
@@ -0,0 +1,136 @@
+""" Detection of steady gaits, to end runs whose outcome can be extrapolated
+
+Phenotypes repeat the same keystrokes until the game ends, so a runner that settles into a gait repeats the same
+motion with a fixed period.  Its distance then grows by the same amount every cycle, and the rest of the run can be
+extrapolated from its speed instead of being played until the time limit.
+The period is found by autocorrelation of the runner's velocity, and the gait is considered steady once the distance
+gained during each of the last few cycles is about the same.
+
+"""
+
+import collections
+
+import numpy as np
+
+from totter.api.bounds import FINISH_LINE
+
+
+class RunResult(collections.namedtuple('RunResult', ['distance', 'run_time'])):
+    """ Distance run and time taken by a run, which unpack like a (distance, time) pair
+
+    `estimated` is set when they were extrapolated from the first part of the run rather than measured.
+    """
+
+    def __new__(cls, distance, run_time, estimated=False):
+        result = super().__new__(cls, distance, run_time)
+        result.estimated = estimated
+        return result
+
+
+class GaitTracker(object):
+    def __init__(self, stable_cycles=3, min_period=0.5, max_period=4, resolution=0.05, tolerance=0.1,
+                 min_correlation=0.5, check_interval=0.5):
+        """ Initialize a GaitTracker
+
+        Args:
+            stable_cycles (int): number of cycles in a row that must gain about the same distance
+            min_period (float): shortest period in seconds of a gait
+            max_period (float): longest period in seconds of a gait
+            resolution (float): time in seconds between the samples of the distance trace used to find the period
+            tolerance (float): largest difference between the gains of two cycles, as a fraction of their mean gain
+            min_correlation (float): autocorrelation of the velocity at the period below which there is no gait
+            check_interval (float): time in seconds between two searches for a steady gait
+        """
+        self.stable_cycles = stable_cycles
+        self.min_period = min_period
+        self.max_period = max_period
+        self.resolution = resolution
+        self.tolerance = tolerance
+        self.min_correlation = min_correlation
+        self.check_interval = check_interval
+        self.reset()
+
+    def reset(self):
+        self.times = list()
+        self.distances = list()
+        self.period = None
+        self.speed = None  # metres per second of the steady gait, or None if the gait isn't steady
+        self._last_check = 0
+
+    def update(self, elapsed, distance):
+        """ Add a distance to the trace
+
+        Args:
+            elapsed (float): time in seconds since the start of the run
+            distance (float): distance run so far
+
+        Returns:
+            bool: whether the runner has a steady gait
+
+        """
+        self.times.append(elapsed)
+        self.distances.append(distance)
+        if elapsed - self._last_check >= self.check_interval:
+            self._last_check = elapsed
+            self.period, self.speed = self._analyze()
+        return self.speed is not None
+
+    def _find_period(self, times, distances):
+        """ Returns: float: period in seconds of the velocity over the last cycles, or None if it isn't periodic """
+        window = self.max_period * (self.stable_cycles + 1)
+        grid = np.arange(times[-1] - window, times[-1], self.resolution)
+        velocity = np.diff(np.interp(grid, times, distances))
+        velocity -= velocity.mean()
+
+        best_lag, best_correlation = None, self.min_correlation
+        correlations = dict()
+        for lag in range(int(self.min_period / self.resolution), int(self.max_period / self.resolution) + 1):
+            early, late = velocity[:-lag], velocity[lag:]
+            energy = np.sqrt(np.dot(early, early) * np.dot(late, late))
+            correlations[lag] = np.dot(early, late) / energy if energy > 0 else 0
+            if correlations[lag] > best_correlation:
+                best_lag, best_correlation = lag, correlations[lag]
+        if best_lag is None:
+            return None
+        # multiples of the period correlate as well as the period itself, so prefer the first peak that does
+        for lag, correlation in sorted(correlations.items()):
+            if correlation >= 0.9 * best_correlation and correlation >= correlations.get(lag + 1, correlation):
+                return lag * self.resolution
+        return best_lag * self.resolution
+
+    def _analyze(self):
+        """ Returns: (float, float): period and speed of the steady gait, or (None, None) if there is none """
+        times = np.array(self.times)
+        distances = np.array(self.distances)
+        if times[-1] - times[0] < self.max_period * (self.stable_cycles + 1):
+            return None, None
+
+        period = self._find_period(times, distances)
+        if period is None:
+            return None, None
+
+        # distance at the boundaries of the last cycles
+        boundaries = times[-1] - period * np.arange(self.stable_cycles, -1, -1)
+        gains = np.diff(np.interp(boundaries, times, distances))
+        if gains.min() <= 0 or gains.max() - gains.min() > self.tolerance * gains.mean():
+            return None, None
+        return period, gains.sum() / (period * self.stable_cycles)
+
+    def extrapolate(self, distance, elapsed, time_limit):
+        """ Extrapolate the outcome of a run with a steady gait
+
+        The runner is assumed to keep its speed until it crosses the finish line or reaches the time limit.
+
+        Args:
+            distance (float): distance run so far
+            elapsed (float): time in seconds since the start of the run
+            time_limit (float): time limit in seconds of the run
+
+        Returns:
+            (float, float): distance run, time taken
+
+        """
+        remaining = max(0, time_limit - elapsed)
+        if distance + self.speed * remaining >= FINISH_LINE:
+            return FINISH_LINE, float(elapsed + (FINISH_LINE - distance) / self.speed)
+        return float(distance + self.speed * remaining), time_limit
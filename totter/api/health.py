@@ -0,0 +1,206 @@
+""" Health checks of the browsers running QWOP
+
+Long experiments keep each browser open for hours.  Over that time a browser may grow in memory, slow down, stop
+drawing frames because it lost focus, or stop responding altogether, and runs played in such a browser report
+distances and times that have nothing to do with the strategy.
+A BrowserMonitor measures the health of a game's browser:
+    - the latency of a round trip through the webdriver
+    - the frame rate of the page, counted by an animation loop installed into it
+    - the memory used by the browser and its content processes, if psutil is installed
+A Watchdog uses the monitor to watch a game while it runs.  It kills a browser that stops responding, so that no
+thread stays blocked on it, and reports runs during which the browser stopped drawing frames.
+
+"""
+
+import collections
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+import os
+import signal
+import threading
+import time
+
+try:
+    import psutil
+except ImportError:
+    # memory use is then not checked
+    psutil = None
+
+# counts the frames drawn by the page.  The counter is installed on first use, and again after the page is reloaded
+_FRAMES_SCRIPT = '''
+if (!window.__totterFrames) {
+    var frames = window.__totterFrames = {count: 0};
+    var count = function () {
+        frames.count += 1;
+        window.requestAnimationFrame(count);
+    };
+    window.requestAnimationFrame(count);
+}
+return window.__totterFrames.count;
+'''
+
+_MEGABYTE = 1024 * 1024
+
+HealthCheck = collections.namedtuple('HealthCheck', ['latency', 'frame_rate', 'memory'])
+
+
+class BrowserFailure(Exception):
+    """ Raised when a run is lost because its browser crashed, hung or stopped drawing frames """
+    pass
+
+
+class BrowserMonitor(object):
+    def __init__(self, game, max_latency=1, min_frame_rate=20, max_memory=2048):
+        """ Initialize a BrowserMonitor
+
+        Args:
+            game (QwopGame): the game whose browser is monitored
+            max_latency (float): time in seconds above which a round trip through the webdriver is too slow
+            min_frame_rate (float):
+                frames per second of game time below which the page is considered throttled.  For games that run
+                faster than real time, the frames counted are the game's steps.
+            max_memory (float): memory in megabytes above which the browser should be replaced
+        """
+        self.game = game
+        self.max_latency = max_latency
+        self.min_frame_rate = min_frame_rate
+        self.max_memory = max_memory
+        self._last_count = None
+        self._last_time = None
+
+    def restart(self):
+        """ Forget the frames counted so far, so that the next frame rate is measured from the next check on """
+        self._last_count = None
+        self._last_time = None
+
+    def check(self):
+        """ Measure the health of the browser
+
+        Returns:
+            HealthCheck:
+                latency in seconds, frames per second since the previous check and memory in megabytes.
+                The frame rate is None on the first check, and the memory None if it can't be measured.
+        """
+        start = time.perf_counter()
+        count = self.game.browser.execute_script(_FRAMES_SCRIPT)
+        now = time.perf_counter()
+        frame_rate = None
+        if self._last_count is not None and count >= self._last_count and now > self._last_time:
+            frame_rate = (count - self._last_count) / (now - self._last_time) / self.game.time_warp
+        self._last_count, self._last_time = count, now
+        return HealthCheck(now - start, frame_rate, self.memory())
+
+    def problems(self, check):
+        """ Returns: list<str>: descriptions of the ways in which `check` shows a slow or bloated browser """
+        problems = list()
+        if check.latency > self.max_latency:
+            problems.append(f'round trips took {check.latency:.2f} s')
+        if check.memory is not None and check.memory > self.max_memory:
+            problems.append(f'it used {check.memory:.0f} MB')
+        return problems
+
+    def is_throttled(self, check):
+        """ Whether `check` shows a page drawing fewer frames than it should """
+        return check.frame_rate is not None and check.frame_rate < self.min_frame_rate
+
+    def _process(self):
+        """ Returns: int: process id of the browser, or None if it isn't known """
+        if self.game.browser is None:
+            return None
+        return self.game.browser.capabilities.get('moz:processID')
+
+    def memory(self):
+        """ Returns: float: megabytes of memory used by the browser and its child processes, or None """
+        pid = self._process()
+        if psutil is None or pid is None:
+            return None
+        try:
+            process = psutil.Process(pid)
+            processes = [process] + process.children(recursive=True)
+            return sum(process.memory_info().rss for process in processes) / _MEGABYTE
+        except psutil.Error:
+            return None
+
+    def kill(self):
+        """ Kill the browser, which makes pending webdriver commands fail instead of waiting for it """
+        pid = self._process()
+        if pid is None:
+            return
+        try:
+            os.kill(pid, getattr(signal, 'SIGKILL', signal.SIGTERM))
+        except OSError:
+            pass
+
+
+class Watchdog(object):
+    def __init__(self, monitor, interval=1, hang_timeout=10, slow_checks=3):
+        """ Initialize a Watchdog
+
+        Args:
+            monitor (BrowserMonitor): monitor of the watched game
+            interval (float): time in seconds between two checks of the browser
+            hang_timeout (float): time in seconds after which a browser that hasn't answered a check is killed
+            slow_checks (int): number of checks in a row with a low frame rate after which the run is lost
+        """
+        self.monitor = monitor
+        self.interval = interval
+        self.hang_timeout = hang_timeout
+        self.slow_checks = slow_checks
+        self.failure = None  # why the watched run was lost, or None
+        self.problems = list()  # ways in which the browser was slow or bloated at the last check that found any
+        self._checker = ThreadPoolExecutor(max_workers=1)
+        self._thread = None
+
+    def responsive(self):
+        """ Check that the browser answers within `hang_timeout`, and kill it if it doesn't
+
+        Returns:
+            bool: whether the browser answered
+        """
+        try:
+            self._checker.submit(self.monitor.check).result(timeout=self.hang_timeout)
+            return True
+        except TimeoutError:
+            self.monitor.kill()
+            return False
+        except Exception:
+            # the browser crashed or was closed
+            return False
+
+    def start(self, stop_event):
+        """ Watch the game until `stop_event` is set.  The event is set as soon as the run is lost. """
+        self.failure = None
+        self.problems = list()
+        self.monitor.restart()
+        self._thread = threading.Thread(target=self._watch, args=(stop_event,), daemon=True)
+        self._thread.start()
+
+    def join(self):
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _watch(self, stop_event):
+        slow = 0
+        while not stop_event.wait(self.interval):
+            try:
+                check = self._checker.submit(self.monitor.check).result(timeout=self.hang_timeout)
+            except TimeoutError:
+                self.failure = f'the browser did not respond for {self.hang_timeout} s'
+                self.monitor.kill()
+                break
+            except Exception as error:
+                self.failure = f'the browser failed: {error}'
+                break
+            if self.monitor.is_throttled(check):
+                slow += 1
+                if slow >= self.slow_checks:
+                    self.failure = f'the page drew {check.frame_rate:.1f} frames per second'
+                    break
+            else:
+                slow = 0
+            self.problems = self.monitor.problems(check) or self.problems
+        if self.failure is not None:
+            stop_event.set()
+
+    def close(self):
+        self._checker.shutdown(wait=False)
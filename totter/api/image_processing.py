@@ -1,12 +1,23 @@
 """ Functions to process QWOP images and extract game information """
 
 import collections
-import pytesseract
+import threading
+import time
+
+import numpy as np
+from PIL import Image
+
+from totter.api.digits import get_hud_recognizer
+from totter.api.ocr import get_engine
+from totter.api.ocr_cache import get_hud_cache
+from totter.api.posture import KNEELING_FRACTION, LYING_FRACTION, PostureDetector
 
 # colors will be considered identical if the Euclidean distance between them is less than this epsilon
 _COLOR_EQUALITY_EPSILON = 5
 _END_BOX_POSITION = (180, 265)  # position of some whitespace in the game-over screen
 _END_BOX_COLOR = (237, 237, 237)  # off-white color of the background of the game-over screen
+# time in seconds between two tesseract reads of frames that a recognizer knowing every character couldn't read
+_FALLBACK_INTERVAL = 1
 
 # box for the current distance measure at the top of the window
 _CURRENT_DISTANCE_BOX = (225, 125, 460, 160)  # left, upper, right, lower
@@ -15,15 +26,41 @@ _FINAL_DISTANCE_BOX = (200, 255, 481, 387)
 
 
 def _colors_equal(color1, color2):
-    sq_distance = 0
-    for idx, val in enumerate(color1):
-        sq_distance += (val - color2[idx])**2
+    """ Compare two colors, or arrays of colors with their channels along the last axis """
+    if isinstance(color1, tuple):
+        # a single pixel, as returned by PIL.  NumPy's overhead would outweigh the arithmetic.  Extra channels of
+        # `color1`, like alpha, are ignored
+        sq_distance = 0
+        for idx, val in enumerate(color2):
+            sq_distance += (color1[idx] - val)**2
+        return sq_distance < _COLOR_EQUALITY_EPSILON**2
+    difference = np.asarray(color1, dtype=np.int32) - np.asarray(color2, dtype=np.int32)
+    return (difference ** 2).sum(axis=-1) < _COLOR_EQUALITY_EPSILON**2
+
+
+# greyscale lookup table that turns the (pure white) final distance text black and everything else white
+_WHITE_TEXT_TABLE = np.where(_colors_equal(np.arange(256)[:, np.newaxis], (255, )), 0, 255).tolist()
+
+
+def _greyscale(screenshot, box):
+    """ Crop a box out of a screenshot as a greyscale array
+
+    Only the box is converted to an array: copying a whole frame out of PIL costs more than the analysis itself.
 
-    return sq_distance < _COLOR_EQUALITY_EPSILON**2
+    Args:
+        screenshot (PIL.Image): the screenshot
+        box ((int, int, int, int)): left, upper, right, lower edges of the box
+
+    Returns:
+        np.ndarray: uint8 array of shape (lower - upper, right - left)
+
+    """
+    return np.asarray(screenshot.crop(box).convert(mode='L'))
 
 
 class ImageProcessor(object):
-    def __init__(self, buffer_size=0):
+    def __init__(self, buffer_size=0, recognizer=None, cache=None, fall_confidence=None, lying_fraction=LYING_FRACTION,
+                 kneeling_fraction=KNEELING_FRACTION):
         """ Initialize an ImageProcessor
 
         `ImageProcessor`s analyze QWOP screenshots and use visual features to determine how far the player has run
@@ -31,51 +68,136 @@ class ImageProcessor(object):
 
         The game ends if the game-over screen appears, or if the distance achieved has stayed the same for the last
          `buffer_size` frames.
+        One thread may update the processor while others check whether the game is over.
 
         Args:
             buffer_size (int):
                 number of identical-distance frames before game_over becomes true.
                 If this is zero, then the stagnation check will not be performed.
+            recognizer (DigitRecognizer):
+                reads the current distance, falling back to tesseract when it isn't confident.  See `_read_distance`.
+                Defaults to a recognizer shared by every ImageProcessor, whose templates are saved under the storage
+                root.
+            cache (OcrCache):
+                distances read from earlier frames, keyed by the content of the distance box.
+                Defaults to a cache shared by every ImageProcessor in the process.
+            fall_confidence (float):
+                if given, the game also ends once a PostureDetector is this confident that the runner has fallen, or
+                is stuck on its knees.  See PostureDetector.
+            lying_fraction (float):
+                height of a lying runner, as a fraction of its standing height.  See PostureDetector.
+            kneeling_fraction (float): height of a kneeling runner, as a fraction of its standing height
         """
         self.latest = None
+        self.latest_distance_read = False  # whether the distance could be read from the latest screenshot
         self.current_distance = 0
         self.game_over = False
         self.buffer_size = buffer_size
         self.historical_distances = collections.deque(maxlen=buffer_size)
+        self.recognizer = recognizer if recognizer is not None else get_hud_recognizer()
+        self.cache = cache if cache is not None else get_hud_cache()
+        self._last_fallback = None  # time of the last tesseract read, once the recognizer knew every character
+        self.posture = None
+        if fall_confidence is not None:
+            self.posture = PostureDetector(confidence_threshold=fall_confidence, lying_fraction=lying_fraction,
+                                           kneeling_fraction=kneeling_fraction)
+        self._lock = threading.Lock()
 
     def reset(self):
-        self.latest = None
-        self.current_distance = 0
-        self.game_over = False
-
-    def update(self, screenshot):
-        self.latest = screenshot
-        # determine distance run so far
-        distance_screenshot = screenshot.crop(_CURRENT_DISTANCE_BOX).convert(mode='L')  # convert to greyscale
-        distance_text = pytesseract.image_to_string(distance_screenshot)  # should be something like 'x metres'
-        tokens = distance_text.split()
+        with self._lock:
+            self.latest = None
+            self.latest_distance_read = False
+            self.current_distance = 0
+            self.game_over = False
+            if self.posture is not None:
+                self.posture.reset()
+
+    def _parse_distance(self, distance_screenshot, distance_text):
+        """ Parse the text read by tesseract from the distance box, or return None if it isn't a distance """
+        tokens = distance_text.split()  # should be something like ['x', 'metres']
         if len(tokens) > 1:
             try:
-                self.current_distance = float(tokens[0])  # try to parse the first token as a number
-                self.historical_distances.append(self.current_distance)
+                distance = float(tokens[0])  # try to parse the first token as a number
+                # tesseract's read teaches the recognizer any glyphs it doesn't know yet
+                self.recognizer.learn(distance_screenshot, tokens[0])
+                return distance
             except ValueError:
                 pass
+        return None
+
+    def _read_distance(self, distance_screenshot):
+        """ Read the distance at the top of the window, or return None if it can't be read
+
+        Tesseract is tried whenever the recognizer isn't confident.  Once the recognizer knows every character, it is
+        only tried once every `_FALLBACK_INTERVAL` seconds: frames it can't read are then mostly frames caught in the
+        middle of a redraw, but the reads that do succeed keep correcting a template that was learned wrong.
+        """
+        distance = self.recognizer.read(distance_screenshot)
+        if distance is None and self._may_fall_back():
+            distance_text = get_engine().recognize(Image.fromarray(distance_screenshot))
+            distance = self._parse_distance(distance_screenshot, distance_text)
+        return distance
+
+    def _may_fall_back(self):
+        """ Whether a frame that the recognizer couldn't read should be read by tesseract """
+        if not self.recognizer.knows_all_characters():
+            return True
+        now = time.monotonic()
+        if self._last_fallback is not None and now - self._last_fallback < _FALLBACK_INTERVAL:
+            return False
+        self._last_fallback = now
+        return True
 
-        # determine if the game is over
+    def update(self, screenshot):
+        # determine distance run so far.  The screenshot is read before taking the lock, so that checks of the
+        # game-over state don't wait for text recognition
+        distance_screenshot = _greyscale(screenshot, _CURRENT_DISTANCE_BOX)
+        cached, distance = self.cache.lookup(distance_screenshot)
+        if not cached:
+            distance = self._read_distance(distance_screenshot)
+            self.cache.store(distance_screenshot, distance)
         # check if the game over screen is up
-        self.game_over = _colors_equal(self.latest.getpixel(_END_BOX_POSITION), _END_BOX_COLOR)
-        # check if the game has "stagnated" (distance hasn't changed in the last buffer_size checks)
-        if 0 < self.buffer_size <= len(self.historical_distances):
-            self.game_over = all(dist == self.historical_distances[0] for dist in self.historical_distances) or self.game_over
+        end_box_visible = _colors_equal(screenshot.getpixel(_END_BOX_POSITION), _END_BOX_COLOR)
+
+        with self._lock:
+            self.latest = screenshot
+            self.latest_distance_read = distance is not None
+            if distance is not None:
+                self.current_distance = distance
+                self.historical_distances.append(self.current_distance)
+
+            # determine if the game is over
+            self.game_over = end_box_visible
+            # check if the game has "stagnated" (distance hasn't changed in the last buffer_size checks)
+            if 0 < self.buffer_size <= len(self.historical_distances):
+                self.game_over = all(dist == self.historical_distances[0] for dist in self.historical_distances) or self.game_over
+            # check if the runner is down
+            if self.posture is not None:
+                self.game_over = self.posture.update(screenshot, self.current_distance) or self.game_over
 
     def is_game_over(self):
         return self.game_over
 
     def get_final_distance(self):
+        with self._lock:
+            return self._get_final_distance()
+
+    def _get_final_distance(self):
+        if self.latest is None:
+            # no frame was processed during the run
+            return self.current_distance
         text_screenshot = self.latest.crop(_FINAL_DISTANCE_BOX).convert(mode='L')
         # filter out everything except the distance text (which is pure white)
-        text_screenshot = text_screenshot.point(lambda pixel: 0 if _colors_equal((pixel,), (255, )) else 255)
-        text = pytesseract.image_to_string(text_screenshot)
+        text_screenshot = text_screenshot.point(_WHITE_TEXT_TABLE)
+        if self.latest_distance_read:
+            text = get_engine().recognize(text_screenshot, single_line=False)
+        else:
+            # read the distance at the top of the window again along with the final distance, in the same batch
+            distance_screenshot = _greyscale(self.latest, _CURRENT_DISTANCE_BOX)
+            text, distance_text = get_engine().recognize_batch([text_screenshot, Image.fromarray(distance_screenshot)])
+            distance = self._parse_distance(distance_screenshot, distance_text)
+            if distance is not None:
+                self.current_distance = distance
         tokens = text.split()
         try:
             distance_value_idx = tokens.index('metres') - 1  # the distance will preceed the word 'metres'
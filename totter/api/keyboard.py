@@ -0,0 +1,285 @@
+""" Keyboard backends used by QWOP phenotypes
+
+Phenotypes press keys through the module-level `key_down`, `key_up` and `sleep` functions instead of calling pyautogui
+directly.  Each call is dispatched to the Keyboard that is active on the calling thread, so the same phenotype can play
+the browser game or drive the headless simulator.
+A keyboard can be activated along with an interrupt event.  Once the event is set, the next key event or sleep raises
+Interrupted, which ends the phenotype in the middle of its cycle.
+A keyboard can also be activated with a time rate, for games whose clock runs faster than real time.  Sleeps are then
+in game time, and last `1 / rate` as long in real time.
+
+"""
+
+from abc import ABC, abstractmethod
+import collections
+import contextlib
+import threading
+import time
+
+# keys used by the game
+QWOP_KEYS = ('q', 'w', 'o', 'p')
+
+
+class Interrupted(Exception):
+    """ Raised by `key_down`, `key_up` and `sleep` once the interrupt event of the current thread has been set """
+    pass
+
+
+class Keyboard(ABC):
+    """ Base class for keyboard backends """
+
+    # whether key events go to whichever window has focus, in which case the game must be clicked before playing
+    uses_window_focus = True
+
+    @abstractmethod
+    def key_down(self, key):
+        """ Press and hold `key` """
+        pass
+
+    @abstractmethod
+    def key_up(self, key):
+        """ Release `key` """
+        pass
+
+    def sleep(self, seconds):
+        """ Hold the current key configuration for `seconds` """
+        time.sleep(seconds)
+
+    def now(self):
+        """ Returns: float: time in seconds on the keyboard's clock, which `sleep` advances """
+        return time.perf_counter()
+
+    def release_all(self):
+        """ Ensure all keys are up """
+        for key in QWOP_KEYS + ('space',):
+            self.key_up(key)
+
+    def close(self):
+        """ Release any resources held by the keyboard """
+        pass
+
+
+class PyAutoGuiKeyboard(Keyboard):
+    def __init__(self):
+        """ Keyboard that sends global key events with pyautogui to whichever window has focus """
+        # pyautogui connects to the display when it is imported, so it is only imported once it's actually needed
+        import pyautogui
+        self._pyautogui = pyautogui
+
+    def key_down(self, key):
+        self._pyautogui.keyDown(key)
+
+    def key_up(self, key):
+        self._pyautogui.keyUp(key)
+
+
+# dispatches a keyboard event to the focused element of the page.  The legacy keyCode and which properties are
+# overridden because browsers don't all honour them in the event's init dict, but games often rely on them
+_KEY_EVENT_SCRIPT = '''
+var type = arguments[0], key = arguments[1], code = arguments[2], keyCode = arguments[3];
+var event = new KeyboardEvent(type, {key: key, code: code, keyCode: keyCode, which: keyCode,
+                                     bubbles: true, cancelable: true});
+Object.defineProperty(event, 'keyCode', {get: function() { return keyCode; }});
+Object.defineProperty(event, 'which', {get: function() { return keyCode; }});
+(document.activeElement || document.body).dispatchEvent(event);
+'''
+
+# key, code and keyCode of the DOM keyboard events for each key
+_DOM_KEYS = {
+    'q': ('q', 'KeyQ', 81),
+    'w': ('w', 'KeyW', 87),
+    'o': ('o', 'KeyO', 79),
+    'p': ('p', 'KeyP', 80),
+    'r': ('r', 'KeyR', 82),
+    'space': (' ', 'Space', 32),
+}
+
+
+class WebDriverKeyboard(Keyboard):
+    uses_window_focus = False
+
+    def __init__(self, driver):
+        """ Keyboard that dispatches key events straight into the page of a selenium driver
+
+        Events reach the page whether or not its window has focus, so several games can be played at once on the same
+        screen.
+
+        Args:
+            driver (selenium.webdriver.Remote): driver of the browser running the game
+
+        """
+        self.driver = driver
+
+    def _dispatch(self, event_type, key):
+        dom_key, code, key_code = _DOM_KEYS[key]
+        self.driver.execute_script(_KEY_EVENT_SCRIPT, event_type, dom_key, code, key_code)
+
+    def key_down(self, key):
+        self._dispatch('keydown', key)
+
+    def key_up(self, key):
+        self._dispatch('keyup', key)
+
+
+# XTest keyboards sharing a display must not interleave focusing their window with sending their key events
+_focus_locks = collections.defaultdict(threading.Lock)
+
+
+class XTestKeyboard(Keyboard):
+    def __init__(self, display_name=None, focus_point=None):
+        """ Keyboard that injects key events into an X display with the XTest extension
+
+        Unlike pyautogui, this can target a display other than the one the process was started on, and it doesn't
+        sleep after each key event.  The keyboard counts the events it sends and the time spent sending them.
+        XTest events go to the window with input focus.  When several games share a display, each keyboard is given
+        a point inside its game's window, and focuses that window before every key event.
+
+        Args:
+            display_name (str): name of the X display, e.g. ':100'.  Defaults to the DISPLAY environment variable.
+            focus_point ((int, int)): point inside the window that should receive the keys, or None for any window
+
+        """
+        from Xlib import X, XK
+        from Xlib.display import Display
+        from Xlib.ext import xtest
+        self._X = X
+        self._events = {True: X.KeyPress, False: X.KeyRelease}
+        self._string_to_keysym = XK.string_to_keysym
+        self._fake_input = xtest.fake_input
+        self._display = Display(display_name)
+        self._keycodes = dict()
+        self.focus_point = focus_point
+        self._window = None
+        self._focus_lock = _focus_locks[display_name]
+        self.events = 0
+        self.send_time = 0
+
+    def _keycode(self, key):
+        if key not in self._keycodes:
+            self._keycodes[key] = self._display.keysym_to_keycode(self._string_to_keysym(key))
+        return self._keycodes[key]
+
+    def _target_window(self):
+        """ The topmost visible top-level window containing `focus_point` """
+        if self._window is None:
+            x, y = self.focus_point
+            # children are listed from the bottom of the stacking order to the top
+            for window in reversed(self._display.screen().root.query_tree().children):
+                if window.get_attributes().map_state != self._X.IsViewable:
+                    continue
+                geometry = window.get_geometry()
+                if geometry.x <= x < geometry.x + geometry.width and geometry.y <= y < geometry.y + geometry.height:
+                    self._window = window
+                    break
+        return self._window
+
+    @property
+    def events_per_second(self):
+        """ Number of key events per second the keyboard can send, judging by the time spent sending them so far """
+        return self.events / self.send_time if self.send_time > 0 else 0
+
+    def _send(self, key, pressed):
+        start = time.perf_counter()
+        if self.focus_point is None:
+            self._fake_input(self._display, self._events[pressed], self._keycode(key))
+            self._display.sync()
+        else:
+            with self._focus_lock:
+                window = self._target_window()
+                if window is not None:
+                    self._display.set_input_focus(window, self._X.RevertToParent, self._X.CurrentTime)
+                self._fake_input(self._display, self._events[pressed], self._keycode(key))
+                self._display.sync()
+        self.send_time += time.perf_counter() - start
+        self.events += 1
+
+    def key_down(self, key):
+        self._send(key, True)
+
+    def key_up(self, key):
+        self._send(key, False)
+
+    def close(self):
+        self._display.close()
+
+
+_default_keyboard = None
+_active = threading.local()
+
+
+def get_keyboard():
+    """ Returns the Keyboard active on the current thread
+
+    If no keyboard has been activated with `use`, a shared PyAutoGuiKeyboard is returned.
+
+    """
+    global _default_keyboard
+    keyboard = getattr(_active, 'keyboard', None)
+    if keyboard is None:
+        if _default_keyboard is None:
+            _default_keyboard = PyAutoGuiKeyboard()
+        keyboard = _default_keyboard
+    return keyboard
+
+
+@contextlib.contextmanager
+def use(keyboard, interrupt=None, rate=1):
+    """ Context manager that makes `keyboard` the active keyboard on the current thread
+
+    Args:
+        keyboard (Keyboard): the keyboard that should receive key events
+        interrupt (threading.Event):
+            event that, once set, makes key events and sleeps on the current thread raise Interrupted.
+            Sleeps end as soon as the event is set.
+        rate (float): game seconds per real second of the game receiving the keys.  Sleeps are divided by it.
+
+    """
+    previous = (getattr(_active, 'keyboard', None), getattr(_active, 'interrupt', None),
+                getattr(_active, 'rate', 1))
+    _active.keyboard = keyboard
+    _active.interrupt = interrupt
+    _active.rate = rate
+    try:
+        yield keyboard
+    finally:
+        _active.keyboard, _active.interrupt, _active.rate = previous
+
+
+def _check_interrupt():
+    interrupt = getattr(_active, 'interrupt', None)
+    if interrupt is not None and interrupt.is_set():
+        raise Interrupted()
+
+
+def key_down(key):
+    _check_interrupt()
+    get_keyboard().key_down(key)
+
+
+def key_up(key):
+    _check_interrupt()
+    get_keyboard().key_up(key)
+
+
+def sleep(seconds):
+    seconds = seconds / getattr(_active, 'rate', 1)
+    interrupt = getattr(_active, 'interrupt', None)
+    if interrupt is None:
+        get_keyboard().sleep(seconds)
+    elif interrupt.wait(max(0, seconds)):
+        raise Interrupted()
+
+
+def now():
+    """ Returns: float: time in game seconds on the clock of the keyboard active on the current thread """
+    return get_keyboard().now() * getattr(_active, 'rate', 1)
+
+
+def sleep_until(deadline):
+    """ Sleep until `now()` reaches `deadline`.  Deadlines already past only check for interrupts. """
+    sleep(max(0, deadline - now()))
+
+
+def release_all():
+    """ Release every key.  This is never interrupted, so that phenotypes can always clean up. """
+    get_keyboard().release_all()
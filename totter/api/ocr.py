@@ -0,0 +1,120 @@
+""" Tesseract engine kept alive between reads
+
+pytesseract starts a tesseract process, writes the image to a temporary file and loads the language model on every
+call.  When the optional tesserocr package is installed, the engine is instead initialized once per process and kept in
+memory.  Without it, batches of images are at least read by a single tesseract process.
+Reads are restricted to the characters of distances and the word "metres".
+
+"""
+
+import bisect
+import os
+import threading
+
+from PIL import Image
+import pytesseract
+
+try:
+    import tesserocr
+except ImportError:
+    tesserocr = None
+
+WHITELIST = '0123456789.-metrs'
+
+# tesseract page segmentation modes
+_SINGLE_BLOCK = 6
+_SINGLE_LINE = 7
+
+_BATCH_GAP = 20  # pixels between the images of a batch stacked into one page
+
+
+class TesseractEngine(object):
+    def __init__(self, whitelist=WHITELIST):
+        """ Initialize a TesseractEngine
+        The engine can be shared by several threads, which take turns using it.
+
+        Args:
+            whitelist (str): characters that tesseract may recognize
+        """
+        self.whitelist = whitelist
+        self._lock = threading.Lock()
+        self._api = None
+        if tesserocr is not None:
+            self._api = tesserocr.PyTessBaseAPI(psm=_SINGLE_LINE)
+            self._api.SetVariable('tessedit_char_whitelist', whitelist)
+
+    def _config(self, mode):
+        return f'--psm {mode} -c tessedit_char_whitelist={self.whitelist}'
+
+    def recognize(self, image, single_line=True):
+        """ Read the text in an image
+
+        Args:
+            image (PIL.Image): the image
+            single_line (bool): whether the image holds a single line of text, rather than a block of text
+
+        Returns:
+            str: the text read
+
+        """
+        mode = _SINGLE_LINE if single_line else _SINGLE_BLOCK
+        if self._api is None:
+            return pytesseract.image_to_string(image, config=self._config(mode))
+        with self._lock:
+            self._api.SetPageSegMode(mode)
+            self._api.SetImage(image)
+            return self._api.GetUTF8Text()
+
+    def recognize_batch(self, images):
+        """ Read the text in several images at once
+
+        Args:
+            images (list<PIL.Image>): greyscale images, each holding a line or block of text
+
+        Returns:
+            list<str>: the text read from each image
+
+        """
+        if self._api is not None:
+            return [self.recognize(image, single_line=False) for image in images]
+
+        # stack the images into one page, so that a single tesseract process reads all of them.
+        # Each image is padded with its own background so that the contrast of the text is unchanged
+        width = max(image.width for image in images)
+        tops = list()
+        height = 0
+        for image in images:
+            tops.append(height)
+            height += image.height + _BATCH_GAP
+        page = Image.new('L', (width, height))
+        for image, top in zip(images, tops):
+            background = image.getpixel((0, 0))
+            page.paste(background, (0, top, width, top + image.height + _BATCH_GAP))
+            page.paste(image, (0, top))
+
+        data = pytesseract.image_to_data(page, config=self._config(_SINGLE_BLOCK), output_type=pytesseract.Output.DICT)
+        words = [list() for _ in images]
+        for text, top, word_height in zip(data['text'], data['top'], data['height']):
+            if text.strip():
+                index = bisect.bisect_right(tops, top + word_height / 2) - 1
+                words[index].append(text.strip())
+        return [' '.join(image_words) for image_words in words]
+
+
+_engine = None
+_engine_pid = None
+_engine_lock = threading.Lock()
+
+
+def get_engine():
+    """ Returns the TesseractEngine of the current process
+
+    Processes forked from a process that already has an engine get an engine of their own.
+
+    """
+    global _engine, _engine_pid
+    with _engine_lock:
+        if _engine is None or _engine_pid != os.getpid():
+            _engine = TesseractEngine()
+            _engine_pid = os.getpid()
+        return _engine
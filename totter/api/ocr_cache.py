@@ -0,0 +1,115 @@
+""" Cache of values read from images of text, keyed by the content of the images
+
+Consecutive checks of the game often see the same distance, so reads of identical crops can be skipped.  Crops are
+looked up first by an exact hash of their pixels, then by a perceptual hash that tolerates small differences in
+antialiasing and compression.
+Hashes are Python's own hash of the pixels, which is several times faster than a cryptographic digest.  The cache only
+lives in the process that fills it, and 64 bits leave no room for collisions between a few thousand crops.
+
+"""
+
+import collections
+import threading
+
+import numpy as np
+
+_PERCEPTUAL_SCALE = 2  # crops are downsampled by this factor before perceptual hashing
+_INK_THRESHOLD = 200  # greyscale value above which a pixel is part of the (white) text
+
+
+def exact_hash(image):
+    """ Hash of every pixel of an image """
+    return hash(image.tobytes())
+
+
+def perceptual_hash(image):
+    """ Hash of a downsampled, black and white version of a greyscale image """
+    pixels = np.asarray(image)
+    rows = pixels.shape[0] // _PERCEPTUAL_SCALE * _PERCEPTUAL_SCALE
+    columns = pixels.shape[1] // _PERCEPTUAL_SCALE * _PERCEPTUAL_SCALE
+    blocks = pixels[:rows, :columns].reshape(rows // _PERCEPTUAL_SCALE, _PERCEPTUAL_SCALE,
+                                             columns // _PERCEPTUAL_SCALE, _PERCEPTUAL_SCALE)
+    ink = blocks.mean(axis=(1, 3)) > _INK_THRESHOLD / 2
+    return hash(np.packbits(ink).tobytes() + bytes(ink.shape))
+
+
+class OcrCache(object):
+    def __init__(self, max_size=4096):
+        """ Initialize an OcrCache
+        The cache keeps the `max_size` most recently used values.  It can be shared by several threads.
+
+        Args:
+            max_size (int): maximum number of cached values for each kind of hash
+        """
+        self.max_size = max_size
+        self.exact_hits = 0
+        self.perceptual_hits = 0
+        self.misses = 0
+        self._exact = collections.OrderedDict()
+        self._perceptual = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def hits(self):
+        return self.exact_hits + self.perceptual_hits
+
+    @property
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups > 0 else 0
+
+    def _put(self, entries, key, value):
+        entries[key] = value
+        entries.move_to_end(key)
+        if len(entries) > self.max_size:
+            entries.popitem(last=False)
+
+    def lookup(self, image):
+        """ Look up the value read from an image
+
+        Args:
+            image (PIL.Image or np.ndarray): greyscale image of text
+
+        Returns:
+            (bool, object): whether the image was found, and the value read from it
+
+        """
+        exact_key = exact_hash(image)
+        with self._lock:
+            if exact_key in self._exact:
+                self._exact.move_to_end(exact_key)
+                self.exact_hits += 1
+                return True, self._exact[exact_key]
+
+        perceptual_key = perceptual_hash(image)
+        with self._lock:
+            if perceptual_key in self._perceptual:
+                self._perceptual.move_to_end(perceptual_key)
+                value = self._perceptual[perceptual_key]
+                self._put(self._exact, exact_key, value)
+                self.perceptual_hits += 1
+                return True, value
+            self.misses += 1
+            return False, None
+
+    def store(self, image, value):
+        """ Remember the value read from an image
+
+        Args:
+            image (PIL.Image or np.ndarray): greyscale image of text
+            value (object): the value read from it, which may be None if nothing could be read
+
+        """
+        exact_key = exact_hash(image)
+        perceptual_key = perceptual_hash(image)
+        with self._lock:
+            self._put(self._exact, exact_key, value)
+            self._put(self._perceptual, perceptual_key, value)
+
+
+_hud_cache = OcrCache()
+
+
+def get_hud_cache():
+    """ Returns the OcrCache for the distance at the top of the window, shared by every ImageProcessor """
+    return _hud_cache
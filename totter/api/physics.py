@@ -0,0 +1,216 @@
+""" A simplified 2D ragdoll model of the QWOP runner
+
+The runner is a planar articulated body: a torso with the head rigidly attached, and two legs made of a thigh and a
+calf.  As in QWOP, Q and W swing the thighs in opposite directions and O and P bend the knees in opposite directions.
+Joints are driven towards target angles by damped motors, and the torso reacts to the hip motors and to gravity like an
+inverted pendulum.
+The lowest foot or knee is pinned to the track by friction, so moving the stance leg drives the body forwards or
+backwards.  The run ends when the head or shoulders touch the track, or when the runner reaches the finish line.
+
+The state of many runners is stored row-wise in NumPy arrays, so a whole population can be stepped in lockstep.
+The model is a cheap surrogate of the game's physics.  It is not meant to reproduce QWOP distances exactly, only to
+reward the same kind of coordinated gaits.
+
+"""
+
+import numpy as np
+
+STEPS_PER_SECOND = 60  # physics steps per second of game time
+TIMESTEP = 1 / STEPS_PER_SECOND  # seconds of game time per physics step
+FINISH_LINE = 100  # metres
+
+GRAVITY = 9.81
+TORSO_LENGTH = 0.6  # hip to shoulders
+HEAD_LENGTH = 0.25  # shoulders to top of the head
+THIGH_LENGTH = 0.45
+CALF_LENGTH = 0.45
+FALL_HEIGHT = 0.15  # the run is over once the head or shoulders are this close to the track
+
+# motor targets (radians) for the hips and knees
+HIP_SWING = 0.9
+KNEE_REST = 0.15
+KNEE_SWING = 1.1
+KNEE_LIMIT = 2.4
+HIP_LIMIT = 1.8
+
+# motor gains
+STIFFNESS = 120.0
+LIMP_STIFFNESS = 10.0  # stiffness of a joint when neither of its keys is pressed
+DAMPING = 14.0
+MAX_JOINT_ACCELERATION = 90.0
+
+# torso dynamics
+HIP_REACTION = 0.06  # fraction of the hip motor acceleration transferred to the torso in the air
+STANCE_REACTION = 0.3  # fraction of the stance hip's motor acceleration transferred to the torso
+PITCH_DAMPING = 1.5
+POSTURE_STIFFNESS = 30.0  # the runner tries to keep his torso upright while standing on his feet...
+POSTURE_LIMIT = 6.0  # ...but can only resist a limited lean
+GRIP = 0.8  # fraction of the stance point's velocity that is transferred to the body by friction
+KNEE_DRAG = 0.9  # velocity retained per step while a knee scrapes the track
+
+# sign of the motor targets for the two legs
+_LEG_SIGNS = np.array([1.0, -1.0])
+
+
+class RagdollRunners(object):
+    def __init__(self, count):
+        """ Initialize `count` RagdollRunners standing at the start line
+
+        Args:
+            count (int): number of runners simulated side by side
+
+        """
+        self.count = count
+        # steps run by each runner until it stopped, or so far if it's still running.  Times are computed from the
+        # count, so that they don't accumulate rounding errors
+        self.steps = np.zeros(count, dtype=np.int64)
+        self.x = np.zeros(count)
+        self.y = np.full(count, THIGH_LENGTH + CALF_LENGTH - 0.02)
+        self.vx = np.zeros(count)
+        self.vy = np.zeros(count)
+        self.pitch = np.full(count, 0.05)  # angle of the torso from vertical, positive when leaning forwards
+        self.pitch_velocity = np.zeros(count)
+        self.hips = np.tile([0.1, -0.1], (count, 1))  # thigh angles relative to the torso, positive forwards
+        self.hip_velocities = np.zeros((count, 2))
+        self.knees = np.full((count, 2), KNEE_REST)  # calf angles relative to the thigh, positive when bent
+        self.knee_velocities = np.zeros((count, 2))
+        self.fallen = np.zeros(count, dtype=bool)
+        self.finished = np.zeros(count, dtype=bool)
+        self.kneeling = np.zeros(count, dtype=bool)
+
+    @property
+    def distances(self):
+        """ Distance run by each runner in metres, as shown on the game's HUD """
+        return np.round(self.x, 1)
+
+    @property
+    def times(self):
+        """ Game time in seconds at which each runner stopped, or the current time if it's still running """
+        return self.steps * TIMESTEP
+
+    @property
+    def seconds(self):
+        """ Whole seconds of game time run by each runner, which is how the browser backend reports run times """
+        return self.steps // STEPS_PER_SECOND
+
+    @property
+    def game_over(self):
+        return self.fallen | self.finished
+
+    def subset(self, rows):
+        """ Create a RagdollRunners object holding only some of the runners
+
+        Args:
+            rows (np.ndarray): boolean mask or indices of the runners to keep
+
+        Returns:
+            RagdollRunners: copy of the selected runners
+
+        """
+        subset = RagdollRunners.__new__(RagdollRunners)
+        for name, value in vars(self).items():
+            if isinstance(value, np.ndarray):
+                setattr(subset, name, value[rows])
+        subset.count = len(subset.x)
+        return subset
+
+    def _leg_offsets(self):
+        """ Position of the knees and feet relative to the hip
+
+        Returns:
+            (np.ndarray, np.ndarray, np.ndarray, np.ndarray): knee x, knee y, foot x, foot y offsets, one row per runner
+
+        """
+        thigh_angles = self.hips - self.pitch[:, None]  # absolute angles measured from straight down
+        calf_angles = thigh_angles - self.knees
+        knee_x = THIGH_LENGTH * np.sin(thigh_angles)
+        knee_y = -THIGH_LENGTH * np.cos(thigh_angles)
+        foot_x = knee_x + CALF_LENGTH * np.sin(calf_angles)
+        foot_y = knee_y - CALF_LENGTH * np.cos(calf_angles)
+        return knee_x, knee_y, foot_x, foot_y
+
+    def _stance_points(self):
+        """ The lowest point of each runner's legs relative to the hip
+
+        Returns:
+            (np.ndarray, np.ndarray, np.ndarray, np.ndarray): x offsets, y offsets, index of the leg,
+            and whether the point is a knee
+
+        """
+        knee_x, knee_y, foot_x, foot_y = self._leg_offsets()
+        points_x = np.concatenate((foot_x, knee_x), axis=1)
+        points_y = np.concatenate((foot_y, knee_y), axis=1)
+        lowest = np.argmin(points_y, axis=1)
+        rows = np.arange(self.count)
+        return points_x[rows, lowest], points_y[rows, lowest], lowest % 2, lowest >= 2
+
+    def step(self, keys):
+        """ Advance the simulation by one TIMESTEP
+
+        Runners whose game is over are left untouched.
+
+        Args:
+            keys (np.ndarray): boolean array of shape (count, 4).  Each row says whether Q, W, O and P are held down.
+
+        Returns: None
+
+        """
+        running = ~self.game_over
+        keys = np.asarray(keys, dtype=float)
+        q, w, o, p = keys[:, 0], keys[:, 1], keys[:, 2], keys[:, 3]
+        dt = TIMESTEP
+        rows = np.arange(self.count)
+        stance_x, stance_y, stance_leg, _ = self._stance_points()
+
+        # drive the joints towards the targets selected by the keys
+        hip_targets = HIP_SWING * (q - w)[:, None] * _LEG_SIGNS
+        knee_targets = KNEE_REST + KNEE_SWING * (o - p)[:, None] * _LEG_SIGNS
+        hip_stiffness = np.where((q + w) > 0, STIFFNESS, LIMP_STIFFNESS)[:, None]
+        knee_stiffness = np.where((o + p) > 0, STIFFNESS, LIMP_STIFFNESS)[:, None]
+        hip_accelerations = np.clip(hip_stiffness * (hip_targets - self.hips) - DAMPING * self.hip_velocities,
+                                    -MAX_JOINT_ACCELERATION, MAX_JOINT_ACCELERATION)
+        knee_accelerations = np.clip(knee_stiffness * (knee_targets - self.knees) - DAMPING * self.knee_velocities,
+                                     -MAX_JOINT_ACCELERATION, MAX_JOINT_ACCELERATION)
+        hip_velocities = self.hip_velocities + hip_accelerations * dt
+        knee_velocities = self.knee_velocities + knee_accelerations * dt
+        self.hips = np.where(running[:, None], np.clip(self.hips + hip_velocities * dt, -HIP_LIMIT, HIP_LIMIT),
+                             self.hips)
+        self.knees = np.where(running[:, None], np.clip(self.knees + knee_velocities * dt, 0, KNEE_LIMIT),
+                              self.knees)
+        self.hip_velocities = np.where(running[:, None], hip_velocities, self.hip_velocities)
+        self.knee_velocities = np.where(running[:, None], knee_velocities, self.knee_velocities)
+
+        # the torso topples like an inverted pendulum when supported and is pushed by the hip motors.
+        # The stance leg is pinned to the track, so its hip motor turns the torso instead of the leg
+        supported = self.y + stance_y <= 0.01
+        posture = np.clip(POSTURE_STIFFNESS * self.pitch, -POSTURE_LIMIT, POSTURE_LIMIT) * ~self.kneeling
+        supported_acceleration = (STANCE_REACTION * hip_accelerations[rows, stance_leg]
+                                  + GRAVITY / TORSO_LENGTH * np.sin(self.pitch) - posture)
+        airborne_acceleration = -HIP_REACTION * np.sum(hip_accelerations, axis=1)
+        pitch_acceleration = (np.where(supported, supported_acceleration, airborne_acceleration)
+                              - PITCH_DAMPING * self.pitch_velocity)
+        pitch_velocity = self.pitch_velocity + pitch_acceleration * dt
+        self.pitch = np.where(running, self.pitch + pitch_velocity * dt, self.pitch)
+        self.pitch_velocity = np.where(running, pitch_velocity, self.pitch_velocity)
+
+        new_stance_x, new_stance_y, _, kneeling = self._stance_points()
+        # friction pins the stance point, so its motion relative to the hip moves the body instead.
+        # Pushing the stance point down lifts the body off the track
+        supported_vx = (1 - GRIP) * self.vx - GRIP * (new_stance_x - stance_x) / dt
+        supported_vx = np.where(kneeling, supported_vx * KNEE_DRAG, supported_vx)
+        supported_vy = np.maximum(0.0, -(new_stance_y - stance_y) / dt)
+        vx = np.where(supported, supported_vx, self.vx)
+        vy = np.where(supported, supported_vy, self.vy - GRAVITY * dt)
+
+        self.vx = np.where(running, vx, self.vx)
+        self.vy = np.where(running, vy, self.vy)
+        self.x = np.where(running, self.x + vx * dt, self.x)
+        self.y = np.where(running, np.maximum(self.y + vy * dt, -new_stance_y), self.y)
+        self.kneeling = np.where(running, kneeling & supported, self.kneeling)
+        self.steps = np.where(running, self.steps + 1, self.steps)
+
+        # check whether the runs have ended
+        shoulder_y = self.y + TORSO_LENGTH * np.cos(self.pitch)
+        head_y = self.y + (TORSO_LENGTH + HEAD_LENGTH) * np.cos(self.pitch)
+        self.fallen = self.fallen | (running & (np.minimum(shoulder_y, head_y) < FALL_HEIGHT))
+        self.finished = self.finished | (running & (self.x >= FINISH_LINE))
@@ -0,0 +1,236 @@
+""" Frame pipeline that analyzes QWOP frames in a separate process
+
+A capture thread grabs frames of the game at a fixed rate and writes them into a ring buffer in shared memory.  An
+analysis process runs an ImageProcessor on the newest frame at its own rate, and publishes the distance run and whether
+the game is over back to the simulator through shared values.  The analysis doesn't compete with the thread playing the
+strategy for the GIL, and capturing and analysis can run at different rates.
+
+"""
+
+import ctypes
+import multiprocessing
+import threading
+import time
+
+import numpy as np
+from PIL import Image
+
+from totter.api.image_processing import ImageProcessor
+from totter.api.posture import KNEELING_FRACTION, LYING_FRACTION
+
+# the analysis process is started while the capture, watchdog and evaluation threads run.  A forked child would inherit
+# the locks those threads hold, so the process is spawned instead, along with the shared memory it is handed
+_CONTEXT = multiprocessing.get_context('spawn')
+
+
+class FrameRing(object):
+    def __init__(self, width, height, slots=4):
+        """ Fixed-size ring buffer of RGB frames in shared memory
+
+        There must only be one writer.  Readers only ever read the newest frame.
+
+        Args:
+            width (int): width of the frames in pixels
+            height (int): height of the frames in pixels
+            slots (int): number of frames held by the buffer
+
+        """
+        self.shape = (height, width, 3)
+        self.slots = slots
+        self._frames = _CONTEXT.RawArray(ctypes.c_uint8, slots * height * width * 3)
+        self._runs = _CONTEXT.RawArray(ctypes.c_long, slots)  # run during which each frame was captured
+        self._written = _CONTEXT.Value(ctypes.c_long, 0)  # number of frames written so far
+
+    def _view(self):
+        return np.frombuffer(self._frames, dtype=np.uint8).reshape((self.slots,) + self.shape)
+
+    def write(self, frame, run):
+        """ Write a frame into the oldest slot of the buffer
+
+        Args:
+            frame (PIL.Image): the frame, which must have the buffer's size
+            run (int): the run during which the frame was captured
+
+        """
+        index = self._written.value % self.slots
+        self._view()[index] = np.asarray(frame.convert(mode='RGB'))
+        self._runs[index] = run
+        with self._written.get_lock():
+            self._written.value += 1
+
+    def latest(self):
+        """ Copy the newest frame out of the buffer
+
+        Returns:
+            (int, int, np.ndarray): sequence number of the frame, the run it belongs to, and the frame itself,
+            or None if there is no frame, or if the frame was overwritten while it was copied
+
+        """
+        written = self._written.value
+        if written == 0:
+            return None
+        index = (written - 1) % self.slots
+        run = self._runs[index]
+        frame = self._view()[index].copy()
+        if self._written.value - written >= self.slots - 1:
+            return None
+        return written, run, frame
+
+
+class _SharedState(object):
+    def __init__(self):
+        """ Values shared between the simulator and the analysis process """
+        self.stop = _CONTEXT.Event()
+        self.run = _CONTEXT.Value(ctypes.c_long, 0)  # the run currently being played
+        self.result_run = _CONTEXT.Value(ctypes.c_long, 0)  # the run that the results below belong to
+        self.distance = _CONTEXT.Value(ctypes.c_double, 0)
+        self.game_over = _CONTEXT.Value(ctypes.c_bool, False)
+        self.final_request = _CONTEXT.Value(ctypes.c_long, 0)  # run whose final distance is wanted
+        self.final_run = _CONTEXT.Value(ctypes.c_long, 0)  # run whose final distance has been found
+        self.final_distance = _CONTEXT.Value(ctypes.c_double, 0)
+
+
+def _analyze_frames(ring, state, processor_options, interval):
+    """ Body of the analysis process.  Analyzes the newest frame every `interval` seconds until told to stop. """
+    run = 0
+    processor = ImageProcessor(**processor_options)
+    analyzed = 0  # sequence number of the last frame analyzed
+    while not state.stop.is_set():
+        if state.run.value != run:
+            run = state.run.value
+            processor = ImageProcessor(**processor_options)
+
+        latest = ring.latest()
+        if latest is not None:
+            sequence, frame_run, frame = latest
+            if sequence != analyzed and frame_run == run:
+                analyzed = sequence
+                processor.update(Image.fromarray(frame))
+                with state.result_run.get_lock():
+                    state.distance.value = processor.current_distance
+                    state.game_over.value = processor.is_game_over()
+                    state.result_run.value = run
+
+        if state.final_request.value == run and state.final_run.value != run:
+            if processor.latest is not None:
+                state.final_distance.value = processor.get_final_distance()
+            else:
+                state.final_distance.value = 0
+            state.final_run.value = run
+
+        time.sleep(interval)
+
+
+class FramePipeline(object):
+    def __init__(self, grab, size, buffer_size=16, capture_rate=20, analysis_rate=10, slots=4, fall_confidence=None,
+                 lying_fraction=LYING_FRACTION, kneeling_fraction=KNEELING_FRACTION):
+        """ Initialize a FramePipeline
+        The pipeline stands in for an ImageProcessor: it is reset at the start of each run, and reports whether the
+        game is over and the final distance.  Frames are only captured between `reset` and `get_final_distance`.
+
+        Args:
+            grab (callable): function returning a PIL.Image of the game
+            size ((int, int)): width and height of the frames returned by `grab`
+            buffer_size (int): stagnation buffer size of the ImageProcessor.  See ImageProcessor.
+            capture_rate (float): frames captured per second
+            analysis_rate (float): frames analyzed per second
+            slots (int): number of frames held in shared memory
+            fall_confidence (float): fall detection threshold of the ImageProcessor.  See ImageProcessor.
+            lying_fraction (float): lying height of the ImageProcessor's fall detection.  See ImageProcessor.
+            kneeling_fraction (float): kneeling height of the ImageProcessor's fall detection.  See ImageProcessor.
+        """
+        self.grab = grab
+        self.size = size
+        self.buffer_size = buffer_size
+        self.capture_rate = capture_rate
+        self.analysis_rate = analysis_rate
+        self.slots = slots
+        self.fall_confidence = fall_confidence
+        self.lying_fraction = lying_fraction
+        self.kneeling_fraction = kneeling_fraction
+        self.run = 0
+        self._ring = None
+        self._state = None
+        self._analyzer = None
+        self._capturer = None
+        self._capturing = threading.Event()
+
+    def _processor_options(self):
+        """ Returns: dict: arguments of the ImageProcessor of the analysis process """
+        return {'buffer_size': self.buffer_size, 'fall_confidence': self.fall_confidence,
+                'lying_fraction': self.lying_fraction, 'kneeling_fraction': self.kneeling_fraction}
+
+    def start(self):
+        """ Start the capture thread and the analysis process """
+        if self._analyzer is not None:
+            return
+        width, height = self.size
+        self._ring = FrameRing(width, height, slots=self.slots)
+        self._state = _SharedState()
+        self._analyzer = _CONTEXT.Process(
+            target=_analyze_frames,
+            args=(self._ring, self._state, self._processor_options(), 1 / self.analysis_rate),
+            daemon=True
+        )
+        self._analyzer.start()
+        self._capturer = threading.Thread(target=self._capture_frames, daemon=True)
+        self._capturer.start()
+
+    def _capture_frames(self):
+        """ Body of the capture thread """
+        interval = 1 / self.capture_rate
+        while not self._state.stop.is_set():
+            if not self._capturing.wait(timeout=interval) or self._state.stop.is_set():
+                continue
+            # frames grabbed while a new run starts are labelled with the old run, so they aren't analyzed
+            run = self.run
+            started = time.monotonic()
+            self._ring.write(self.grab(), run)
+            time.sleep(max(0, interval - (time.monotonic() - started)))
+
+    def reset(self):
+        """ Start capturing frames for a new run """
+        self.start()
+        self.run += 1
+        self._state.run.value = self.run
+        self._capturing.set()
+
+    @property
+    def current_distance(self):
+        with self._state.result_run.get_lock():
+            return self._state.distance.value if self._state.result_run.value == self.run else 0
+
+    def is_game_over(self):
+        with self._state.result_run.get_lock():
+            return self._state.result_run.value == self.run and self._state.game_over.value
+
+    def get_final_distance(self, timeout=5):
+        """ Stop capturing and wait for the analysis process to read the final distance of the current run
+
+        Args:
+            timeout (float): time in seconds to wait for the analysis process
+
+        Returns:
+            float: the final distance, or the latest distance read if the analysis process didn't answer in time
+
+        """
+        self._capturing.clear()
+        self._state.final_request.value = self.run
+        deadline = time.monotonic() + timeout
+        while self._state.final_run.value != self.run:
+            if time.monotonic() > deadline or not self._analyzer.is_alive():
+                return self.current_distance
+            time.sleep(0.01)
+        return self._state.final_distance.value
+
+    def close(self):
+        """ Stop the capture thread and the analysis process """
+        if self._analyzer is None:
+            return
+        self._state.stop.set()
+        self._capturing.set()
+        self._capturer.join()
+        self._analyzer.join(timeout=5)
+        if self._analyzer.is_alive():
+            self._analyzer.terminate()
+        self._analyzer = None
@@ -0,0 +1,113 @@
+""" Detection of fallen or kneeling runners in QWOP frames
+
+The track and the scenery behind the runner are made of horizontal bands, so within each row of the frame the runner's
+pixels are the ones that stand out from the row's usual color.  The height of the runner is the vertical extent of
+those rows.  It is measured on the first frames of each run, while the runner stands at the start line, and later
+heights are compared with it:
+    - a runner much shorter than at the start has fallen: its head or torso is on the track
+    - a runner somewhat shorter than at the start, whose distance doesn't change, is dragging itself on its knees
+
+The thresholds below are placeholders: they were chosen from the proportions of the runner, not calibrated on recorded
+falls.  The fractions of the standing height that mean lying and kneeling can be given to each PostureDetector.
+
+"""
+
+import collections
+
+import numpy as np
+
+# region of the frame where the runner is drawn, below the distance at the top of the window
+_RUNNER_BOX = (150, 170, 550, 450)  # left, upper, right, lower
+_FOREGROUND_DISTANCE = 40  # Euclidean distance from the row's median color above which a pixel is foreground
+_MIN_ROW_PIXELS = 3  # rows with fewer foreground pixels than this don't count as part of the runner
+_CALIBRATION_FRAMES = 2  # frames at the start of each run used to measure the standing height
+LYING_FRACTION = 0.35  # height of a lying runner, as a fraction of its standing height
+KNEELING_FRACTION = 0.75  # height of a kneeling runner, as a fraction of its standing height
+
+
+def runner_height(screenshot):
+    """ Measure the height of the runner in a frame
+
+    Args:
+        screenshot (PIL.Image): frame of the game
+
+    Returns:
+        int: height of the runner in pixels, or None if no runner could be seen
+
+    """
+    pixels = np.asarray(screenshot.crop(_RUNNER_BOX).convert(mode='RGB'), dtype=np.int32)
+    background = np.median(pixels, axis=1, keepdims=True)
+    foreground = ((pixels - background) ** 2).sum(axis=2) > _FOREGROUND_DISTANCE ** 2
+    rows = np.flatnonzero(foreground.sum(axis=1) >= _MIN_ROW_PIXELS)
+    if len(rows) == 0:
+        return None
+    return int(rows[-1] - rows[0] + 1)
+
+
+class PostureDetector(object):
+    def __init__(self, confidence_threshold=0.8, stall_frames=4, confirmation_frames=2,
+                 lying_fraction=LYING_FRACTION, kneeling_fraction=KNEELING_FRACTION):
+        """ Initialize a PostureDetector
+
+        Args:
+            confidence_threshold (float):
+                confidence between 0 and 1 above which the runner is considered down.  Higher thresholds end fewer
+                runs early, and end fewer of them by mistake.
+            stall_frames (int): number of frames without progress after which a kneeling runner is considered stuck
+            confirmation_frames (int): number of frames in a row that must be above the threshold
+            lying_fraction (float): height of a lying runner, as a fraction of its standing height
+            kneeling_fraction (float):
+                height of a kneeling runner, as a fraction of its standing height.  Must be above `lying_fraction`.
+        """
+        if not 0 <= lying_fraction < kneeling_fraction < 1:
+            raise ValueError('Expected 0 <= lying_fraction < kneeling_fraction < 1')
+        self.confidence_threshold = confidence_threshold
+        self.stall_frames = stall_frames
+        self.confirmation_frames = confirmation_frames
+        self.lying_fraction = lying_fraction
+        self.kneeling_fraction = kneeling_fraction
+        self.reset()
+
+    def reset(self):
+        self.standing_height = None
+        self.calibration = list()
+        self.distances = collections.deque(maxlen=self.stall_frames)
+        self.confidence = 0
+        self.confirmations = 0
+        self.fallen = False
+
+    def update(self, screenshot, distance):
+        """ Update the detector with a new frame
+
+        Args:
+            screenshot (PIL.Image): frame of the game
+            distance (float): distance run so far
+
+        Returns:
+            bool: whether the runner is down
+        """
+        height = runner_height(screenshot)
+        self.distances.append(distance)
+        if height is None:
+            return self.fallen
+
+        if self.standing_height is None:
+            self.calibration.append(height)
+            if len(self.calibration) >= _CALIBRATION_FRAMES:
+                self.standing_height = max(self.calibration)
+            return self.fallen
+
+        fraction = height / self.standing_height
+        # confidence that the runner is lying down grows as it shrinks from kneeling height to lying height
+        lying = np.clip((self.kneeling_fraction - fraction) / (self.kneeling_fraction - self.lying_fraction), 0, 1)
+        # confidence that the runner is dragging itself on its knees needs it to be shorter than standing, and stuck
+        kneeling = np.clip((1 - fraction) / (1 - self.kneeling_fraction), 0, 1)
+        stuck = len(self.distances) == self.stall_frames and max(self.distances) - min(self.distances) < 0.1
+        self.confidence = float(max(lying, kneeling if stuck else 0))
+
+        if self.confidence >= self.confidence_threshold:
+            self.confirmations += 1
+        else:
+            self.confirmations = 0
+        self.fallen = self.fallen or self.confirmations >= self.confirmation_frames
+        return self.fallen
@@ -0,0 +1,120 @@
+""" Reads the state of the QWOP game from its JavaScript runtime
+
+The game draws its text on a canvas with `CanvasRenderingContext2D.fillText`, and only redraws text when it changes.
+The probe wraps that function to remember the distance drawn at the top of the window and the distance drawn in the
+game-over box, so the state of the game can be polled through the webdriver without capturing or reading any pixels.
+
+"""
+
+import collections
+
+# wraps fillText.  Text of the form "<number> metres" is the distance at the top of the window.  Any other text
+# mentioning metres is drawn by the game-over box
+_INSTALL_SCRIPT = '''
+if (!window.__totter) {
+    var state = window.__totter = {distance: null, gameOver: false, finalDistance: null, texts: 0,
+                                   start: performance.now()};
+    state.reset = function () {
+        state.distance = null;
+        state.gameOver = false;
+        state.finalDistance = null;
+        state.start = performance.now();
+    };
+    var hud = /^\\s*(-?\\d+(?:\\.\\d+)?)\\s*metres\\s*$/;
+    var anyDistance = /(-?\\d+(?:\\.\\d+)?)\\s*metres/;
+    var fillText = CanvasRenderingContext2D.prototype.fillText;
+    CanvasRenderingContext2D.prototype.fillText = function (text) {
+        var string = String(text);
+        var match = hud.exec(string);
+        state.texts += 1;
+        if (match !== null) {
+            state.distance = parseFloat(match[1]);
+        } else if ((match = anyDistance.exec(string)) !== null) {
+            state.gameOver = true;
+            state.finalDistance = parseFloat(match[1]);
+        }
+        return fillText.apply(this, arguments);
+    };
+}
+'''
+
+_RESET_SCRIPT = 'if (window.__totter) { window.__totter.reset(); }'
+
+_READ_SCRIPT = '''
+var state = window.__totter;
+if (!state) { return null; }
+return [state.distance, state.gameOver, state.finalDistance, (performance.now() - state.start) / 1000, state.texts];
+'''
+
+GameState = collections.namedtuple('GameState', ['distance', 'game_over', 'final_distance', 'elapsed'])
+
+
+class GameStateProbe(object):
+    def __init__(self, game, stall_time=4):
+        """ Initialize a GameStateProbe
+        The probe follows the interface of ImageProcessor: it is reset at the start of each run, and reports whether
+        the game is over and the final distance.  Its state is refreshed by `poll`.
+
+        Like ImageProcessor, the probe considers the game over once the distance has stayed the same for a while.
+
+        Args:
+            game (QwopGame): the game to probe.  The probe is installed into its page by `install`.
+            stall_time (float): time in seconds after which a distance that hasn't changed ends the game
+        """
+        self.game = game
+        self.stall_time = stall_time
+        self.current_distance = 0
+        self.game_over = False
+        self.stalled = False
+        self._last_change = 0  # time of the last change of distance
+        self.final_distance = None
+        self.elapsed = 0
+        self.texts = 0
+        self.distance_drawn = False  # whether the game has drawn a distance since the last reset
+
+    def install(self):
+        """ Install the probe into the game's page.  Installing it more than once has no effect. """
+        self.game.browser.execute_script(_INSTALL_SCRIPT)
+
+    def is_available(self):
+        """ Whether the probe has seen the game draw any text, which shows that the game draws text with fillText """
+        return self.texts > 0
+
+    def reset(self):
+        self.install()
+        self.game.browser.execute_script(_RESET_SCRIPT)
+        self.current_distance = 0
+        self.game_over = False
+        self.stalled = False
+        self._last_change = 0
+        self.final_distance = None
+        self.elapsed = 0
+        self.distance_drawn = False
+
+    def poll(self):
+        """ Read the state of the game
+
+        Returns:
+            GameState: the distance run, whether the game is over, the final distance and the time in seconds since the
+            last reset, or None if the probe isn't installed, e.g. because the page was reloaded
+        """
+        state = self.game.browser.execute_script(_READ_SCRIPT)
+        if state is None:
+            return None
+        distance, self.game_over, self.final_distance, self.elapsed, self.texts = state
+        self.distance_drawn = distance is not None
+        if distance is not None and distance != self.current_distance:
+            self.current_distance = distance
+            self._last_change = self.elapsed
+        self.stalled = self.elapsed - self._last_change >= self.stall_time
+        return GameState(self.current_distance, self.is_game_over(), self.final_distance, self.elapsed)
+
+    def is_game_over(self):
+        return self.game_over or self.stalled
+
+    def is_at_start(self):
+        """ Whether the game has drawn a distance of 0 since the last reset, and isn't over """
+        return self.distance_drawn and self.current_distance == 0 and not self.game_over
+
+    def get_final_distance(self):
+        return self.final_distance if self.final_distance is not None else self.current_distance
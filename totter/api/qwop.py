@@ -1,27 +1,53 @@
 """ Functions for creating and positioning a webview with the QWOP game """
 
+from concurrent.futures import ThreadPoolExecutor
+import logging
+import math
 import os
 import platform
-import pyautogui
+import queue
 import threading
 import time
 
 from datetime import timedelta
 from selenium import webdriver
-
+from selenium.common.exceptions import WebDriverException
+
+from totter.api import keyboard
+from totter.api.assets import GAME_ORIGIN, GAME_PAGE, GAME_QUERY, get_asset_server, stop_asset_server
+from totter.api.bounds import DEFAULT_TOP_SPEED
+from totter.api.capture import CanvasCapture, ScreenCapture, SharedScreenCapture
+from totter.api.display import display_manager
+from totter.api.gait import GaitTracker, RunResult
+from totter.api.health import BrowserFailure, BrowserMonitor, Watchdog
 from totter.api.image_processing import ImageProcessor
-from totter.utils.time import WallTimer
-
-# determine size of screen
-screen_width, screen_height = pyautogui.size()
+from totter.api.keyboard import PyAutoGuiKeyboard, WebDriverKeyboard, XTestKeyboard
+from totter.api.pipeline import FramePipeline
+from totter.api.posture import KNEELING_FRACTION, LYING_FRACTION
+from totter.api.probe import GameStateProbe
+from totter.api.strategy import QwopStrategy
+from totter.api.warp import dropped_time
+from totter.utils.time import GameTimer
+
+logger = logging.getLogger(__name__)
+
+try:
+    import pyautogui
+    # determine size of screen
+    screen_width, screen_height = pyautogui.size()
+except Exception:
+    # pyautogui can't be imported without a display, e.g. on a headless server that only uses virtual displays
+    pyautogui = None
+    screen_width, screen_height = 1920, 1080
 # correct for double-monitor setup
 if screen_width > 1920:
     screen_width = screen_width // 2
 
 # qwop-related constants
-_QWOP_URL = "http://foddy.net/Athletics.html?webgl=true"  # Note that it should be the HTML5 version
+_QWOP_URL = f'{GAME_ORIGIN}{GAME_PAGE}?{GAME_QUERY}'  # Note that it should be the HTML5 version
 _QWOP_WIDTH = 700
 _QWOP_HEIGHT = 500
+_WINDOW_MARGIN = 50  # space left around the game for the browser's chrome
 QWOP_CENTER = (screen_width // 2, screen_height // 2)
 QWOP_BOUNDING_BOX = (
     QWOP_CENTER[0] - _QWOP_WIDTH // 2,  # left
@@ -30,6 +56,23 @@ QWOP_BOUNDING_BOX = (
     _QWOP_HEIGHT  # height
 )
 
+# where to display the game to be captured
+SCREEN = 'screen'  # the screen totter was started on
+XVFB = 'xvfb'  # a virtual display per lane
+TILED = 'tiled'  # every lane in a grid on one large virtual display
+DISPLAYS = (SCREEN, XVFB, TILED)
+
+# how key events reach the game
+SYSTEM_INPUT = 'system'  # keys pressed on the game's display, which go to the focused window
+XTEST_INPUT = 'xtest'  # like SYSTEM_INPUT, but always through XTest, which doesn't pause after each key like pyautogui
+WEBDRIVER_INPUT = 'webdriver'  # key events dispatched into the game's page by its webdriver
+INPUTS = (SYSTEM_INPUT, XTEST_INPUT, WEBDRIVER_INPUT)
+
+# where frames of the game are captured from
+SCREEN_CAPTURE = 'screen'  # the game's region of its display
+CANVAS_CAPTURE = 'canvas'  # the game's canvas, read through its webdriver
+CAPTURES = (SCREEN_CAPTURE, CANVAS_CAPTURE)
+
 # create a selenium driver to open web pages
 current_dir = os.path.dirname(os.path.abspath(__file__))
 driver_dir = os.path.join(current_dir, 'drivers')
@@ -43,53 +86,350 @@ else:
 
 geckopath = os.path.abspath(geckopath)
 
-_browser = None
+# geckodriver and Firefox read the display from the environment, so launches that change it must not overlap
+_launch_lock = threading.Lock()
+
+# time in seconds a state probe is given to see the game draw text before a run falls back to reading the screen
+_PROBE_GRACE_PERIOD = 2
 
+_PAGE_LOAD_TIMEOUT = 30  # time in seconds given to the game's page to load
+_LOAD_POLL_INTERVAL = 0.25  # time in seconds between checks of whether the page has loaded
+# whether the page has loaded and holds the game's canvas
+_READY_SCRIPT = "return document.readyState === 'complete' && document.getElementsByTagName('canvas').length > 0;"
+_RESET_TIMEOUT = 1  # time in seconds given to the game to show the start of a run after its restart keys are pressed
+_RESET_POLL_INTERVAL = 0.02  # time in seconds between checks of whether a reset is done
 
-def _open_qwop_window():
-    """ Opens a browser tab with the HTML5 version of QWOP """
-    global _browser
-    _browser = webdriver.Firefox(executable_path=geckopath)
-    # move the browser window to a fixed and predictable location
-    _browser.set_window_size(width=QWOP_BOUNDING_BOX[2]+100, height=QWOP_BOUNDING_BOX[3]+100)
-    _browser.set_window_position(x=QWOP_BOUNDING_BOX[0]-50, y=QWOP_BOUNDING_BOX[1]-50)
 
-    _browser.get(_QWOP_URL)
+_CELL_WIDTH = _QWOP_WIDTH + 2 * _WINDOW_MARGIN
+_CELL_HEIGHT = _QWOP_HEIGHT + 2 * _WINDOW_MARGIN
 
 
-def _close_qwop_window():
-    """ Kills the open webview """
-    global _browser
-    _browser.quit()
+def lane_bounding_boxes(lanes, columns=None):
+    """ Lays out the windows of several QWOP instances in a grid, starting from the top-left of the screen
 
+    Args:
+        lanes (int): number of QWOP instances
+        columns (int): number of windows in each row of the grid.  Defaults to as many as fit on the screen.
 
-def _end_game_manually():
-    """ Performs a series of bad keystrokes that probably ends the game """
-    pyautogui.keyDown('w')
-    time.sleep(1)
-    pyautogui.keyUp('w')
-    pyautogui.keyDown('q')
-    pyautogui.keyDown('p')
-    time.sleep(3)
-    pyautogui.keyUp('q')
-    pyautogui.keyUp('p')
+    Returns:
+        list<(int, int, int, int)>: left, top, width, height of the game in each window
+
+    """
+    cell_width = _CELL_WIDTH
+    cell_height = _CELL_HEIGHT
+    if columns is None:
+        columns = max(1, screen_width // cell_width)
+    boxes = list()
+    for lane in range(lanes):
+        row, column = divmod(lane, columns)
+        boxes.append((
+            column * cell_width + _WINDOW_MARGIN,
+            row * cell_height + _WINDOW_MARGIN,
+            _QWOP_WIDTH,
+            _QWOP_HEIGHT
+        ))
+    return boxes
+
+
+class QwopGame(object):
+    def __init__(self, bounding_box=QWOP_BOUNDING_BOX, keyboard=None, virtual_display=False, display=None,
+                 capture=None, input_method=SYSTEM_INPUT, capture_method=SCREEN_CAPTURE, headless=False,
+                 local_assets=False, time_warp=1):
+        """ Initialize a QwopGame
+        A QwopGame is a browser window with the HTML5 version of QWOP, placed at a fixed location on screen.
+
+        Args:
+            bounding_box ((int, int, int, int)): left, top, width, height of the region of the screen used by the game
+            keyboard (Keyboard):
+                keyboard used to send keys to the game.
+                Defaults to a PyAutoGuiKeyboard, or an XTestKeyboard on the game's virtual display.
+            virtual_display (bool):
+                if set, the game runs on its own virtual display, which is started when the game is opened and
+                stopped when it is closed.  `bounding_box` is then relative to the virtual display.
+            display (VirtualDisplay):
+                running virtual display shared with other games.  The game doesn't stop it when it is closed.
+            capture (ScreenCapture or SharedScreenCapture):
+                source of the game's frames.  Defaults to capturing the game's region of its display.
+            input_method (str):
+                one of INPUTS.  Used to create the game's keyboard when `keyboard` is not given.
+                With WEBDRIVER_INPUT, keys reach the game even when its window doesn't have focus.
+            capture_method (str): one of CAPTURES.  Used to create the game's capture when `capture` is not given.
+            headless (bool):
+                if set, Firefox runs without a window.  The game then needs WEBDRIVER_INPUT and CANVAS_CAPTURE.
+            local_assets (bool):
+                if set, the game is loaded from a copy served from localhost rather than from foddy.net.
+                See `totter.api.assets`.
+            time_warp (float):
+                number of game seconds that pass in a real second.  Games whose clock runs faster than real time need
+                `local_assets`.  See `totter.api.warp`.
+
+        """
+        if headless and (input_method != WEBDRIVER_INPUT or capture_method != CANVAS_CAPTURE):
+            raise ValueError('Headless games need webdriver input and canvas capture')
+        if time_warp != 1 and not local_assets:
+            raise ValueError('Only games loaded from local assets can run faster than real time')
+
+        self.bounding_box = bounding_box
+        self.center = (bounding_box[0] + bounding_box[2] // 2, bounding_box[1] + bounding_box[3] // 2)
+        self.virtual_display = virtual_display
+        self.display = display
+        self.input_method = input_method
+        self.capture_method = capture_method
+        self.headless = headless
+        self.local_assets = local_assets
+        self.time_warp = time_warp
+        # keyboards and captures on a virtual display can only be created once the display has started,
+        # and keyboards and captures that talk to the page once the browser has
+        self._owns_keyboard = keyboard is None and (virtual_display or display is not None
+                                                    or input_method != SYSTEM_INPUT)
+        self._owns_capture = capture is None
+        if keyboard is None and not self._owns_keyboard:
+            keyboard = PyAutoGuiKeyboard()
+        self.keyboard = keyboard
+        self.capture = capture
+        self.browser = None
+        self.reset_latencies = list()  # time in seconds taken by each reset
+        self.recycles = 0  # number of times the game's browser was replaced by a new one
+        self._start_checker = None  # ImageProcessor that reads frames to confirm resets
+
+    def is_open(self):
+        return self.browser is not None
+
+    def _launch_browser(self):
+        """ Starts Firefox on the game's display """
+        options = webdriver.FirefoxOptions()
+        if self.headless:
+            options.add_argument('-headless')
+        if self.display is None:
+            return webdriver.Firefox(executable_path=geckopath, options=options)
+
+        with _launch_lock:
+            previous_display = os.environ.get('DISPLAY')
+            os.environ['DISPLAY'] = self.display.name
+            try:
+                return webdriver.Firefox(executable_path=geckopath, options=options)
+            finally:
+                if previous_display is None:
+                    del os.environ['DISPLAY']
+                else:
+                    os.environ['DISPLAY'] = previous_display
+
+    def open(self):
+        """ Opens a browser tab with the HTML5 version of QWOP and waits for it to load """
+        if self.virtual_display:
+            self.display = display_manager.create(width=self.bounding_box[0] + self.bounding_box[2] + _WINDOW_MARGIN,
+                                                  height=self.bounding_box[1] + self.bounding_box[3] + _WINDOW_MARGIN)
+        display_name = self.display.name if self.display is not None else None
+        if self._owns_keyboard and self.input_method != WEBDRIVER_INPUT:
+            # games sharing a display have to focus their own window before sending keys
+            focus_point = None if self.virtual_display else self.center
+            self.keyboard = XTestKeyboard(display_name, focus_point=focus_point)
+        if self._owns_capture and self.capture_method == SCREEN_CAPTURE:
+            self.capture = ScreenCapture(display_name)
+
+        self.browser = self._launch_browser()
+        if self._owns_keyboard and self.input_method == WEBDRIVER_INPUT:
+            self.keyboard = WebDriverKeyboard(self.browser)
+        if self._owns_capture and self.capture_method == CANVAS_CAPTURE:
+            self.capture = CanvasCapture(self.browser)
+        # move the browser window to a fixed and predictable location
+        self.browser.set_window_size(width=self.bounding_box[2] + 2 * _WINDOW_MARGIN,
+                                     height=self.bounding_box[3] + 2 * _WINDOW_MARGIN)
+        self.browser.set_window_position(x=self.bounding_box[0] - _WINDOW_MARGIN,
+                                         y=self.bounding_box[1] - _WINDOW_MARGIN)
+
+        self.browser.get(get_asset_server().game_url(self.time_warp) if self.local_assets else _QWOP_URL)
+        self.capture.invalidate()
+        self._wait_for_load()
+        # clicking the game dismisses its start screen
+        self.focus()
+        _open_games.add(self)
+
+    def _wait_for_load(self, timeout=_PAGE_LOAD_TIMEOUT):
+        """ Waits for the game's page to load and for the game to show its start screen
+
+        The start screen is considered shown once two frames in a row are identical, and not blank: while the game
+        loads, its canvas shows a progress bar.
+
+        Args:
+            timeout (float): time in seconds after which the game is used even if it doesn't look ready
+
+        Returns:
+            bool: whether the game was ready within `timeout`
+
+        """
+        deadline = time.perf_counter() + timeout
+        previous_pixels = None
+        while time.perf_counter() < deadline:
+            if self.browser.execute_script(_READY_SCRIPT):
+                frame = self.screenshot().convert(mode='L')
+                darkest, brightest = frame.getextrema()
+                pixels = frame.tobytes()
+                if darkest != brightest and pixels == previous_pixels:
+                    return True
+                previous_pixels = pixels
+            time.sleep(_LOAD_POLL_INTERVAL)
+        logger.warning(f'The game did not look ready {timeout} seconds after its page was opened')
+        return False
+
+    def close(self):
+        """ Kills the open webview, and the virtual display it was running on """
+        if self.browser is not None:
+            try:
+                self.browser.quit()
+            except WebDriverException as error:
+                # the browser crashed or was killed, and geckodriver may already have stopped
+                logger.warning(f'The browser could not be closed cleanly: {error}')
+            self.browser = None
+        if self._owns_keyboard and self.keyboard is not None:
+            self.keyboard.close()
+            self.keyboard = None
+        if self.virtual_display and self.display is not None:
+            display_manager.release(self.display)
+            self.display = None
+        _open_games.discard(self)
+
+    def recycle(self):
+        """ Replace the game's browser with a new one, which frees whatever the old one accumulated """
+        self.close()
+        self.open()
+        self.recycles += 1
+
+    def focus(self):
+        """ Click the game to give it keyboard focus """
+        if self.display is None and self.keyboard.uses_window_focus:
+            pyautogui.moveTo(self.center[0], self.center[1], duration=0.1)
+            pyautogui.click()
+        else:
+            # clicking through the webdriver doesn't move the mouse, which may be shared with other games.
+            # That is enough to start the game, and keyboards that don't use window focus need nothing more
+            self.browser.find_element('tag name', 'canvas').click()
+
+    def refocus(self):
+        """ Give the game keyboard focus again, if other windows on its screen may have taken it """
+        if self.display is None and self.keyboard.uses_window_focus:
+            pyautogui.click(self.center[0], self.center[1])
+
+    def reset(self, probe=None, timeout=_RESET_TIMEOUT):
+        """ Return the game to the start of a run
+
+        The game is restarted with its own keys: space restarts it from the game-over screen, and R at any time.
+        The start of the run is confirmed by `probe` if it works with the game, or else by reading the game's frames.
+        If the game doesn't restart within `timeout`, its page is reloaded.
+
+        Args:
+            probe (GameStateProbe): probe installed in the game's page, or None
+            timeout (float): time in seconds given to the game to show the start of a run
+
+        Returns:
+            float: time in seconds that the reset took.  It is also added to `reset_latencies`.
+
+        """
+        start = time.perf_counter()
+        if probe is not None:
+            probe.reset()
+        with keyboard.use(self.keyboard):
+            for key in ('space', 'r'):
+                keyboard.key_down(key)
+                keyboard.key_up(key)
+
+        if not self._wait_for_start(probe, timeout):
+            logger.warning('The game did not restart after its restart keys were pressed.  Reloading its page.')
+            self.browser.refresh()
+            # elements found on the old page are stale
+            self.capture.invalidate()
+            self._wait_for_load()
+            self.focus()
+            if probe is not None:
+                probe.reset()
+
+        latency = time.perf_counter() - start
+        self.reset_latencies.append(latency)
+        return latency
+
+    def _wait_for_start(self, probe, timeout):
+        """ Waits for the game to show the start of a run
+
+        Returns:
+            bool: whether the game showed the start of a run within `timeout` seconds
+        """
+        deadline = time.perf_counter() + timeout
+        while time.perf_counter() < deadline:
+            if probe is not None and probe.is_available():
+                if probe.poll() is not None and probe.is_at_start():
+                    return True
+            elif self._shows_start():
+                return True
+            time.sleep(_RESET_POLL_INTERVAL)
+        return False
+
+    def _shows_start(self):
+        """ Whether the latest frame of the game shows a distance of 0 and no game-over box """
+        if self._start_checker is None:
+            self._start_checker = ImageProcessor()
+        self._start_checker.reset()
+        self._start_checker.update(self.screenshot())
+        return (self._start_checker.latest_distance_read and self._start_checker.current_distance == 0
+                and not self._start_checker.is_game_over())
+
+    def dropped_time(self):
+        """ Returns: float: game time in seconds that the game's clock skipped because the page couldn't keep up """
+        return dropped_time(self.browser) if self.time_warp != 1 else 0
+
+    def screenshot(self):
+        """ Returns: PIL.Image: capture of the region of the screen used by the game """
+        return self.capture.grab(self.bounding_box)
+
+
+_default_game = None
+_open_games = set()
+
+
+def _get_default_game():
+    """ Returns the QwopGame controlled by `start_qwop` and `stop_qwop` """
+    global _default_game
+    if _default_game is None:
+        _default_game = QwopGame()
+    return _default_game
+
+
+def _stall_checks(buffer_size, time_warp):
+    """ Number of checks in a row that a distance must stay the same for a warped game to be considered stalled
+
+    Checks are made at the same rate whatever the warp, so a game running faster than real time needs fewer of them
+    to cover the game time that `buffer_size` checks cover at real time.
+
+    Args:
+        buffer_size (int): number of checks at real time, or zero to never end a run that stalls
+        time_warp (float): game seconds per real second
+
+    Returns:
+        int: the number of checks
+
+    """
+    if buffer_size <= 2:
+        return buffer_size
+    return max(2, math.ceil((buffer_size - 1) / time_warp) + 1)
 
 
 def start_qwop():
     """ Create a QWOP instance and wait for it to load """
-    _open_qwop_window()
-    time.sleep(5)
+    _get_default_game().open()
 
 
 def stop_qwop():
-    """ Stop the QWOP instance if one is open """
-    global _browser
-    if _browser is not None:
-        _close_qwop_window()
+    """ Stop every QWOP instance that is open, along with their virtual displays """
+    for game in list(_open_games):
+        game.close()
+    display_manager.stop_all()
+    stop_asset_server()
 
 
 class QwopSimulator(object):
-    def __init__(self, time_limit, buffer_size=16):
+    def __init__(self, time_limit, buffer_size=16, game=None, pipeline=False, capture_rate=20, analysis_rate=10,
+                 probe=False, probe_interval=0.02, fall_confidence=None, lying_fraction=LYING_FRACTION,
+                 kneeling_fraction=KNEELING_FRACTION, top_speed=DEFAULT_TOP_SPEED, gait_cycles=None, watchdog=False,
+                 recycle_every=None):
         """ Initialize a QwopSimulator
         QwopSimulator provides a method for running a QwopStrategy object in an instance of the QWOP game
 
@@ -98,145 +438,543 @@ class QwopSimulator(object):
             buffer_size (int):
                 number of checks to perform in the same-history ending condition.
                 If the distance run is the same for `buffer_size` checks in a row, then the simulation is terminated.
-                Checks are performed 3-4 times per second depending on processor speed.
+                Checks are performed 3-4 times per second depending on processor speed.  For games running faster
+                than real time, the number of checks is scaled down so that they span the same game time.
+            game (QwopGame): the game instance to play.  Defaults to the instance opened by `start_qwop`.
+            pipeline (bool):
+                if set, frames are analyzed in a separate process by a FramePipeline, instead of by a thread of this
+                process 4 times per second
+            capture_rate (float): frames captured per second by the pipeline
+            analysis_rate (float): frames analyzed per second by the pipeline
+            probe (bool):
+                if set, the state of the game is read from its JavaScript runtime by a GameStateProbe.  Frames are
+                only analyzed if the probe doesn't work with the game.
+            probe_interval (float): time in seconds between polls of the probe
+            fall_confidence (float):
+                if given, runs also end once the image processor is this confident that the runner has fallen or is
+                stuck on its knees.  The probe doesn't look at frames, so it ignores this.
+            lying_fraction (float):
+                height of a lying runner, as a fraction of its standing height.  See `totter.api.posture`.
+            kneeling_fraction (float): height of a kneeling runner, as a fraction of its standing height
+            top_speed (float):
+                speed in metres per second above which no runner runs.  Runs given a fitness bound are stopped once
+                they can't exceed it even at this speed.
+            gait_cycles (int):
+                if given, runs end once the runner has kept a steady gait for this many cycles, and the distance and
+                time of the rest of the run are extrapolated from its speed.  See `totter.api.gait`.
+            watchdog (bool):
+                if set, the game's browser is checked during every run.  A browser that stops responding is killed, and
+                a run during which it stopped drawing frames is lost.  A slow or bloated browser is replaced after the
+                run.  See `totter.api.health`.
+            recycle_every (int): if given, the game's browser is replaced after this many runs
         """
         self.time_limit = time_limit
-        self.timer = WallTimer()
-        self.image_processor = ImageProcessor(buffer_size=buffer_size)
+        self.game = game if game is not None else _get_default_game()
+        # times are measured in game time, which runs faster than real time for warped games
+        self.timer = GameTimer(self.game.time_warp)
+        self.pipeline = pipeline
+        # the stagnation window is measured in game time
+        buffer_size = _stall_checks(buffer_size, self.game.time_warp)
+        if pipeline:
+            self.image_processor = FramePipeline(self.game.screenshot, size=self.game.bounding_box[2:],
+                                                 buffer_size=buffer_size, capture_rate=capture_rate,
+                                                 analysis_rate=analysis_rate, fall_confidence=fall_confidence,
+                                                 lying_fraction=lying_fraction, kneeling_fraction=kneeling_fraction)
+        else:
+            self.image_processor = ImageProcessor(buffer_size=buffer_size, fall_confidence=fall_confidence,
+                                                  lying_fraction=lying_fraction, kneeling_fraction=kneeling_fraction)
+        self.probe = GameStateProbe(self.game) if probe else None
+        self.probe_interval = probe_interval
+        # the probe or image processor observing the current run
+        self.observer = self.image_processor
+        # set when the current run ends, which interrupts the strategy
+        self.game_over_event = threading.Event()
+        self.top_speed = top_speed
+        self.bound = None  # FitnessBound of the current run
+        self.aborted = False  # whether the current run was stopped because it couldn't exceed its bound
+        self.gait = GaitTracker(stable_cycles=gait_cycles) if gait_cycles is not None else None
+        self.estimate = None  # extrapolated distance and time of the current run, if it was ended early
+        self._tracking_gait = False
+        self.reset_latency = None  # time in seconds taken to reset the game before the current run
+        self._prepared = False  # whether the game has been reset since the last run
+        self.watchdog = Watchdog(BrowserMonitor(self.game)) if watchdog else None
+        self.recycle_every = recycle_every
+        self.runs_since_recycle = 0
+        self._needs_recycle = None  # why the browser must be replaced before the next run, if it must
+        self._browser_error = None  # error raised by the browser during the current run
+
+    def _in_progress(self):
+        """ Whether the run goes on: it is within the time limit, can exceed its bound and has no steady gait """
+        if self.game_over_event.is_set():
+            # the run was lost
+            return False
+        elapsed = self.timer.since().total_seconds()
+        if elapsed >= self.time_limit:
+            return False
+        distance = self.observer.current_distance
+        if self.bound is not None and not self.bound.can_exceed(distance, elapsed, self.time_limit, self.top_speed):
+            self.aborted = True
+            return False
+        if self._tracking_gait and self.gait.update(elapsed, distance):
+            self.estimate = self.gait.extrapolate(distance, elapsed, self.time_limit)
+            return False
+        return True
 
     def _loop_gameover_check(self, interval=0.25):
         """ Checks if the game has ended every `interval` seconds.
-        Terminates when the game ends or after the simulator's time limit is reached.
+        Terminates when the game ends, after the simulator's time limit is reached or once the run can't exceed its
+        fitness bound.
 
         Args:
             interval (float): time in seconds between game over checks
 
         Returns: None
         """
-        while self.timer.since() < timedelta(seconds=self.time_limit):
-            screen = pyautogui.screenshot(region=QWOP_BOUNDING_BOX)
-            self.image_processor.update(screen)
+        # a frame is processed before the first check, so that a run stopped right away still has a final screen
+        self.image_processor.update(self.game.screenshot())
+        while self._in_progress():
             if self.image_processor.is_game_over():
                 break
             time.sleep(interval)
+            self.image_processor.update(self.game.screenshot())
 
-    def is_game_over(self):
-        return self.image_processor.is_game_over()
+    def _loop_probe_check(self, interval=0.02):
+        """ Polls the probe every `interval` seconds.
+        Terminates like `_loop_gameover_check`.  If the probe sees no text within its grace period, the rest of the run
+        is observed by the image processor instead.
+
+        Args:
+            interval (float): time in seconds between polls
+
+        Returns: None
+        """
+        while self._in_progress():
+            self.probe.poll()
+            if self.probe.is_game_over():
+                break
+            if not self.probe.is_available() and self.timer.since() > timedelta(seconds=_PROBE_GRACE_PERIOD):
+                self.image_processor.reset()
+                self.observer = self.image_processor
+                if not self.pipeline:
+                    self._loop_gameover_check()
+                break
+            time.sleep(interval)
+
+    def _loop_pipeline_check(self, interval=0.02):
+        """ Waits for the frame pipeline to see the end of the game, or for the run to stop for another reason """
+        while self._in_progress() and not self.image_processor.is_game_over():
+            time.sleep(interval)
+
+    def _watch_game(self):
+        """ Body of the game over checker thread.  Sets `game_over_event` once the run has ended. """
+        try:
+            if self.probe is not None:
+                self._loop_probe_check(self.probe_interval)
+            elif self.pipeline:
+                self._loop_pipeline_check()
+            else:
+                self._loop_gameover_check(0.25)
+        except WebDriverException as error:
+            self._browser_error = f'the browser failed: {error}'
+        finally:
+            self.game_over_event.set()
 
-    def simulate(self, strategy, qwop_started=False):
+    def is_game_over(self):
+        return self.observer.is_game_over()
+
+    def _recycle_reason(self):
+        """ Returns: str: why the game's browser should be replaced before the next run, or None if it shouldn't """
+        if self._needs_recycle is not None:
+            return self._needs_recycle
+        if self.recycle_every is not None and self.runs_since_recycle >= self.recycle_every:
+            return f'it played {self.runs_since_recycle} runs'
+        if self.watchdog is not None and not self.watchdog.responsive():
+            return 'it did not respond'
+        return None
+
+    def _recycle(self, reason):
+        logger.info(f'Replacing the browser of a game, because {reason}')
+        self.game.recycle()
+        self.runs_since_recycle = 0
+        self._needs_recycle = None
+
+    def prepare(self):
+        """ Return the game to the start of a run, so that the next call to `simulate` starts the run right away
+
+        The game's browser is replaced first if it failed or degraded during the last run, if it doesn't respond, or
+        if it played `recycle_every` runs.
+        """
+        reason = self._recycle_reason()
+        if reason is not None:
+            self._recycle(reason)
+        try:
+            self.game.refocus()
+            self.reset_latency = self.game.reset(probe=self.probe)
+        except WebDriverException as error:
+            self._recycle(f'it failed during a reset: {error}')
+            self.reset_latency = self.game.reset(probe=self.probe)
+        self._prepared = True
+
+    def simulate(self, strategy, qwop_started=False, bound=None, estimate=True):
         """ Run the given QwopStrategy
 
         Args:
             strategy (QwopStrategy): the strategy to execute
-            qwop_started (bool): if set, the simulator will assume that a QWOP window has already been opened
+            qwop_started (bool):
+                if set, the simulator will assume that a QWOP window has already been opened, and leave it open.
+                A game that isn't open yet is then opened on first use.
+            bound (FitnessBound):
+                if given, the run is stopped as soon as it can't exceed the bound.  The distance and time reported are
+                then those of the run up to that point.
+            estimate (bool):
+                whether the run may be ended once the runner has a steady gait.  Only simulators given `gait_cycles`
+                end runs this way.
 
         Returns:
-            (float, float): distance run, time taken
+            RunResult: distance run, time taken, and whether they were extrapolated
 
-        """
-        if not qwop_started:
-            start_qwop()
+        Raises:
+            BrowserFailure:
+                if the browser crashed, hung or stopped drawing frames during the run.  The browser is replaced before
+                the next run.
 
-        # click the qwop window to give it keyboard focus
-        pyautogui.moveTo(QWOP_CENTER[0], QWOP_CENTER[1], duration=0.1)
-        pyautogui.click()
+        """
+        # the game of a simulator created before any game was started is opened on first use, and then kept open
+        if not qwop_started or not self.game.is_open():
+            self.game.open()
+
+        # return the game to the start of a run, whatever state the previous run left it in
+        if not self._prepared:
+            self.prepare()
+        self._prepared = False
+
+        self.game_over_event.clear()
+        self.bound = bound
+        self.aborted = False
+        self.estimate = None
+        self._tracking_gait = estimate and self.gait is not None
+        if self._tracking_gait:
+            self.gait.reset()
+        self._browser_error = None
+        self.runs_since_recycle += 1
+        dropped_before = self.game.dropped_time()
+        with keyboard.use(self.game.keyboard, interrupt=self.game_over_event, rate=self.game.time_warp):
+            # prep for a new run
+            self.timer.restart()
+            if self.probe is not None:
+                self.probe.reset()
+                self.observer = self.probe
+            else:
+                self.image_processor.reset()
+                self.observer = self.image_processor
+
+            # start a thread to check if the game is over:
+            game_over_checker = threading.Thread(target=self._watch_game)
+            game_over_checker.start()
+            if self.watchdog is not None:
+                self.watchdog.start(self.game_over_event)
+
+            # loop the strategy until the game ends or we hit the time limit.
+            # The checker interrupts the strategy between two key events as soon as either happens
+            strategy.reset()
+            try:
+                try:
+                    while not self.game_over_event.is_set():
+                        strategy.execute()
+                except keyboard.Interrupted:
+                    pass
+                strategy.cleanup()
+            except WebDriverException as error:
+                self._browser_error = f'the browser failed: {error}'
+                self.game_over_event.set()
 
-        # press spacebar to restart the simulator if necessary
-        pyautogui.press('space')
+        # wait for the game over thread to finish its thing
+        game_over_checker.join()
+        if self.watchdog is not None:
+            self.watchdog.join()
+
+        failure = self.watchdog.failure if self.watchdog is not None else None
+        failure = failure or self._browser_error
+        if failure is not None:
+            self._needs_recycle = failure
+            if not qwop_started:
+                self.game.close()
+            raise BrowserFailure(failure)
+        if self.watchdog is not None and len(self.watchdog.problems) > 0:
+            self._needs_recycle = ' and '.join(self.watchdog.problems)
+
+        if self.observer is self.probe:
+            # the probe also knows how long the run took in game time
+            self.probe.poll()
+            distance_run = self.probe.get_final_distance()
+            run_time = int(self.probe.elapsed)
+        else:
+            distance_run = self.image_processor.get_final_distance()
+            run_time = self.timer.since().seconds
+            if self.probe is not None and not self.probe.is_available():
+                logger.warning('The game state probe saw no text from the game.  Reading the screen from now on.')
+                self.probe = None
+
+        dropped = self.game.dropped_time() - dropped_before
+        if dropped > 0:
+            logger.warning(f'The game fell {dropped:.2f} s behind its clock during the run.  '
+                           f'Its physics ran slower than {self.game.time_warp} times real time.')
 
-        # prep for a new run
-        self.timer.restart()
-        self.image_processor.reset()
+        # if the simulator started its own QWOP window, then it should be destroyed
+        if not qwop_started:
+            self.game.close()
 
-        # start a thread to check if the game is over:
-        game_over_checker = threading.Thread(target=self._loop_gameover_check, args=(0.25,))
-        game_over_checker.start()
+        if self.estimate is not None:
+            distance_run, run_time = self.estimate
+            return RunResult(distance_run, int(run_time), estimated=True)
+        return RunResult(distance_run, run_time)
 
-        # loop the strategy until the game ends or we hit the time limit
-        while self.timer.since() < timedelta(seconds=self.time_limit) and not self.image_processor.is_game_over():
-            strategy.execute()
+    def close(self):
+        """ Stop the frame pipeline and the watchdog, if any """
+        if self.pipeline:
+            self.image_processor.close()
+        if self.watchdog is not None:
+            self.watchdog.close()
 
-        strategy.cleanup()
 
-        # wait for the game over thread to finish its thing
-        game_over_checker.join()
+class _BufferedLane(object):
+    def __init__(self, first, second, executor):
+        """ A lane of a QwopEvaluator that alternates between two games
 
-        distance_run = self.image_processor.get_final_distance()
-        run_time = self.timer.since().seconds
+        Each run is played on one game while the game of the previous run is reset by `executor`.  The lane follows
+        the interface of QwopSimulator used by QwopEvaluator.
 
-        # if the simulator started its own QWOP window, then it should be destroyed
-        if not qwop_started:
-            stop_qwop()
+        Args:
+            first (QwopSimulator): simulator of the first game
+            second (QwopSimulator): simulator of the second game
+            executor (Executor): executor that resets the games in the background
+        """
+        self._executor = executor
+        self._next = first  # simulator of the next run
+        self._next_ready = executor.submit(first.prepare)  # future of the reset of `_next`'s game
+        self._previous = second  # simulator of the previous run
+        self.aborted = False
+
+    def simulate(self, strategy, qwop_started=True, bound=None, estimate=True):
+        """ Run `strategy` on the game that was reset in the background, and start resetting the other game
+
+        Raises:
+            BrowserFailure:
+                if the game couldn't be reset.  Its browser is then replaced in the background, so that the lane can
+                be used again.
+        """
+        try:
+            self._next_ready.result()
+        except Exception as error:
+            self._next._needs_recycle = f'it failed during a reset: {error}'
+            self._next_ready = self._executor.submit(self._next.prepare)
+            raise BrowserFailure(f'the game could not be reset: {error}') from error
+        current = self._next
+        self._next = self._previous
+        self._next_ready = self._executor.submit(self._next.prepare)
+        self._previous = current
 
-        return distance_run, run_time
+        result = current.simulate(strategy, qwop_started=qwop_started, bound=bound, estimate=estimate)
+        self.aborted = current.aborted
+        return result
 
 
 class QwopEvaluator(object):
-    def __init__(self, time_limit):
+    def __init__(self, time_limit, lanes=1, display=SCREEN, input_method=SYSTEM_INPUT, capture_method=SCREEN_CAPTURE,
+                 headless=False, pipeline=False, capture_rate=20, analysis_rate=10, probe=False, fall_confidence=None,
+                 lying_fraction=LYING_FRACTION, kneeling_fraction=KNEELING_FRACTION, top_speed=DEFAULT_TOP_SPEED,
+                 gait_cycles=None, spare_games=False, local_assets=False, time_warp=1, watchdog=False,
+                 recycle_every=None, retries=2):
         """ Initialize a QwopEvaluator
         QwopEvaluator objects run QwopStrategy objects and report the distance run and time taken.
 
+        The evaluator owns one or more lanes.  Each lane is an independent QWOP instance with its own window, capture
+        region and keyboard.  When several strategies are evaluated at once, they are spread across the lanes and
+        evaluated concurrently.
+        Lanes only run correctly side by side when their keyboards don't share the focused window, so several lanes
+        should either be given their own virtual displays or use WEBDRIVER_INPUT.
+        With `spare_games`, each lane has a second QWOP instance, which is reset while the other one runs.
+
         Args:
             time_limit (float): time limit in seconds for each evaluation
+            lanes (int): number of QWOP instances used for evaluation
+            display (str): one of DISPLAYS
+            input_method (str): one of INPUTS
+            capture_method (str): one of CAPTURES
+            headless (bool): if set, the games run in headless browsers.  See QwopGame.
+            pipeline (bool): if set, each lane analyzes its frames in a separate process.  See QwopSimulator.
+            capture_rate (float): frames captured per second by each lane's pipeline
+            analysis_rate (float): frames analyzed per second by each lane's pipeline
+            probe (bool): if set, each lane reads the state of its game from the page.  See QwopSimulator.
+            fall_confidence (float): if given, runs end early when the runner is down.  See QwopSimulator.
+            lying_fraction (float): height of a lying runner for the fall detection.  See QwopSimulator.
+            kneeling_fraction (float): height of a kneeling runner for the fall detection.  See QwopSimulator.
+            top_speed (float): speed used to stop runs that can't exceed their fitness bound.  See QwopSimulator.
+            gait_cycles (int): if given, runs with a steady gait are ended and extrapolated.  See QwopSimulator.
+            spare_games (bool):
+                if set, each lane alternates between two games, so that a run starts as soon as the previous one
+                ended instead of waiting for the game to reset.  The two games of a lane are used at the same time,
+                so they can't share the focused window of the current screen.
+            local_assets (bool): if set, the games are loaded from localhost.  See QwopGame.
+            time_warp (float):
+                number of game seconds that pass in a real second.  Needs `local_assets`.  `time_limit`, run times and
+                the pauses of strategies are in game seconds.
+            watchdog (bool): if set, each lane's browser is checked during its runs.  See QwopSimulator.
+            recycle_every (int):
+                if given, each browser is replaced after this many runs.  With `spare_games`, browsers are replaced
+                while the lane's other game runs.
+            retries (int): number of times an evaluation lost to a browser failure is tried again
         """
-        self.evaluations = 0
-        self.simulator = QwopSimulator(time_limit=time_limit)
-        # create an instance of QWOP
-        start_qwop()
+        if spare_games and display == SCREEN and input_method == SYSTEM_INPUT:
+            raise ValueError('Spare games need virtual displays, or an input other than system input')
 
-    def evaluate(self, strategies):
+        self.lanes = lanes
+        self.evaluations = 0
+        self.aborted_evaluations = 0  # evaluations stopped because they couldn't exceed their bound
+        self.estimated_evaluations = 0  # evaluations extrapolated from a steady gait
+        self.retried_evaluations = 0  # evaluations tried again after a browser failure
+        self.retries = retries
+        self._count_lock = threading.Lock()
+        self._shared_display = None
+        instances = 2 * lanes if spare_games else lanes
+        game_options = {'input_method': input_method, 'capture_method': capture_method, 'headless': headless,
+                        'local_assets': local_assets, 'time_warp': time_warp}
+        if display == XVFB:
+            virtual_box = (_WINDOW_MARGIN, _WINDOW_MARGIN, _QWOP_WIDTH, _QWOP_HEIGHT)
+            games = [QwopGame(bounding_box=virtual_box, virtual_display=True, **game_options)
+                     for _ in range(instances)]
+        elif display == TILED:
+            # lay the games out in a square grid on a display just big enough to hold it
+            columns = math.ceil(math.sqrt(instances))
+            rows = math.ceil(instances / columns)
+            self._shared_display = display_manager.create(width=columns * _CELL_WIDTH, height=rows * _CELL_HEIGHT)
+            capture = SharedScreenCapture(self._shared_display.name) if capture_method == SCREEN_CAPTURE else None
+            games = [QwopGame(bounding_box=box, display=self._shared_display, capture=capture, **game_options)
+                     for box in lane_bounding_boxes(instances, columns=columns)]
+        elif instances == 1 and input_method == SYSTEM_INPUT and capture_method == SCREEN_CAPTURE and not local_assets:
+            games = [_get_default_game()]
+        elif instances == 1:
+            games = [QwopGame(**game_options)]
+        else:
+            games = [QwopGame(bounding_box=box, **game_options) for box in lane_bounding_boxes(instances)]
+        self.simulators = [QwopSimulator(time_limit=time_limit, game=game, pipeline=pipeline,
+                                         capture_rate=capture_rate, analysis_rate=analysis_rate, probe=probe,
+                                         fall_confidence=fall_confidence, lying_fraction=lying_fraction,
+                                         kneeling_fraction=kneeling_fraction, top_speed=top_speed,
+                                         gait_cycles=gait_cycles, watchdog=watchdog, recycle_every=recycle_every)
+                           for game in games]
+
+        # create the instances of QWOP
+        self._executor = ThreadPoolExecutor(max_workers=lanes)
+        list(self._executor.map(lambda game: game.open(), games))
+
+        # lanes that are not evaluating a strategy
+        self._idle_lanes = queue.Queue()
+        self._reset_executor = None
+        if spare_games:
+            self._reset_executor = ThreadPoolExecutor(max_workers=lanes)
+            for first, second in zip(self.simulators[::2], self.simulators[1::2]):
+                self._idle_lanes.put(_BufferedLane(first, second, self._reset_executor))
+        else:
+            for simulator in self.simulators:
+                self._idle_lanes.put(simulator)
+
+    @property
+    def simulator(self):
+        """ The simulator of the first lane """
+        return self.simulators[0]
+
+    @property
+    def time_limit(self):
+        return self.simulator.time_limit
+
+    @time_limit.setter
+    def time_limit(self, time_limit):
+        for simulator in self.simulators:
+            simulator.time_limit = time_limit
+
+    def _evaluate_on_idle_lane(self, strategy, bound=None, estimate=True):
+        """ Waits for a lane to become idle, then evaluates `strategy` on that lane """
+        lane = self._idle_lanes.get()
+        try:
+            for attempt in range(self.retries + 1):
+                try:
+                    result = lane.simulate(strategy, qwop_started=True, bound=bound, estimate=estimate)
+                    break
+                except BrowserFailure as failure:
+                    if attempt == self.retries:
+                        raise
+                    logger.warning(f'An evaluation was lost because {failure}.  Trying it again.')
+                    with self._count_lock:
+                        self.retried_evaluations += 1
+            with self._count_lock:
+                self.aborted_evaluations += int(lane.aborted)
+                self.estimated_evaluations += int(result.estimated)
+            return result
+        finally:
+            self._idle_lanes.put(lane)
+
+    def evaluate(self, strategies, bounds=None, estimate=True):
         """ Evaluates a QwopStrategy or a set of QwopStrategy objects
 
         Args:
             strategies (QwopStrategy or Iterable<QwopStrategy>): set of strategies to evaluate
+            bounds (FitnessBound or Iterable<FitnessBound>):
+                bound of the evaluation of each strategy, or None for evaluations that always run to the end
+            estimate (bool): whether runs with a steady gait may be ended and extrapolated
 
         Returns:
-            ((distance1, time1), (distance2, time2), ...): distance,time pairs achieved by each QwopStrategy
+            (RunResult, RunResult, ...):
+                distance,time pairs achieved by each QwopStrategy, flagged if they were extrapolated
         """
         # check if a single strategy has been passed
         try:
-            num_strategies = len(strategies)
+            len(strategies)
         except TypeError:  # raised if a single QwopStrategy was passed
             strategies = [strategies]
-            num_strategies = len(strategies)
-
-        # create a vector to hold fitness values (initially filled with zeros)
-        fitness_values = [(0, 0) for i in range(0, num_strategies)]
-
-        # evaluate the strategies
-        for index, strategy in enumerate(strategies):
-            distance_run, time_taken = self.simulator.simulate(strategy, qwop_started=True)
-
-            fitness_values[index] = (distance_run, time_taken)
+            bounds = [bounds]
+        if bounds is None:
+            bounds = [None] * len(strategies)
 
-            # if the strategy didn't end the game, end it manually
-            if not self.simulator.is_game_over():
-                _end_game_manually()
+        # evaluate the strategies on whichever lanes are free, but report results in the order they were given
+        futures = [self._executor.submit(self._evaluate_on_idle_lane, strategy, bound, estimate)
+                   for strategy, bound in zip(strategies, bounds)]
+        fitness_values = [future.result() for future in futures]
+        self.evaluations += len(fitness_values)
 
         return tuple(fitness_values)
 
-
-class QwopStrategy:
-    def __init__(self, execution_function):
-        """ Class representing QWOP strategies
-
-        A QWOP Strategy is a sequence of keystrokes that plays QWOP.
-        Each Strategy must implement an `execute` method, which executes the keystrokes for the strategy with the correct timing.
-        When evaluating the strategy, `execute` will automatically be looped until the game ends.
-
-        Args:
-            execution_function (function): function that implements the strategy
-
-        """
-        self.execute = execution_function
-
-    def cleanup(self):
-        """ Cleans up after strategy execution
-
-        This method will be called after the game has ended or the evaluation time limit has been reached
-
-        Returns: None
-        """
-        # ensure all keys are up
-        for key in ('q', 'w', 'o', 'p', 'space'):
-            pyautogui.keyUp(key)
+    def close(self):
+        """ Close the QWOP instances used by the evaluator """
+        self._executor.shutdown(wait=True)
+        if self._reset_executor is not None:
+            # let resets in progress finish before their games are closed
+            self._reset_executor.shutdown(wait=True)
+        for lane, simulator in enumerate(self.simulators):
+            game_keyboard = simulator.game.keyboard
+            if isinstance(game_keyboard, XTestKeyboard) and game_keyboard.events > 0:
+                logger.info(f'Lane {lane} sent {game_keyboard.events} key events '
+                            f'at up to {game_keyboard.events_per_second:.0f} events per second')
+            latencies = simulator.game.reset_latencies
+            if len(latencies) > 0:
+                logger.info(f'Lane {lane} reset its game {len(latencies)} times, '
+                            f'in {sum(latencies) / len(latencies):.3f} s on average and {max(latencies):.3f} s at most')
+            if simulator.game.recycles > 0:
+                logger.info(f'Lane {lane} replaced its browser {simulator.game.recycles} times')
+            simulator.game.close()
+            simulator.close()
+        # frame pipelines keep their caches in their analysis processes
+        cache = None if self.simulator.pipeline else self.simulator.image_processor.cache
+        if cache is not None and cache.hits + cache.misses > 0:
+            logger.info(f'Distance reads: {cache.hits} cache hits ({cache.perceptual_hits} perceptual), '
+                        f'{cache.misses} misses, hit rate {cache.hit_rate:.0%}')
+        if self.aborted_evaluations > 0:
+            logger.info(f'{self.aborted_evaluations} of {self.evaluations} evaluations were stopped early '
+                        f'because they couldn\'t exceed their fitness bound')
+        if self.estimated_evaluations > 0:
+            logger.info(f'{self.estimated_evaluations} of {self.evaluations} evaluations were extrapolated '
+                        f'from a steady gait')
+        if self.retried_evaluations > 0:
+            logger.info(f'{self.retried_evaluations} evaluations were tried again after a browser failure')
+        if self._shared_display is not None:
+            display_manager.release(self._shared_display)
@@ -0,0 +1,269 @@
+""" Headless evaluation backend that plays QwopStrategy objects against a local physics model
+
+The simulated game runs on game time instead of wall-clock time, so evaluations run as fast as the CPU allows and no
+browser or display is needed.
+Each strategy is executed twice against a RecordingKeyboard to find which keys it holds at every physics step of its
+first cycle and of the cycle that repeats after it.  The schedules of all strategies are then replayed together, with
+one row per runner, until every runner has fallen, finished or hit the time limit.  This relies on phenotypes being
+deterministic, like every phenotype in `totter.evolution.algorithms`.
+
+"""
+
+import collections
+
+import numpy as np
+
+from totter.api import keyboard
+from totter.api.bounds import DEFAULT_TOP_SPEED
+from totter.api.keyboard import Keyboard, QWOP_KEYS
+from totter.api.physics import RagdollRunners, STEPS_PER_SECOND, TIMESTEP
+
+
+class RecordingKeyboard(Keyboard):
+    def __init__(self):
+        """ Keyboard that records which keys are held during each sleep instead of pressing them """
+        self.pressed = set()
+        self.segments = list()  # list of (duration, keys) pairs
+        self.elapsed = 0  # total duration of the segments
+
+    def keys(self):
+        """ Returns: (bool, bool, bool, bool): whether each of Q, W, O and P is currently held down """
+        return tuple(key in self.pressed for key in QWOP_KEYS)
+
+    def key_down(self, key):
+        self.pressed.add(key)
+
+    def key_up(self, key):
+        self.pressed.discard(key)
+
+    def sleep(self, seconds):
+        if seconds > 0:
+            self.segments.append((seconds, self.keys()))
+            self.elapsed += seconds
+
+    def now(self):
+        return self.elapsed
+
+    def release_all(self):
+        self.pressed.clear()
+
+
+KeySchedule = collections.namedtuple('KeySchedule', ['lead_in', 'cycle'])
+
+
+def _step_keys(segments, start, steps):
+    """ Keys held at each of `steps` physics steps of a recording, from the step at time `start` on
+
+    Args:
+        segments (list<(float, tuple<bool>)>): segments recorded by a RecordingKeyboard
+        start (int): index of the first step
+        steps (int): number of steps
+
+    Returns:
+        np.ndarray: boolean array of shape (steps, 4)
+
+    """
+    durations, keys = zip(*segments)
+    segment_ends = np.cumsum(durations)
+    step_times = (start + np.arange(steps)) * TIMESTEP
+    active_segments = np.minimum(np.searchsorted(segment_ends, step_times, side='right'), len(keys) - 1)
+    return np.array(keys, dtype=bool)[active_segments]
+
+
+def record_key_schedule(strategy):
+    """ Records the keys held by `strategy` at each physics step
+
+    Phenotypes may leave keys held from one cycle to the next, so the first cycle, which starts with every key up,
+    is recorded as a lead-in, followed by the cycle that starts with the keys left by the first one.  Every later
+    cycle repeats the second one.
+
+    Args:
+        strategy (QwopStrategy): the strategy to record
+
+    Returns:
+        KeySchedule:
+            boolean arrays of shape (steps, 4) saying whether Q, W, O and P are held at each step of the lead-in and
+            of the repeated cycle
+
+    """
+    recorder = RecordingKeyboard()
+    strategy.reset()
+    with keyboard.use(recorder):
+        strategy.execute()
+        first_end = recorder.elapsed
+        strategy.execute()
+
+    if len(recorder.segments) == 0:
+        # strategies that never wait hold the same keys forever
+        return KeySchedule(np.zeros((0, len(QWOP_KEYS)), dtype=bool), np.array([recorder.keys()], dtype=bool))
+
+    # steps are counted from the start of the recording, so that rounding never shifts the cycle against the lead-in
+    lead_in_steps = int(round(first_end / TIMESTEP))
+    steps = max(lead_in_steps + 1, int(round(recorder.elapsed / TIMESTEP)))
+    return KeySchedule(_step_keys(recorder.segments, 0, lead_in_steps),
+                       _step_keys(recorder.segments, lead_in_steps, steps - lead_in_steps))
+
+
+def _hopeless_runners(runners, bounds, time_limit, top_speed):
+    """ Returns: np.ndarray: whether each runner is still running but can't exceed its bound anymore """
+    hopeless = np.zeros(runners.count, dtype=bool)
+    running = ~runners.game_over
+    for index, (bound, distance, time) in enumerate(zip(bounds, runners.distances, runners.times)):
+        if bound is not None and running[index]:
+            hopeless[index] = not bound.can_exceed(distance, time, time_limit, top_speed)
+    return hopeless
+
+
+def simulate_schedules(schedules, time_limit, bounds=None, top_speed=DEFAULT_TOP_SPEED):
+    """ Simulates one runner per key schedule, with every runner stepped in lockstep
+
+    Args:
+        schedules (list<KeySchedule>): key schedules created by `record_key_schedule`
+        time_limit (float): time limit in seconds of game time for each runner
+        bounds (list<FitnessBound>):
+            fitness bound of each runner, or None for runners that always run to the end.  Once per second of game
+            time, runners that can't exceed their bound at `top_speed` are stopped where they are.
+        top_speed (float): speed in metres per second above which no runner runs
+
+    Returns:
+        (np.ndarray, np.ndarray, np.ndarray):
+            distance run, time taken in whole seconds like the browser backend reports it, and whether the game ended
+            for each runner
+
+    """
+    count = len(schedules)
+    lead_in_lengths = np.array([len(schedule.lead_in) for schedule in schedules])
+    cycle_lengths = np.array([len(schedule.cycle) for schedule in schedules])
+    key_table = np.zeros((count, (lead_in_lengths + cycle_lengths).max(), len(QWOP_KEYS)), dtype=bool)
+    for row, schedule in enumerate(schedules):
+        key_table[row, :len(schedule.lead_in) + len(schedule.cycle)] = np.concatenate(schedule)
+
+    distances = np.zeros(count)
+    times = np.zeros(count, dtype=np.int64)
+    game_over = np.zeros(count, dtype=bool)
+
+    runners = RagdollRunners(count)
+    rows = np.arange(count)  # index of each simulated runner in `schedules`
+    if bounds is not None and all(bound is None for bound in bounds):
+        bounds = None
+    for step in range(int(round(time_limit * STEPS_PER_SECOND))):
+        lead_ins = lead_in_lengths[rows]
+        columns = np.where(step < lead_ins, step, lead_ins + (step - lead_ins) % cycle_lengths[rows])
+        runners.step(key_table[rows, columns])
+
+        # drop the runners that can no longer exceed their bound
+        if bounds is not None and (step + 1) % STEPS_PER_SECOND == 0:
+            hopeless = _hopeless_runners(runners, [bounds[row] for row in rows], time_limit, top_speed)
+            if hopeless.any():
+                distances[rows[hopeless]] = runners.distances[hopeless]
+                times[rows[hopeless]] = runners.seconds[hopeless]
+                runners = runners.subset(~hopeless)
+                rows = rows[~hopeless]
+                if len(rows) == 0:
+                    break
+
+        # once most of the runners have stopped, drop them so that they don't slow down the rest
+        stopped = runners.game_over
+        if stopped.sum() * 2 > runners.count:
+            distances[rows[stopped]] = runners.distances[stopped]
+            times[rows[stopped]] = runners.seconds[stopped]
+            game_over[rows[stopped]] = True
+            runners = runners.subset(~stopped)
+            rows = rows[~stopped]
+            if len(rows) == 0:
+                break
+
+    distances[rows] = runners.distances
+    times[rows] = runners.seconds
+    game_over[rows] = runners.game_over
+
+    return distances, times, game_over
+
+
+class SimulatedQwopSimulator(object):
+    def __init__(self, time_limit, top_speed=DEFAULT_TOP_SPEED):
+        """ Initialize a SimulatedQwopSimulator
+        SimulatedQwopSimulator runs a QwopStrategy against the ragdoll model instead of the QWOP game.
+
+        Args:
+            time_limit (float): time limit in seconds of game time for the simulation
+            top_speed (float): speed used to stop runs that can't exceed their fitness bound.  See `simulate_schedules`.
+        """
+        self.time_limit = time_limit
+        self.top_speed = top_speed
+        self.game_over = False
+
+    def is_game_over(self):
+        return self.game_over
+
+    def simulate(self, strategy, qwop_started=False, bound=None):
+        """ Run the given QwopStrategy
+
+        Args:
+            strategy (QwopStrategy): the strategy to execute
+            qwop_started (bool): ignored, the simulator never needs a QWOP window
+            bound (FitnessBound): if given, the run is stopped as soon as it can't exceed the bound
+
+        Returns:
+            (float, int): distance run, time taken in whole seconds
+
+        """
+        distances, times, game_over = simulate_schedules([record_key_schedule(strategy)], self.time_limit,
+                                                         bounds=[bound], top_speed=self.top_speed)
+        self.game_over = bool(game_over[0])
+        return float(distances[0]), int(times[0])
+
+
+class SimulatedQwopEvaluator(object):
+    def __init__(self, time_limit, top_speed=DEFAULT_TOP_SPEED):
+        """ Initialize a SimulatedQwopEvaluator
+        SimulatedQwopEvaluator objects run QwopStrategy objects in the physics model and report the distance run and
+        time taken.  All of the strategies passed to `evaluate` are simulated together.
+
+        Args:
+            time_limit (float): time limit in seconds of game time for each evaluation
+            top_speed (float): speed used to stop runs that can't exceed their fitness bound.  See `simulate_schedules`.
+        """
+        self.evaluations = 0
+        self.simulator = SimulatedQwopSimulator(time_limit=time_limit, top_speed=top_speed)
+
+    @property
+    def time_limit(self):
+        return self.simulator.time_limit
+
+    @time_limit.setter
+    def time_limit(self, time_limit):
+        self.simulator.time_limit = time_limit
+
+    def evaluate(self, strategies, bounds=None, estimate=True):
+        """ Evaluates a QwopStrategy or a set of QwopStrategy objects
+
+        Args:
+            strategies (QwopStrategy or Iterable<QwopStrategy>): set of strategies to evaluate
+            bounds (FitnessBound or Iterable<FitnessBound>):
+                bound of the evaluation of each strategy, or None for evaluations that always run to the end
+            estimate (bool): ignored, simulations are cheap enough to always run to the end
+
+        Returns:
+            ((distance1, time1), (distance2, time2), ...): distance,time pairs achieved by each QwopStrategy
+        """
+        # check if a single strategy has been passed
+        try:
+            len(strategies)
+        except TypeError:  # raised if a single QwopStrategy was passed
+            strategies = [strategies]
+            bounds = [bounds]
+
+        if len(strategies) == 0:
+            return tuple()
+
+        schedules = [record_key_schedule(strategy) for strategy in strategies]
+        distances, times, _ = simulate_schedules(schedules, self.time_limit, bounds=bounds,
+                                                 top_speed=self.simulator.top_speed)
+        self.evaluations += len(strategies)
+
+        return tuple((float(distance), int(time)) for distance, time in zip(distances, times))
+
+    def close(self):
+        """ Release the resources held by the evaluator.  The simulator holds none. """
+        pass
@@ -0,0 +1,41 @@
+""" Representation of QWOP strategies shared by every evaluation backend """
+
+from totter.api import keyboard
+
+
+class QwopStrategy:
+    def __init__(self, execution_function):
+        """ Class representing QWOP strategies
+
+        A QWOP Strategy is a sequence of keystrokes that plays QWOP.
+        Each Strategy must implement an `execute` method, which executes the keystrokes for the strategy with the correct timing.
+        When evaluating the strategy, `execute` will automatically be looped until the game ends.
+
+        Args:
+            execution_function (function): function that implements the strategy
+
+        """
+        self.execute = execution_function
+
+    def cleanup(self):
+        """ Cleans up after strategy execution
+
+        This method will be called after the game has ended or the evaluation time limit has been reached
+
+        Returns: None
+        """
+        # ensure all keys are up
+        keyboard.release_all()
+
+    def reset(self):
+        """ Prepares the strategy for a new run
+
+        This method will be called before each run, so that a run never continues from the state left by a previous
+        one, even if that run was lost before its cleanup.  Players of compiled timelines start over from their first
+        cycle.
+
+        Returns: None
+        """
+        reset = getattr(self.execute, 'reset', None)
+        if reset is not None:
+            reset()
@@ -0,0 +1,165 @@
+""" Compilation of phenotypes into timelines of key transitions, and their playback
+
+Phenotypes are functions that press and release keys and sleep in between, and are run again and again until the game
+ends.  Run as they are, they send every key event their genome spells out, even for keys that are already in the state
+asked for, and each sleep adds the time spent sending the events before it to the length of the cycle.
+A phenotype can instead be compiled once into a Timeline: the transitions of the keys during a cycle, at their offsets
+from the start of the cycle, without the events that don't change the state of a key.  A TimelinePlayer then sends
+each transition at an absolute deadline, so that the time spent sending events never accumulates from one cycle to the
+next.
+Compilation records the phenotype like the simulator backend does, so it relies on phenotypes being deterministic.
+
+"""
+
+import collections
+
+from totter.api import keyboard
+from totter.api.keyboard import QWOP_KEYS
+from totter.api.simulation import RecordingKeyboard
+
+_IDLE_TIME = 1  # time in seconds that a player of a timeline without any sleep waits between cycles
+
+Transition = collections.namedtuple('Transition', ['offset', 'key', 'down'])
+
+
+class Timeline(object):
+    def __init__(self, first, cycle, period):
+        """ Initialize a Timeline
+
+        Args:
+            first (tuple<Transition>): transitions of the first cycle, which starts with every key up
+            cycle (tuple<Transition>):
+                transitions of every later cycle, which starts with the keys held at the end of the previous one
+            period (float): length in seconds of a cycle
+        """
+        self.first = first
+        self.cycle = cycle
+        self.period = period
+
+
+def _transitions(segments, held):
+    """ Transitions of the keys held during `segments`, starting from the keys in `held`
+
+    Args:
+        segments (list<(float, tuple<bool>)>): segments recorded by a RecordingKeyboard
+        held (tuple<bool>): whether each of the QWOP keys is held before the first segment
+
+    Returns:
+        (list<Transition>, tuple<bool>):
+            the transitions at their offsets from the start of the first segment, and the keys held at the end
+
+    """
+    transitions = list()
+    offset = 0
+    for duration, keys in segments:
+        for key, was_down, down in zip(QWOP_KEYS, held, keys):
+            if down != was_down:
+                transitions.append(Transition(offset, key, down))
+        held = keys
+        offset += duration
+    return transitions, held
+
+
+def compile_phenotype(phenotype):
+    """ Compile a phenotype into a Timeline
+
+    The phenotype is recorded for two cycles: the first one starts with every key up, and the second one with the
+    keys left by the first.  Every later cycle starts like the second one.
+
+    Args:
+        phenotype (function): the phenotype to compile
+
+    Returns:
+        Timeline: the transitions of the phenotype's keys
+
+    """
+    recorder = RecordingKeyboard()
+    with keyboard.use(recorder):
+        phenotype()
+        first_segments = len(recorder.segments)
+        phenotype()
+
+    if first_segments == 0:
+        # phenotypes that never wait hold the same keys forever
+        first, _ = _transitions([(0, recorder.keys())], (False,) * len(QWOP_KEYS))
+        return Timeline(tuple(first), (), 0)
+
+    first, held = _transitions(recorder.segments[:first_segments], (False,) * len(QWOP_KEYS))
+    cycle, _ = _transitions(recorder.segments[first_segments:], held)
+    period = sum(duration for duration, _ in recorder.segments[:first_segments])
+    return Timeline(tuple(first), tuple(cycle), period)
+
+
+class TimelineCache(object):
+    def __init__(self, max_size=4096):
+        """ Cache of the Timelines of recently compiled genomes
+
+        Args:
+            max_size (int): number of timelines kept.  The least recently used one is dropped beyond that.
+        """
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._timelines = collections.OrderedDict()
+
+    def get(self, genome, genome_to_phenotype):
+        """ Returns the Timeline of `genome`, compiling its phenotype if it isn't cached
+
+        Args:
+            genome (object): the genome.  Genomes with the same representation share a timeline.
+            genome_to_phenotype (function): function that converts the genome to its phenotype
+
+        Returns:
+            Timeline: timeline of the genome's phenotype
+
+        """
+        key = repr(genome)
+        timeline = self._timelines.get(key)
+        if timeline is not None:
+            self.hits += 1
+            self._timelines.move_to_end(key)
+            return timeline
+
+        self.misses += 1
+        timeline = self._timelines[key] = compile_phenotype(genome_to_phenotype(genome))
+        if len(self._timelines) > self.max_size:
+            self._timelines.popitem(last=False)
+        return timeline
+
+
+class TimelinePlayer(object):
+    def __init__(self, timeline):
+        """ Phenotype that plays a Timeline, one cycle per call
+
+        Deadlines are kept on the clock of the active keyboard from one call to the next, so cycles follow each other
+        exactly `timeline.period` apart.
+
+        Args:
+            timeline (Timeline): the timeline to play
+        """
+        self.timeline = timeline
+        self.reset()
+
+    def reset(self):
+        """ Start the timeline over from its first cycle.  Called by QwopStrategy before each run. """
+        self._cycle_start = None  # time on the keyboard's clock at which the current cycle started
+        self._cycles = 0
+
+    def __call__(self):
+        if self._cycle_start is None:
+            self._cycle_start = keyboard.now()
+        transitions = self.timeline.first if self._cycles == 0 else self.timeline.cycle
+        self._cycles += 1
+        for offset, key, down in transitions:
+            keyboard.sleep_until(self._cycle_start + offset)
+            if down:
+                keyboard.key_down(key)
+            else:
+                keyboard.key_up(key)
+
+        if self.timeline.period == 0:
+            keyboard.sleep(_IDLE_TIME)
+            self._cycle_start = None
+        else:
+            self._cycle_start += self.timeline.period
+            keyboard.sleep_until(self._cycle_start)
@@ -0,0 +1,110 @@
+""" Game clock that runs the QWOP page faster than real time
+
+The game reads the time from `performance.now` and `Date.now`, and advances its physics from `requestAnimationFrame`
+callbacks.  The clock script replaces all three before the game's own scripts run, so that the page sees time pass
+`rate` times faster than the wall clock:
+    - on every frame that the browser draws, the animation callbacks are run once for each 1/60 s of game time that
+      has passed since the last frame, so the game advances several steps per frame drawn
+    - while a step runs, the page's time is that of the step, so the game never sees a step longer than 1/60 s
+
+If the browser can't run all the steps it owes on a frame, the clock drops the time it couldn't catch up on, and game
+time falls behind `rate` times the wall clock.  `dropped_time` reports how much was dropped.
+Timers set with `setTimeout` and `setInterval` still run in wall-clock time.
+
+The script has to run before the game's scripts, so it is only added to the copy of the game served by the
+AssetServer.  See `totter.api.assets`.
+
+"""
+
+# `__RATE__` and `__MAX_STEPS__` are replaced by `clock_script`
+_CLOCK_SCRIPT = '''
+(function () {
+    if (window.__totterClock) { return; }
+    var rate = __RATE__, step = 1000 / 60, maxSteps = __MAX_STEPS__;
+    var realNow = performance.now.bind(performance);
+    var realFrame = window.requestAnimationFrame.bind(window);
+    var origin = realNow(), dateOrigin = Date.now();
+    var clock = window.__totterClock = {rate: rate, time: 0, dropped: 0, frames: 0, steps: 0};
+    var callbacks = [], nextId = 1;
+    // game time in milliseconds that the wall clock has reached
+    function target() { return (realNow() - origin) * rate - clock.dropped; }
+    performance.now = function () { return clock.time; };
+    Date.now = function () { return Math.floor(dateOrigin + clock.time); };
+    window.requestAnimationFrame = function (callback) {
+        callbacks.push({id: nextId, callback: callback});
+        return nextId++;
+    };
+    window.cancelAnimationFrame = function (id) {
+        callbacks = callbacks.filter(function (entry) { return entry.id !== id; });
+    };
+    function frame() {
+        var steps = 0;
+        if (callbacks.length === 0) {
+            clock.time = Math.max(clock.time, target());
+        }
+        while (callbacks.length > 0 && clock.time + step <= target()) {
+            if (steps === maxSteps) {
+                clock.dropped += target() - clock.time;
+                break;
+            }
+            clock.time += step;
+            steps += 1;
+            var due = callbacks;
+            callbacks = [];
+            for (var i = 0; i < due.length; i++) {
+                due[i].callback(clock.time);
+            }
+        }
+        clock.frames += 1;
+        clock.steps += steps;
+        realFrame(frame);
+    }
+    realFrame(frame);
+})();
+'''
+
+_DROPPED_SCRIPT = 'return window.__totterClock ? window.__totterClock.dropped / 1000 : 0;'
+
+
+def clock_script(rate, max_steps=None):
+    """ JavaScript that makes the page's clock run `rate` times faster than the wall clock
+
+    Args:
+        rate (float): game seconds per wall-clock second
+        max_steps (int): largest number of steps run on one frame.  Defaults to four times the steps due per frame.
+
+    Returns:
+        str: the script
+
+    """
+    if max_steps is None:
+        max_steps = max(1, int(4 * rate))
+    return _CLOCK_SCRIPT.replace('__RATE__', repr(float(rate))).replace('__MAX_STEPS__', str(max_steps))
+
+
+def inject_clock(page, rate):
+    """ Add the clock script to an HTML page, ahead of the page's own scripts
+
+    Args:
+        page (bytes): the HTML page
+        rate (float): game seconds per wall-clock second
+
+    Returns:
+        bytes: the page with the clock script
+
+    """
+    script = f'<script>{clock_script(rate)}</script>'.encode('utf-8')
+    lowered = page.lower()
+    position = 0
+    # scripts run in document order, so the clock only has to come before the page's first script
+    for tag in (b'<head', b'<html'):
+        start = lowered.find(tag)
+        if start != -1:
+            position = lowered.index(b'>', start) + 1
+            break
+    return page[:position] + script + page[position:]
+
+
+def dropped_time(browser):
+    """ Time in seconds of game time that the clock of the page in `browser` dropped because the page fell behind """
+    return browser.execute_script(_DROPPED_SCRIPT) or 0
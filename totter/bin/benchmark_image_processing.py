@@ -0,0 +1,92 @@
+""" Microbenchmark of the pixel analysis done by ImageProcessor
+
+Compares the Python analysis that ImageProcessor used to do with the NumPy analysis it does now, both for the work
+done on every frame and for the work done once per evaluation to read the final distance.  The work done on every frame
+includes the lookup of the HUD in the OCR cache, which hashes the pixels of the crop.  Text recognition is left out,
+since it doesn't depend on how the pixels are processed.
+
+"""
+
+import argparse
+import timeit
+
+from PIL import Image, ImageDraw
+
+from totter.api import image_processing
+from totter.api.image_processing import _colors_equal, _greyscale
+from totter.api.ocr_cache import OcrCache
+
+
+def _python_colors_equal(color1, color2):
+    sq_distance = 0
+    for idx, val in enumerate(color1):
+        sq_distance += (val - color2[idx])**2
+    return sq_distance < image_processing._COLOR_EQUALITY_EPSILON**2
+
+
+# caches of the distance read from the HUD of the frame.  The frames of a run mostly hit the cache
+_python_cache = OcrCache()
+_numpy_cache = OcrCache()
+
+
+def python_frame_analysis(frame):
+    """ The analysis of each frame, as ImageProcessor did it before it used NumPy """
+    distance_screenshot = frame.crop(image_processing._CURRENT_DISTANCE_BOX).convert(mode='L')
+    cached, distance = _python_cache.lookup(distance_screenshot)
+    if not cached:
+        _python_cache.store(distance_screenshot, 0)
+    return _python_colors_equal(frame.getpixel(image_processing._END_BOX_POSITION), image_processing._END_BOX_COLOR)
+
+
+def numpy_frame_analysis(frame):
+    """ The analysis of each frame, as ImageProcessor does it now """
+    distance_screenshot = _greyscale(frame, image_processing._CURRENT_DISTANCE_BOX)
+    cached, distance = _numpy_cache.lookup(distance_screenshot)
+    if not cached:
+        _numpy_cache.store(distance_screenshot, 0)
+    return _colors_equal(frame.getpixel(image_processing._END_BOX_POSITION), image_processing._END_BOX_COLOR)
+
+
+def python_final_analysis(frame):
+    """ The thresholding of the game-over text, as ImageProcessor did it before it used NumPy """
+    text = frame.crop(image_processing._FINAL_DISTANCE_BOX).convert(mode='L')
+    return text.point(lambda pixel: 0 if _python_colors_equal((pixel,), (255, )) else 255)
+
+
+def numpy_final_analysis(frame):
+    """ The thresholding of the game-over text, as ImageProcessor does it now """
+    text = frame.crop(image_processing._FINAL_DISTANCE_BOX).convert(mode='L')
+    return text.point(image_processing._WHITE_TEXT_TABLE)
+
+
+def game_over_frame():
+    """ A synthetic frame with the game-over box and some white text in it """
+    frame = Image.new('RGB', (700, 500), (40, 60, 90))
+    draw = ImageDraw.Draw(frame)
+    draw.rectangle((150, 230, 550, 420), fill=image_processing._END_BOX_COLOR)
+    draw.text((240, 300), '12.3 metres', fill=(255, 255, 255))
+    draw.text((240, 135), '12.3 metres', fill=(255, 255, 255))
+    return frame
+
+
+def time_per_call(function, frame, repeats, rounds=5):
+    """ Returns: float: mean time in milliseconds of `function(frame)`, in the fastest of `rounds` rounds of calls """
+    return min(timeit.repeat(lambda: function(frame), number=repeats, repeat=rounds)) / repeats * 1000
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the pixel analysis of ImageProcessor.')
+    parser.add_argument('--frame', type=str, default=None,
+                        help='Path to a 700x500 capture of the game.  Defaults to a synthetic frame.')
+    parser.add_argument('--repeats', type=int, default=2000, help='Number of frames analyzed by each version.')
+    args = parser.parse_args()
+
+    frame = Image.open(args.frame).convert(mode='RGB') if args.frame is not None else game_over_frame()
+    if python_final_analysis(frame).tobytes() != numpy_final_analysis(frame).tobytes():
+        print('Warning: the two versions disagree on the thresholded game-over text')
+
+    for stage, before, after in (('each frame', python_frame_analysis, numpy_frame_analysis),
+                                 ('final distance', python_final_analysis, numpy_final_analysis)):
+        before_time = time_per_call(before, frame, args.repeats)
+        after_time = time_per_call(after, frame, args.repeats)
+        print(f'{stage:>15}: {before_time:.4f} ms before, {after_time:.4f} ms after')
@@ -0,0 +1,47 @@
+""" Measures how many key events per second the XTest keyboard sustains
+
+The events are sent to a virtual display, so they don't reach any window the user is working in.
+Requires Xvfb and python-xlib.
+
+"""
+
+import argparse
+import time
+
+from totter.api.display import display_manager
+from totter.api.keyboard import XTestKeyboard
+
+
+def benchmark(keyboard, events=10000, key='q'):
+    """ Alternately press and release `key` as fast as possible
+
+    Args:
+        keyboard (Keyboard): the keyboard to benchmark
+        events (int): number of key events to send
+        key (str): the key to press
+
+    Returns:
+        float: key events sent per second of wall time
+
+    """
+    start = time.perf_counter()
+    for _ in range(events // 2):
+        keyboard.key_down(key)
+        keyboard.key_up(key)
+    return (events // 2) * 2 / (time.perf_counter() - start)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the XTest keyboard on a virtual display.')
+    parser.add_argument('--events', default=10000, type=int, help='Number of key events to send.')
+    args = parser.parse_args()
+
+    display = display_manager.create(width=640, height=480)
+    try:
+        keyboard = XTestKeyboard(display.name)
+        rate = benchmark(keyboard, events=args.events)
+        print(f'Sent {keyboard.events} key events at {rate:.0f} events per second '
+              f'({1e6 / rate:.1f} microseconds per event)')
+        keyboard.close()
+    finally:
+        display_manager.stop_all()
@@ -7,8 +7,10 @@ also elitist generational.
 """
 
 from abc import abstractmethod, ABCMeta
+import itertools
 import random
 
+from totter.api.backends import BROWSER
 from totter.evolution.GeneticAlgorithm import GeneticAlgorithm, Individual
 
 
@@ -20,7 +22,9 @@ class CellularGA(GeneticAlgorithm, metaclass=ABCMeta):
                  mt_prob=0.05,
                  steady_state=True,
                  population_seeding_pool=None,
-                 seeding_time_limit=60):
+                 seeding_time_limit=60,
+                 backend=BROWSER,
+                 evaluator_options=None):
 
         super().__init__(
             eval_time_limit,
@@ -29,46 +33,108 @@ class CellularGA(GeneticAlgorithm, metaclass=ABCMeta):
             mt_prob,
             steady_state,
             population_seeding_pool,
-            seeding_time_limit
+            seeding_time_limit,
+            backend=backend,
+            evaluator_options=evaluator_options
         )
         self.population = self.population.to_grid()  # convert to a gridded population
 
     def advance(self):
-        # iterate over population
-        for row in range(0, self.population.rows):
-            for col in range(0, self.population.cols):
-                parent1 = self.population.get_by_coords(row, col)
-                # select the fittest neighbor as parent 2
-                left_neighbor = self.population.get_by_coords(row, col-1)
-                parent2 = left_neighbor
-                right_neighbor = self.population.get_by_coords(row, col+1)
-                if right_neighbor.fitness > parent2.fitness:
-                    parent2 = right_neighbor
-                top_neighbor = self.population.get_by_coords(row-1, col)
-                if top_neighbor.fitness > parent2.fitness:
-                    parent2 = top_neighbor
-                bottom_neighbor = self.population.get_by_coords(row+1, col)
-                if bottom_neighbor.fitness > parent2.fitness:
-                    parent2 = bottom_neighbor
-
-                # produce a child
-                if random.random() < self.cx_prob:
-                    child_genome = self.crossover(parent1.genome, parent2.genome)[0]
-                else:
-                    child_genome = parent1.genome
-
-                # mutate the child
-                if random.random() < self.mt_prob:
-                    child_genome = self.mutate(child_genome)
-
-                child_genome = self.repair(child_genome)
-                child = Individual(genome=child_genome)
-                self._evaluate(child)
-
-                # replace current cell if better than both parents
+        """ Advances the GA by one sweep over the grid
+
+        Each cell breeds one child with its fittest neighbor, and is replaced by the child if the child is fitter than
+        both parents.  Cells are updated in place, one after the other in row-major order, so later cells breed with
+        the children that replaced earlier ones.
+        Evaluators with several lanes would sit idle during such a sweep, so for them the sweep goes over groups of
+        cells that aren't neighbors of each other instead.  The children of a group are evaluated together, and the
+        group's cells are updated before the next group breeds.
+
+        Returns: None
+
+        """
+        if getattr(self.qwop_evaluator, 'lanes', 1) > 1:
+            groups = self._independent_groups()
+        else:
+            groups = [[(row, col)] for row in range(0, self.population.rows) for col in range(0, self.population.cols)]
+
+        for group in groups:
+            cells = list()
+            children = list()
+            bounds = list()
+            for row, col in group:
+                parent1, parent2, child = self._breed(row, col)
+                cells.append((row, col, parent1, parent2))
+                children.append(child)
+                bounds.append(self.fitness_bound((parent1, parent2)))
+
+            self._evaluate_all(children, bounds)
+
+            # replace each cell whose child is better than both parents
+            for (row, col, parent1, parent2), child in zip(cells, children):
                 if child.fitness > parent1.fitness and child.fitness > parent2.fitness:
                     self.population.replace_by_coords(row, col, child)
 
+    def _breed(self, row, col):
+        """ Breeds the child of a cell with its fittest neighbor
+
+        Returns:
+            (Individual, Individual, Individual): the cell, its fittest neighbor, and their child, which isn't evaluated
+
+        """
+        parent1 = self.population.get_by_coords(row, col)
+        # select the fittest neighbor as parent 2
+        left_neighbor = self.population.get_by_coords(row, col-1)
+        parent2 = left_neighbor
+        right_neighbor = self.population.get_by_coords(row, col+1)
+        if right_neighbor.fitness > parent2.fitness:
+            parent2 = right_neighbor
+        top_neighbor = self.population.get_by_coords(row-1, col)
+        if top_neighbor.fitness > parent2.fitness:
+            parent2 = top_neighbor
+        bottom_neighbor = self.population.get_by_coords(row+1, col)
+        if bottom_neighbor.fitness > parent2.fitness:
+            parent2 = bottom_neighbor
+
+        # produce a child
+        if random.random() < self.cx_prob:
+            child_genome = self.crossover(parent1.genome, parent2.genome)[0]
+        else:
+            child_genome = parent1.genome
+
+        # mutate the child
+        if random.random() < self.mt_prob:
+            child_genome = self.mutate(child_genome)
+
+        child_genome = self.repair(child_genome)
+        return parent1, parent2, Individual(genome=child_genome)
+
+    def _independent_groups(self):
+        """ Splits the grid into groups of cells that aren't neighbors of each other
+
+        The cells are colored greedily in row-major order, which gives a checkerboard for grids with even sides.  Grids
+        with an odd side wrap around onto cells of the same color, and need a few more groups.
+
+        Returns:
+            list<list<(int, int)>>: the row and column of the cells of each group
+
+        """
+        colors = dict()
+        groups = list()
+        for row in range(0, self.population.rows):
+            for col in range(0, self.population.cols):
+                neighbors = [(row, col-1), (row, col+1), (row-1, col), (row+1, col)]
+                taken = {colors.get(self.population.wrap_coords(*neighbor)) for neighbor in neighbors}
+                color = next(color for color in itertools.count() if color not in taken)
+                colors[(row, col)] = color
+                if color == len(groups):
+                    groups.append(list())
+                groups[color].append((row, col))
+        return groups
+
+    def fitness_bound(self, parents):
+        """ Children only replace their cell if they are fitter than both of their parents """
+        return max(parent.fitness for parent in parents)
+
     def select_parents(self, neighbors, n):
         """ Cellular GAs use their own selection mechanism"""
         pass
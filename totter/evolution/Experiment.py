@@ -9,7 +9,7 @@ import os
 import random
 import statistics
 import totter.utils.storage as storage
-from totter.api.qwop import stop_qwop
+from totter.api import backends
 from totter.utils.time import WallTimer
 
 
@@ -47,17 +47,19 @@ class Experiment(object):
 
         timer = WallTimer()
         best_solution_found = None
-        # run each trial
-        for i in range(1, self.trials+1):
-            timer.restart()
-            logger.info(f'Running trial #{i}')
-            random.seed(i)
-            best_indv = self._run_trial(i)
-            stop_qwop()
-            logger.info(f'Trial #{i} Completed after {timer.since()}')
-
-            if best_solution_found is None or best_solution_found.fitness < best_indv.fitness:
-                best_solution_found = best_indv
+        # run each trial.  The games opened by the first trial stay open for the others
+        try:
+            for i in range(1, self.trials+1):
+                timer.restart()
+                logger.info(f'Running trial #{i}')
+                random.seed(i)
+                best_indv = self._run_trial(i)
+                logger.info(f'Trial #{i} Completed after {timer.since()}')
+
+                if best_solution_found is None or best_solution_found.fitness < best_indv.fitness:
+                    best_solution_found = best_indv
+        finally:
+            backends.stop(self.algorithm_config.get('backend', backends.BROWSER))
 
         # save the best individual found using this GA:
         best_soln_data = {
@@ -142,6 +144,11 @@ class Experiment(object):
                 logging_checkpoint = algorithm.total_evaluations
                 logger.info(f'{logging_checkpoint} evaluations completed...')
 
+        # the reported best individual shouldn't owe its fitness to an extrapolated run
+        reevaluations = algorithm.reevaluate_elites()
+        if reevaluations > 0:
+            logger.info(f'Re-evaluated {reevaluations} extrapolated elites in full')
+
         self.histories.append(history)
 
         # write the results of this trial
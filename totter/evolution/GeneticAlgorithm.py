@@ -9,13 +9,20 @@ import os
 import pickle
 import random
 
-from totter.api.qwop import QwopEvaluator, QwopStrategy
+from totter.api.backends import get_evaluator, BROWSER
+from totter.api.bounds import FitnessBound
+from totter.api.strategy import QwopStrategy
+from totter.api.timeline import TimelineCache, TimelinePlayer
 from totter.evolution.Individual import Individual
 from totter.evolution.Population import Population
 import totter.utils.storage as storage
 
 
 class GeneticAlgorithm(ABC):
+    # whether phenotypes are compiled into timelines of key transitions before they are played.  Algorithms whose
+    # phenotypes aren't deterministic must not compile them.  See `totter.api.timeline`.
+    compile_phenotypes = True
+
     def __init__(self,
                  eval_time_limit=240,
                  pop_size=20,
@@ -24,11 +31,16 @@ class GeneticAlgorithm(ABC):
                  steady_state=True,
                  population_seeding_pool=None,
                  seeding_time_limit=60,
-                 skip_init=False):
+                 skip_init=False,
+                 backend=BROWSER,
+                 evaluator_options=None):
 
         self.eval_time_limit = eval_time_limit
         self.total_evaluations = 0
-        self.qwop_evaluator = QwopEvaluator(time_limit=self.eval_time_limit)
+        self.backend = backend
+        self.evaluator_options = evaluator_options if evaluator_options is not None else dict()
+        self._qwop_evaluator = None
+        self._timelines = TimelineCache()
 
         self.pop_size = pop_size
         self.cx_prob = cx_prob
@@ -41,12 +53,38 @@ class GeneticAlgorithm(ABC):
             if population_seeding_pool is None:
                 # create a random population
                 individuals = [Individual(self.generate_random_genome()) for i in range(0, self.pop_size)]
-                for indv in individuals:
-                    self._evaluate(indv)
+                self._evaluate_all(individuals)
                 self.population = Population(individuals)
             else:
                 self.population = self.seed_population(population_seeding_pool, time_limit=seeding_time_limit)
 
+    @property
+    def qwop_evaluator(self):
+        """ The evaluator of the algorithm's backend, which is only created (and its games opened) on first use """
+        if self._qwop_evaluator is None:
+            self._qwop_evaluator = get_evaluator(time_limit=self.eval_time_limit, backend=self.backend,
+                                                 **self.evaluator_options)
+        return self._qwop_evaluator
+
+    def create_strategy(self, genome):
+        """ Create the QwopStrategy that plays `genome`
+
+        The genome's phenotype is compiled into a timeline, which is cached so that genomes evaluated again aren't
+        compiled again.
+
+        Args:
+            genome (object): the genome to play
+
+        Returns:
+            QwopStrategy: strategy that plays the genome's phenotype
+
+        """
+        if self.compile_phenotypes:
+            phenotype = TimelinePlayer(self._timelines.get(genome, self.genome_to_phenotype))
+        else:
+            phenotype = self.genome_to_phenotype(genome)
+        return QwopStrategy(execution_function=phenotype)
+
     def get_configuration(self):
         return {
             'eval_time_limit': self.eval_time_limit,
@@ -55,7 +93,9 @@ class GeneticAlgorithm(ABC):
             'mt_prob': self.mt_prob,
             'steady_state': self.steady_state,
             'population_seeding_pool': self.population_seeding_pool,
-            'seeding_time_limit': self.seeding_time_limit
+            'seeding_time_limit': self.seeding_time_limit,
+            'backend': self.backend,
+            'evaluator_options': self.evaluator_options
         }
 
     def seed_population(self, pool_size, time_limit):
@@ -74,23 +114,25 @@ class GeneticAlgorithm(ABC):
 
         """
         population_filepath = storage.get(os.path.join(self.__class__.__name__, 'population_seeds'))
-        population_file = os.path.join(population_filepath, f'seed_{pool_size}_{self.pop_size}.tsd')
+        # seeds found by the simulator don't necessarily run well in the real game, so they are kept separately
+        backend_suffix = '' if self.backend == BROWSER else f'_{self.backend}'
+        population_file = os.path.join(population_filepath, f'seed_{pool_size}_{self.pop_size}{backend_suffix}.tsd')
 
         # if the population has not previously been seeded, then generate the seeded pop
         if not os.path.exists(population_file):
             # temporarily set time limit
-            default_time_limit = self.qwop_evaluator.simulator.time_limit
-            self.qwop_evaluator.simulator.time_limit = time_limit
+            default_time_limit = self.qwop_evaluator.time_limit
+            self.qwop_evaluator.time_limit = time_limit
 
             # generate pool of random individuals
             pool = [Individual(self.generate_random_genome()) for i in range(0, pool_size)]
+            # custom evaluation: the whole pool is handed to the evaluator at once
+            strategies = [self.create_strategy(indv.genome) for indv in pool]
             candidates = list()
-            for indv in pool:
-                # custom evaluation
-                phenotype = self.genome_to_phenotype(indv.genome)
-                strategy = QwopStrategy(execution_function=phenotype)
-                distance, run_time = self.qwop_evaluator.evaluate(strategy)[0]
+            for indv, result in zip(pool, self.qwop_evaluator.evaluate(strategies)):
+                distance, run_time = result
                 indv.fitness = self.compute_fitness(distance, run_time)
+                indv.estimated = getattr(result, 'estimated', False)
                 candidates.append((indv, distance))
 
             # sort by descending distance run
@@ -108,7 +150,7 @@ class GeneticAlgorithm(ABC):
                 pickle.dump(best_indvs, data_file)
 
             # reset time limit to its normal value
-            self.qwop_evaluator.simulator.time_limit = default_time_limit
+            self.qwop_evaluator.time_limit = default_time_limit
 
         # load best_individuals from a file
         with open(population_file, 'rb') as data_file:
@@ -121,6 +163,8 @@ class GeneticAlgorithm(ABC):
 
         For generational GAs, a generation will replace the entire population.
         For a steady-state GA, a generation will only replace two members of the population.
+        The children of a generation are evaluated together, so a steady-state GA only keeps two lanes of the
+        evaluator busy.  Generational GAs use up to `pop_size` lanes.
 
         Returns: None
 
@@ -133,7 +177,9 @@ class GeneticAlgorithm(ABC):
 
         # make children using crossover
         offspring = list()
+        bounds = list()
         for parent1, parent2 in zip(parents[::2], parents[1::2]):
+            bounds.extend([self.fitness_bound((parent1, parent2))] * 2)
             if random.random() < self.cx_prob:
                 child1_genome, child2_genome = self.crossover(parent1.genome, parent2.genome)
                 offspring.append(child1_genome)
@@ -149,11 +195,10 @@ class GeneticAlgorithm(ABC):
                 child_genome = self.mutate(child_genome)
 
             child_genome = self.repair(child_genome)
+            offspring[idx] = Individual(genome=child_genome)
 
-            # even if the child wasn't mutated, his fitness needs to be re-evaluated
-            child = Individual(genome=child_genome)
-            self._evaluate(child)
-            offspring[idx] = child
+        # even if the children weren't mutated, their fitness needs to be re-evaluated
+        self._evaluate_all(offspring, bounds)
 
         # update population
         if self.steady_state:
@@ -165,21 +210,93 @@ class GeneticAlgorithm(ABC):
         else:
             self.population = Population(offspring)
 
-    def _evaluate(self, individual):
+    def fitness_bound(self, parents):
+        """ Fitness that a child of `parents` must exceed for its evaluation to matter
+
+        Evaluations that can no longer exceed the bound are stopped early, and the child's fitness is computed from the
+        distance it ran until then.  Algorithms should only return a bound if they discard children whose fitness
+        doesn't exceed it.
+
+        Args:
+            parents (tuple<Individual>): the parents of the child
+
+        Returns:
+            float or None: the bound, or None to run every evaluation to the end
+
+        """
+        return None
+
+    def _fitness_bound(self, bound):
+        """ Returns: FitnessBound: the FitnessBound handed to the evaluator for `bound`, or None """
+        return FitnessBound(bound, self.compute_fitness) if bound is not None else None
+
+    def _evaluate(self, individual, bound=None, estimate=True):
         """ Evaluates an indvidual using the QwopEvaluator and updates the individual's fitness
 
         Args:
             individual (Individual): the indvidual to evaluate
+            bound (float): if given, the evaluation stops once the individual can't exceed this fitness
+            estimate (bool):
+                whether the evaluator may extrapolate the run once the runner has a steady gait.
+                The individual is then flagged as `estimated`.
 
         Returns: None
 
         """
-        phenotype = self.genome_to_phenotype(individual.genome)
-        strategy = QwopStrategy(execution_function=phenotype)
-        distance, run_time = self.qwop_evaluator.evaluate(strategy)[0]
+        strategy = self.create_strategy(individual.genome)
+        result = self.qwop_evaluator.evaluate(strategy, bounds=self._fitness_bound(bound), estimate=estimate)[0]
+        distance, run_time = result
         individual.fitness = self.compute_fitness(distance, run_time)
+        individual.estimated = getattr(result, 'estimated', False)
         self.total_evaluations += 1
 
+    def _evaluate_all(self, individuals, bounds=None, estimate=True):
+        """ Evaluates several individuals with a single call to the QwopEvaluator and updates their fitness
+
+        Backends that support it (such as the simulator) evaluate all of the individuals together.
+
+        Args:
+            individuals (list<Individual>): the indviduals to evaluate
+            bounds (list<float>): bound of each individual's evaluation, or None.  See `_evaluate`.
+            estimate (bool): whether runs may be extrapolated.  See `_evaluate`.
+
+        Returns: None
+
+        """
+        strategies = [self.create_strategy(indv.genome) for indv in individuals]
+        if bounds is not None:
+            bounds = [self._fitness_bound(bound) for bound in bounds]
+        results = self.qwop_evaluator.evaluate(strategies, bounds=bounds, estimate=estimate)
+        for individual, result in zip(individuals, results):
+            distance, run_time = result
+            individual.fitness = self.compute_fitness(distance, run_time)
+            individual.estimated = getattr(result, 'estimated', False)
+        self.total_evaluations += len(individuals)
+
+    def reevaluate_elites(self, count=1):
+        """ Fully evaluates the fittest individuals whose fitness was extrapolated from a truncated run
+
+        Individuals are re-evaluated until the `count` fittest members of the population were all evaluated in full.
+
+        Args:
+            count (int): number of elites
+
+        Returns:
+            int: number of evaluations performed
+
+        """
+        evaluations = 0
+        while True:
+            elites = sorted(self.population.individuals, key=lambda indv: indv.fitness, reverse=True)[:count]
+            # individuals loaded from older seed files have no `estimated` flag
+            estimated = [indv for indv in elites if getattr(indv, 'estimated', False)]
+            if len(estimated) == 0:
+                break
+            self._evaluate_all(estimated, estimate=False)
+            evaluations += len(estimated)
+        self.population.update_best()
+        return evaluations
+
     @abstractmethod
     def generate_random_genome(self):
         """ Generates a random genome
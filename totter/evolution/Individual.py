@@ -6,10 +6,12 @@ class Individual:
     def __init__(self, genome):
         self.genome = genome
         self.fitness = None
+        self.estimated = False  # whether the fitness was computed from an extrapolated run
 
     def clone(self):
         cloned_self = Individual(copy.deepcopy(self.genome))
         cloned_self.fitness = self.fitness
+        cloned_self.estimated = self.estimated
         return cloned_self
 
     def __str__(self):
@@ -37,6 +37,10 @@ class Population(TotterPopulation):
         """
         self.size = len(individuals)
         self.individuals = individuals
+        self.update_best()
+
+    def update_best(self):
+        """ Find the best individual again, e.g. after the fitness of some individuals changed """
         self.best_indv = self.individuals[0]
         for indv in self.individuals:
             if self.best_indv.fitness is None and indv.fitness is not None:
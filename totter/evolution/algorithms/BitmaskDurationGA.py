@@ -3,10 +3,9 @@
 """
 
 import copy
-import pyautogui
 import random
-import time
 
+from totter.api import keyboard
 from totter.evolution.GeneticAlgorithm import GeneticAlgorithm
 
 CHARACTER_CODES = {
@@ -62,23 +61,23 @@ class BitmaskDurationGA(GeneticAlgorithm):
             for key_code, duration in genome:
                 bitmask = CHARACTER_CODES[key_code]
                 # apply bitmask
-                if bitmask[0]: pyautogui.keyDown('q')
-                else: pyautogui.keyUp('q')
-                if bitmask[1]: pyautogui.keyDown('w')
-                else: pyautogui.keyUp('w')
-                if bitmask[2]: pyautogui.keyDown('o')
-                else: pyautogui.keyUp('o')
-                if bitmask[3]: pyautogui.keyDown('p')
-                else: pyautogui.keyUp('p')
+                if bitmask[0]: keyboard.key_down('q')
+                else: keyboard.key_up('q')
+                if bitmask[1]: keyboard.key_down('w')
+                else: keyboard.key_up('w')
+                if bitmask[2]: keyboard.key_down('o')
+                else: keyboard.key_up('o')
+                if bitmask[3]: keyboard.key_down('p')
+                else: keyboard.key_up('p')
 
                 # hold for duration
-                time.sleep(duration / 1000)
+                keyboard.sleep(duration / 1000)
 
         return phenotype
 
     def compute_fitness(self, distance_run, run_time):
         """ Fitness: distance + speed """
-        speed = distance_run*60 / run_time  # meters per minute
+        speed = distance_run*60 / max(run_time, 1)  # meters per minute.  Runs can end in less than a second
         if distance_run > 10:
             fitness = distance_run + speed
         else:
@@ -3,10 +3,9 @@
 """
 
 import copy
-import pyautogui
 import random
-import time
 
+from totter.api import keyboard
 from totter.evolution.GeneticAlgorithm import GeneticAlgorithm
 from totter.evolution.algorithms.parameter_control.DynamicGA import DynamicMutationGA
 from totter.evolution.CellularGA import CellularGA
@@ -55,22 +54,22 @@ class BitmaskGA(GeneticAlgorithm):
             for key_code in genome:
                 bitmask = CHARACTER_CODES[key_code]
                 if bitmask[0]:
-                    pyautogui.keyDown('q')
+                    keyboard.key_down('q')
                 else:
-                    pyautogui.keyUp('q')
+                    keyboard.key_up('q')
                 if bitmask[1]:
-                    pyautogui.keyDown('w')
+                    keyboard.key_down('w')
                 else:
-                    pyautogui.keyUp('w')
+                    keyboard.key_up('w')
                 if bitmask[2]:
-                    pyautogui.keyDown('o')
+                    keyboard.key_down('o')
                 else:
-                    pyautogui.keyUp('o')
+                    keyboard.key_up('o')
                 if bitmask[3]:
-                    pyautogui.keyDown('p')
+                    keyboard.key_down('p')
                 else:
-                    pyautogui.keyUp('p')
-                time.sleep(0.150)
+                    keyboard.key_up('p')
+                keyboard.sleep(0.150)
 
         return phenotype
 
@@ -78,7 +77,7 @@ class BitmaskGA(GeneticAlgorithm):
         """ Fitness: distance + speed
 
         """
-        speed = distance_run*60 / run_time  # meters per minute
+        speed = distance_run*60 / max(run_time, 1)  # meters per minute.  Runs can end in less than a second
         if distance_run > 10:
             fitness = distance_run + speed
         else:
@@ -190,22 +189,22 @@ class CellularBitmaskGA(CellularGA):
             for key_code in genome:
                 bitmask = CHARACTER_CODES[key_code]
                 if bitmask[0]:
-                    pyautogui.keyDown('q')
+                    keyboard.key_down('q')
                 else:
-                    pyautogui.keyUp('q')
+                    keyboard.key_up('q')
                 if bitmask[1]:
-                    pyautogui.keyDown('w')
+                    keyboard.key_down('w')
                 else:
-                    pyautogui.keyUp('w')
+                    keyboard.key_up('w')
                 if bitmask[2]:
-                    pyautogui.keyDown('o')
+                    keyboard.key_down('o')
                 else:
-                    pyautogui.keyUp('o')
+                    keyboard.key_up('o')
                 if bitmask[3]:
-                    pyautogui.keyDown('p')
+                    keyboard.key_down('p')
                 else:
-                    pyautogui.keyUp('p')
-                time.sleep(0.150)
+                    keyboard.key_up('p')
+                keyboard.sleep(0.150)
 
         return phenotype
 
@@ -213,7 +212,7 @@ class CellularBitmaskGA(CellularGA):
         """ Fitness: distance + speed
 
         """
-        speed = distance_run*60 / run_time  # meters per minute
+        speed = distance_run*60 / max(run_time, 1)  # meters per minute.  Runs can end in less than a second
         if distance_run > 10:
             fitness = distance_run + speed
         else:
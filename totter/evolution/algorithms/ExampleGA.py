@@ -2,17 +2,19 @@
 
 """ Step 1: Imports
 Import the libraries required for your GA.
-In most cases, you'll at leat need the base class and pyautogui.  
-pyautogui is a Python automation library that allows programmatic control of the mouse and keyboard.
+In most cases, you'll at leat need the base class and totter's keyboard module.  
+The keyboard module presses keys in whichever game is being played, either the browser version of QWOP or the headless
+simulator.  Use `keyboard.sleep` rather than `time.sleep` to wait between keystrokes.
+Phenotypes are compiled into timelines of key transitions before they are played, which requires them to press the
+same keys with the same pauses every time they run.  Set `compile_phenotypes = False` on GAs whose phenotypes don't.
 I also import Python's random module, which provides an RNG, plus a few other utilities
 """
 
 
-import time
 import copy
 
-import pyautogui
 import random
+from totter.api import keyboard
 from totter.evolution.GeneticAlgorithm import GeneticAlgorithm
 
 
@@ -41,9 +43,9 @@ class ExampleGA(GeneticAlgorithm):
     def genome_to_phenotype(self, genome):
         def phenotype():
             for key in genome:
-                pyautogui.keyDown(key)
-                time.sleep(0.020)  # press for 20 milliseconds
-                pyautogui.keyUp(key)
+                keyboard.key_down(key)
+                keyboard.sleep(0.020)  # press for 20 milliseconds
+                keyboard.key_up(key)
 
         return phenotype
 
@@ -7,11 +7,10 @@ state that will be held for 150 ms.  This is essentially the same as our "bitmas
 
 """
 
-import time
 import copy
 
-import pyautogui
 import random
+from totter.api import keyboard
 from totter.evolution.CellularGA import CellularGA
 
 CHARACTER_CODES = {
@@ -52,22 +51,22 @@ class GoogleGA(CellularGA):
             for key_code in genome:
                 bitmask = CHARACTER_CODES[key_code]
                 if bitmask[0]:
-                    pyautogui.keyDown('q')
+                    keyboard.key_down('q')
                 else:
-                    pyautogui.keyUp('q')
+                    keyboard.key_up('q')
                 if bitmask[1]:
-                    pyautogui.keyDown('w')
+                    keyboard.key_down('w')
                 else:
-                    pyautogui.keyUp('w')
+                    keyboard.key_up('w')
                 if bitmask[2]:
-                    pyautogui.keyDown('o')
+                    keyboard.key_down('o')
                 else:
-                    pyautogui.keyUp('o')
+                    keyboard.key_up('o')
                 if bitmask[3]:
-                    pyautogui.keyDown('p')
+                    keyboard.key_down('p')
                 else:
-                    pyautogui.keyUp('p')
-                time.sleep(0.150)
+                    keyboard.key_up('p')
+                keyboard.sleep(0.150)
 
         return phenotype
 
@@ -75,8 +74,9 @@ class GoogleGA(CellularGA):
         """ Fitness function
         The runner is only awarded a fitness if he manages not to fall over before the evaluation time limit
         The fitness is his speed in meters per minute
+        Runs are stopped at the time limit, so a runner that didn't fall reports a run time equal to the limit
         """
-        if distance_run >= 99 or run_time > self.eval_time_limit:
+        if distance_run >= 99 or run_time >= self.eval_time_limit:
             minutes = run_time / 60
             return distance_run / minutes
         else:
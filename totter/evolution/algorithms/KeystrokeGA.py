@@ -3,10 +3,9 @@
 """
 
 import copy
-import pyautogui
 import random
-import time
 
+from totter.api import keyboard
 from totter.evolution.GeneticAlgorithm import GeneticAlgorithm
 from totter.evolution.CellularGA import CellularGA
 
@@ -27,15 +26,15 @@ class KeystrokeGA(GeneticAlgorithm):
     def genome_to_phenotype(self, genome):
         def phenotype():
             for key in genome:
-                pyautogui.keyDown(key)
-                time.sleep(0.150)
-                pyautogui.keyUp(key)
+                keyboard.key_down(key)
+                keyboard.sleep(0.150)
+                keyboard.key_up(key)
 
         return phenotype
 
     def compute_fitness(self, distance_run, run_time):
         """ Fitness: distance + speed """
-        speed = distance_run*60 / run_time  # meters per minute
+        speed = distance_run*60 / max(run_time, 1)  # meters per minute.  Runs can end in less than a second
         if distance_run > 10:
             fitness = distance_run + speed
         else:
@@ -140,15 +139,15 @@ class CellularKeystrokeGA(CellularGA):
     def genome_to_phenotype(self, genome):
         def phenotype():
             for key in genome:
-                pyautogui.keyDown(key)
-                time.sleep(0.150)
-                pyautogui.keyUp(key)
+                keyboard.key_down(key)
+                keyboard.sleep(0.150)
+                keyboard.key_up(key)
 
         return phenotype
 
     def compute_fitness(self, distance_run, run_time):
         """ Fitness: distance + speed """
-        speed = distance_run*60 / run_time  # meters per minute
+        speed = distance_run*60 / max(run_time, 1)  # meters per minute.  Runs can end in less than a second
         if distance_run > 10:
             fitness = distance_run + speed
         else:
@@ -1,8 +1,7 @@
 import copy
-import pyautogui
 import random
-import time
 
+from totter.api import keyboard
 from totter.evolution.GeneticAlgorithm import GeneticAlgorithm
 
 ALPHABET = list(('q', 'w', 'o', 'p', 'Q', 'W', 'O', 'P', '+'))
@@ -33,17 +32,17 @@ class KeyupKeydownGA(GeneticAlgorithm):
                     pass
                 elif key.isupper():
                     true_key = key.lower()
-                    pyautogui.keyDown(true_key)
+                    keyboard.key_down(true_key)
                 else:
-                    pyautogui.keyUp(key)
+                    keyboard.key_up(key)
 
-                time.sleep(0.150)
+                keyboard.sleep(0.150)
 
         return phenotype
 
     def compute_fitness(self, distance_run, run_time):
         """ Fitness: distance + speed """
-        speed = distance_run*60 / run_time  # meters per minute
+        speed = distance_run*60 / max(run_time, 1)  # meters per minute.  Runs can end in less than a second
         if distance_run > 10:
             fitness = distance_run + speed
         else:
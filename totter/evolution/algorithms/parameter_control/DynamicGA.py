@@ -39,11 +39,10 @@ class DynamicMutationGA(GeneticAlgorithm, metaclass=ABCMeta):
                 child_genome = self.mutate(child_genome)
 
             child_genome = self.repair(child_genome)
+            offspring[idx] = Individual(genome=child_genome)
 
-            # even if the child wasn't mutated, his fitness needs to be re-evaluated
-            child = Individual(genome=child_genome)
-            self._evaluate(child)
-            offspring[idx] = child
+        # even if the children weren't mutated, their fitness needs to be re-evaluated
+        self._evaluate_all(offspring)
 
         # update population
         for child in offspring:
@@ -17,3 +17,13 @@ class WallTimer:
 
     def since(self):
         return now() - self.start
+
+
+class GameTimer(WallTimer):
+    def __init__(self, rate=1):
+        """ Timer of a game whose clock runs `rate` times faster than the wall clock """
+        super().__init__()
+        self.rate = rate
+
+    def since(self):
+        return (now() - self.start) * self.rate